@@ -41,6 +41,25 @@ def refresh_page_content(trigger_update, container_id):
     return no_update
 
 
+@callback(
+    Output({'page':ALL, 'item':'store-flag-refreshed-cache'}, 'data'),
+    Input('interval-watcher', 'n_intervals'),
+    State({'page':ALL, 'item':'store-flag-refreshed-cache'}, 'data'),
+    State({'page':ALL, 'item':'store-flag-refreshed-cache'}, 'id'),
+    prevent_initial_call=True
+)
+def signal_tables_changed(_, flags, flags_ids):
+    """
+    Ad ogni intervallo confronta le versioni delle tabelle in memoria con quelle già
+    segnalate alle pagine, aggiornando i soli flag dei file_type le cui tabelle sono cambiate
+    """
+    versions = GLOBAL_CACHE.table_versions()
+    return [
+        no_update if flag == versions[flag_id['page']] else versions[flag_id['page']]
+        for flag, flag_id in zip(flags, flags_ids)
+    ]
+
+
 @callback(
     Output('container-app', 'className'),
     Input('url','pathname'),
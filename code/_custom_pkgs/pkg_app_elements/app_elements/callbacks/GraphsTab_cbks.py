@@ -171,6 +171,28 @@ def export_current(n_clicks:int, curr_tab:str, tabs_id:dict[str,str]):
     return out
 
 
+@callback(
+    Output({'page':MATCH, 'item':'download-samples'}, 'data'),
+    Input({'page':MATCH, 'item':'button-download-samples'}, 'n_clicks'),
+    [State({'page': MATCH, 'item': 'store-sample-points'}, 'data'),
+     State({'page':MATCH, 'item': 'graph-tabs'}, 'value'),
+     State({'page':MATCH, 'item': 'graph-tabs'}, 'id')],
+    prevent_initial_call=True
+)
+def download_samples(n_clicks:int, samples_points:list[float], curr_tab:str, tabs_id:dict[str,str]):
+    """
+    Scarica in formato .csv la tabella dei sub-samples delle curve del tab aperto,
+    alle ascisse inserite, con quelli dei target se visualizzati
+    """
+    if not n_clicks or not curr_tab or not samples_points:
+        return no_update
+
+    tab = GLOBAL_CACHE.open_tabs[tabs_id['page']].tab(curr_tab)
+    tab.x_vals = samples_points
+
+    return dcc.send_data_frame(tab.samples_table().to_csv, f"{tab.used.fig_stem}_samples.csv", index=False)
+
+
 @callback(
     [Output({'page':MATCH, 'item': 'graph-tab', 'tab':ALL}, 'figure'),
      Output({'page': MATCH, 'item': 'store-placeholder-graph-tab'}, 'data', allow_duplicate=True)],
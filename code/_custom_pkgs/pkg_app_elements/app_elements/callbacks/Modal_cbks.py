@@ -4,15 +4,15 @@ all'interno dell'applicazione
 """
 
 import pandas as pd
-from dash import Input, Output, State, callback, MATCH, no_update, callback_context
-from app_elements.callbacks._helper_funcs import update_table
+from dash import Input, Output, State, callback, clientside_callback, MATCH, no_update, callback_context
+from app_elements.callbacks._helper_funcs import update_table, serve_rows, PURGE_ROWS_JS
 from common import FileCurves, CustomFigure
 from app_resources.AppCache import GLOBAL_CACHE
 
 
 ## DYNAMIC CALLBACKS ##
 callback(
-    [Output({'page':MATCH, 'item':'table', 'location':'modal'}, 'rowData'),
+    [Output({'page':MATCH, 'item':'store-table-view', 'location':'modal'}, 'data'),
      Output({'page':MATCH, 'item':'table', 'location':'modal'}, 'columnDefs'),
      Output({'page':MATCH, 'item':'table', 'location':'modal'}, 'selectedRows', allow_duplicate=True),
      Output({'page':MATCH, 'item':'table', 'location':'modal'}, 'columnState')],
@@ -22,6 +22,21 @@ callback(
     prevent_initial_call=True
 )(update_table)
 
+callback(
+    Output({'page':MATCH, 'item':'table', 'location':'modal'}, 'getRowsResponse'),
+    Input({'page':MATCH, 'item':'table', 'location':'modal'}, 'getRowsRequest'),
+    [State({'page':MATCH, 'item':'store-table-view', 'location':'modal'}, 'data'),
+     State({'page':MATCH, 'item':'table', 'location':'modal'}, 'id'),],
+)(serve_rows)
+
+clientside_callback(
+    PURGE_ROWS_JS,
+    Output({'page':MATCH, 'item':'table', 'location':'modal'}, 'getRowsResponse', allow_duplicate=True),
+    Input({'page':MATCH, 'item':'store-table-view', 'location':'modal'}, 'data'),
+    State({'page':MATCH, 'item':'table', 'location':'modal'}, 'id'),
+    prevent_initial_call=True
+)
+
 @callback(
     Output({'page': MATCH, 'item': 'modal'}, 'is_open'),
     Input({'page': MATCH, 'item': 'button-open-modal'}, 'n_clicks'),
@@ -113,11 +128,13 @@ def export_selected(n_clicks:int, table_id:dict[str,str], selected_rows:list[dic
     export_path = GLOBAL_CACHE.find_export_path()
 
     if mode == "grouped":
+        no_aff_cols = GLOBAL_CACHE.tables.get_table_no_aff(file_type).columns
         figs:list[CustomFigure] = []
         for row in selected_rows:
             path_list = GLOBAL_CACHE.explode_group_paths(row['file_path'])
-            group_df = GLOBAL_CACHE.tables.get_table_no_aff(file_type)
-            group_df = group_df[group_df['file_path'].isin(path_list)]
+            group_df = GLOBAL_CACHE.tables.query(
+                file_type, {'file_path': [str(path) for path in path_list]}, columns=no_aff_cols
+            )
 
             figs.append(
                 CustomFigure(
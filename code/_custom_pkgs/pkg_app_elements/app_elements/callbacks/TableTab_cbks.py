@@ -2,15 +2,16 @@
 Il modulo contiene tutte le funzioni callback che agiscono sul tab principale con la tabella
 """
 
-from dash import Input, Output, State, callback, MATCH, no_update, dcc
-from app_elements.callbacks._helper_funcs import update_table
+from dash import Input, Output, State, callback, clientside_callback, MATCH, no_update, dcc
+from app_elements.callbacks._helper_funcs import update_table, serve_rows, PURGE_ROWS_JS
+from app_elements.page_elements import table_view
 from app_resources.AppCache import GLOBAL_CACHE
 
 
 ## DYNAMIC CALLBACKS ##
 
 callback([
-    Output({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'rowData'),
+    Output({'page':MATCH, 'item':'store-table-view', 'location':'dashboard'}, 'data'),
     Output({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'columnDefs'),
     Output({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'selectedRows', allow_duplicate=True),
     Output({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'columnState', allow_duplicate=True),],
@@ -20,6 +21,21 @@ callback([
     prevent_initial_call=True
 )(update_table)
 
+callback(
+    Output({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'getRowsResponse'),
+    Input({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'getRowsRequest'),
+    [State({'page':MATCH, 'item':'store-table-view', 'location':'dashboard'}, 'data'),
+     State({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'id'),],
+)(serve_rows)
+
+clientside_callback(
+    PURGE_ROWS_JS,
+    Output({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'getRowsResponse', allow_duplicate=True),
+    Input({'page':MATCH, 'item':'store-table-view', 'location':'dashboard'}, 'data'),
+    State({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'id'),
+    prevent_initial_call=True
+)
+
 
 @callback(
     [Output({'page':MATCH, 'item': 'graph-tabs'}, 'children'),
@@ -61,40 +77,124 @@ def add_tabs(n_clicks:int, tabs:list[dcc.Tab], selected_rows:list, table_id:dict
 
 
 @callback(
-    [Output({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'rowData', allow_duplicate=True),
-     Output({'page': MATCH, 'item': 'table', 'location': 'dashboard'}, 'columnDefs', allow_duplicate=True),
-     Output({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'columnState', allow_duplicate=True),],
+    [Output({'page':MATCH, 'item':'store-affinity-job'}, 'data'),
+     Output({'page':MATCH, 'item':'interval-affinity-job'}, 'disabled'),
+     Output({'page':MATCH, 'item':'progress-affinity'}, 'value'),
+     Output({'page':MATCH, 'item':'progress-affinity'}, 'label'),
+     Output({'page':MATCH, 'item':'container-affinity-job'}, 'style'),
+     Output({'page':MATCH, 'item':'button-calculate-affinity'}, 'disabled'),],
     Input({'page': MATCH, 'item': 'button-calculate-affinity'}, 'n_clicks'),
     [State({'page': MATCH, 'item': 'table', 'location':'dashboard'}, 'id'),
+     State({'page':MATCH, 'item':'check-full-affinity'}, 'value'),],
+    prevent_initial_call=True
+)
+def affinity_calc(n_clicks:int, table_id:dict, full_calc:list[str]):
+    """
+    Avvia in background il calcolo delle percentuali di affinità di ogni esperimento presente
+    nei dati, mostrando la barra di avanzamento e attivando il controllo periodico del job.
+
+    Sono ricalcolate solo le affinità dei file nuovi o cambiati, a meno che non sia
+    selezionato il ricalcolo completo.
+    """
+    if not n_clicks:
+        return no_update, no_update, no_update, no_update, no_update, no_update
+
+    job = GLOBAL_CACHE.jobs.submit(
+        GLOBAL_CACHE.tables.calculate_affinities, table_id['page'], full="full" in (full_calc or [])
+    )
+
+    return job.id, False, 0, "0%", {'display': 'block'}, True
+
+
+@callback(
+    [Output({'page':MATCH, 'item':'progress-affinity'}, 'value', allow_duplicate=True),
+     Output({'page':MATCH, 'item':'progress-affinity'}, 'label', allow_duplicate=True),
+     Output({'page':MATCH, 'item':'interval-affinity-job'}, 'disabled', allow_duplicate=True),
+     Output({'page':MATCH, 'item':'store-affinity-job'}, 'data', allow_duplicate=True),
+     Output({'page':MATCH, 'item':'container-affinity-job'}, 'style', allow_duplicate=True),
+     Output({'page':MATCH, 'item':'button-calculate-affinity'}, 'disabled', allow_duplicate=True),
+     Output({'page':MATCH, 'item':'store-table-view', 'location':'dashboard'}, 'data', allow_duplicate=True),
+     Output({'page': MATCH, 'item': 'table', 'location': 'dashboard'}, 'columnDefs', allow_duplicate=True),
+     Output({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'columnState', allow_duplicate=True),],
+    Input({'page':MATCH, 'item':'interval-affinity-job'}, 'n_intervals'),
+    [State({'page':MATCH, 'item':'store-affinity-job'}, 'data'),
+     State({'page': MATCH, 'item': 'table', 'location':'dashboard'}, 'id'),
      State({'page':MATCH, 'item':'radio-table-mode', 'location':'dashboard'}, 'value'),
      State({'page':MATCH, 'item':'menu-grouping-features', 'location':'dashboard'}, 'value'),
      State({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'columnDefs'),],
     prevent_initial_call=True
 )
-def affinity_calc(n_clicks:int, table_id:dict, mode:str, grouping_feature:str, column_defs:list[dict]):
+def affinity_job_progress(_, job_id:str, table_id:dict, mode:str, grouping_feature:str, column_defs:list[dict]):
     """
-    Calcola le percentuali di affinità di ogni esperimento presente nei dati, salva i dati ricavati
-    nel file preposto e li visualizza direttamente nella tabella di pagina,
-    in base alla modalità di visualizzazione attuale.
+    Aggiorna la barra di avanzamento del calcolo delle affinità in background.
+
+    Al termine del job nasconde la barra, ferma il controllo periodico e, se il calcolo
+    è riuscito, visualizza le affinità nella tabella di pagina, in base alla modalità
+    di visualizzazione attuale.
     """
-    if not n_clicks:
-        return no_update, no_update, no_update
+    job = GLOBAL_CACHE.jobs.pop(job_id) if job_id else None
+    if job is None:
+        return 0, "", True, None, {'display': 'none'}, False, no_update, no_update, no_update
+
+    if not job.finished:
+        return job.progress, f"{job.progress:.0f}%", no_update, no_update, no_update, no_update, \
+            no_update, no_update, no_update
+
+    if job.status != job.DONE:
+        if job.status == job.FAILED:
+            print(f"Calcolo delle affinità non riuscito: {job.error}")
+        return 0, "", True, None, {'display': 'none'}, False, no_update, no_update, no_update
 
     file_type = table_id['page']
-    page_df_out = GLOBAL_CACHE.tables.calculate_affinities(file_type)
 
     if mode=="normal":
-        cols_to_hide = GLOBAL_CACHE.tables.cols_to_hide(page_df_out)
+        cols_to_hide = GLOBAL_CACHE.tables.cols_to_hide(job.result)
     elif mode=="grouped":
-        page_df_out, cols_to_hide = GLOBAL_CACHE.tables.group_df(file_type, grouping_feature)
+        _, cols_to_hide = GLOBAL_CACHE.tables.group_df(file_type, grouping_feature)
     else:
         raise ValueError(f"Il valore passato dal radio selector [{mode}], non è tra quelli supportati")
 
     for col_def in column_defs:
         col_def['hide'] = True if col_def['field'] in cols_to_hide else False
 
-    # noinspection PyUnboundLocalVariable
-    return page_df_out.to_dict('records'), column_defs, None
+    return 100, "100%", True, None, {'display': 'none'}, False, \
+        table_view(file_type, mode, grouping_feature), column_defs, None
+
+
+@callback(
+    Output({'page':MATCH, 'item':'progress-affinity'}, 'label', allow_duplicate=True),
+    Input({'page':MATCH, 'item':'button-cancel-affinity'}, 'n_clicks'),
+    State({'page':MATCH, 'item':'store-affinity-job'}, 'data'),
+    prevent_initial_call=True
+)
+def affinity_job_cancel(n_clicks:int, job_id:str):
+    """Richiede l'annullamento del calcolo delle affinità in corso"""
+    if not n_clicks or not job_id:
+        return no_update
+    GLOBAL_CACHE.jobs.cancel(job_id)
+    return "Annullamento..."
+
+
+@callback(
+    [Output({'page':MATCH, 'item':'store-table-view', 'location':'dashboard'}, 'data', allow_duplicate=True),
+     Output({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'columnDefs', allow_duplicate=True),],
+    Input({'page':MATCH, 'item':'store-flag-refreshed-cache'}, 'data'),
+    [State({'page':MATCH, 'item':'radio-table-mode', 'location':'dashboard'}, 'value'),
+     State({'page':MATCH, 'item':'menu-grouping-features', 'location':'dashboard'}, 'value'),
+     State({'page':MATCH, 'item':'table', 'location':'dashboard'}, 'id'),],
+    prevent_initial_call=True
+)
+def refresh_table_rows(_, mode:str, grouping_feature:str, table_id:dict):
+    """
+    Ricarica le righe della tabella quando il watcher della directory dei dati segnala
+    una nuova versione della tabella del file_type, mantenendo la modalità di visualizzazione
+    e le righe selezionate
+    """
+    if table_id['page'] in GLOBAL_CACHE.tables.not_presents:
+        return no_update, no_update
+
+    view, column_defs, _, _ = update_table(mode, grouping_feature, table_id)
+    return view, column_defs
 
 
 ## DEBUG ##
@@ -1,6 +1,6 @@
-from app_elements.page_elements import get_table
+from app_elements.page_elements import get_table, table_view
+from app_resources.AppCache import GLOBAL_CACHE
 from dash import no_update
-import copy
 
 ## COMMON CALLBACKS ##
 def update_table(mode:str,
@@ -9,18 +9,43 @@ def update_table(mode:str,
     """
     Updater della tabella di visualizzazione dei file.
 
-    Nel caso venga richiesto il raggruppamento dei dati da parte dell selettore, ricrea la tabella, raggruppando gli
-    esperimenti secondo la feature grouping_feature, e calcolando le medie delle affinità, se presenti. Nella colonna
+    Nel caso venga richiesto il raggruppamento dei dati da parte dell selettore, la tabella mostrerà gli
+    esperimenti raggruppati secondo la feature grouping_feature, con le medie delle affinità, se presenti. Nella colonna
     degli indirizzi verranno salvate degli indirizzi dei file che fanno parte del gruppo sotto forma di stringhe, divisi
     da cancelletti (#).
+
+    Le righe non sono inviate dalla callback, ma richieste a blocchi dalla tabella all'aggiornamento della vista
+    (vedi serve_rows).
     """
     if mode == "grouped":
-        df_out,cols_defs,_ = get_table(table_id, grouping_feat=grouping_feature)
+        _,cols_defs,_ = get_table(table_id, grouping_feat=grouping_feature)
     elif mode == "normal":
-        df_out,cols_defs,_ = get_table(table_id)
+        _,cols_defs,_ = get_table(table_id)
     elif not mode:
         return no_update, no_update, no_update, no_update
     else:
         raise ValueError(f"Il valore passato dal radio selector [{mode}], non è tra quelli supportati")
 
-    return df_out.to_dict('records'), cols_defs, [], None
+    return table_view(table_id['page'], mode, grouping_feature), cols_defs, [], None
+
+def serve_rows(request:dict,
+               view:dict,
+               table_id:dict):
+    """
+    Risponde alle richieste di blocchi di righe della tabella, con row model infinite,
+    ordinando e filtrando sul server la tabella della vista corrente
+    """
+    if not request or table_id['page'] in GLOBAL_CACHE.tables.not_presents:
+        return no_update
+
+    view = view or {}
+    return GLOBAL_CACHE.tables.rows_block(table_id['page'], request, view.get("grouping_feature"))
+
+
+# svuota i blocchi di righe caricati dalla tabella, che richiederà nuovamente al server quelli visualizzati
+PURGE_ROWS_JS = """
+function(view, tableId) {
+    dash_ag_grid.getApiAsync(tableId).then((api) => api.purgeInfiniteCache());
+    return window.dash_clientside.no_update;
+}
+"""
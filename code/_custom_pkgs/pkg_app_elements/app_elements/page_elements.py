@@ -10,25 +10,35 @@ from app_resources.AppCache import GLOBAL_CACHE, TablesCache
 
 
 ## PAGE ELEMENTS ##
-def my_table_template(table_id:dict[str,str]) -> dag.AgGrid:
+def my_table_template(table_id:dict[str,str]) -> html.Div:
     """
     Template custom per la visualizzazione dei file.
 
     I dati sono presi automaticamente a partire dal file di indicizzazione
     nella cartella dei dati, in base al data_type passato all'interno dell'id.
 
+    La tabella usa il row model infinite: ordinamento, filtri e paginazione sono eseguiti
+    dalla TablesCache sul server, e al browser sono inviati solo i blocchi di righe visualizzati.
+    Accanto alla tabella è salvata la vista corrente (modalità di visualizzazione e versione
+    della tabella), il cui aggiornamento svuota i blocchi già caricati.
+
     Vengono nascoste le colonne vuote e la colonna degli indirizzi.
     Le celle vuote vengono riempite con "-".
     :param table_id:
     :return:
     """
 
-    data, columns_defs, _ = get_table(table_id)
+    _, columns_defs, _ = get_table(table_id)
+
+    view_id = table_id.copy()
+    view_id["item"] = "store-table-view"
 
-    return dag.AgGrid(
+    grid = dag.AgGrid(
         id=table_id,
-        rowData=data.to_dict('records'),
+        rowModelType="infinite",
         columnDefs=columns_defs,
+        # righe identificate dal file_path, in modo che la selezione sopravviva agli aggiornamenti dei dati
+        getRowId="params.data.file_path",
         resetColumnState=False,
         defaultColDef={
             "resizable": True,
@@ -44,6 +54,9 @@ def my_table_template(table_id:dict[str,str]) -> dag.AgGrid:
             "suppressRowClickSelection": True,  # Seleziona solo tramite checkbox
             "pagination": True,
             "paginationPageSize": 20,
+            # righe richieste al server per blocco, e blocchi mantenuti nel browser
+            "cacheBlockSize": 100,
+            "maxBlocksInCache": 10,
             "suppressCellFocus": True,
             "animateRows": True,
             "domLayout": "autoHeight",
@@ -59,6 +72,11 @@ def my_table_template(table_id:dict[str,str]) -> dag.AgGrid:
         },
     )
 
+    return html.Div([
+        grid,
+        dcc.Store(id=view_id, data=table_view(table_id["page"])),
+    ])
+
     # return dash_table.DataTable(
     #     sort_action='native',
     #     filter_action='native',
@@ -391,6 +409,18 @@ def export_modal(modal_id:dict[str,str])->dbc.Modal:
 
 
 ## HELPER FUNC ##
+def table_view(file_type:str, mode:str="normal", grouping_feature:str=None) -> dict:
+    """
+    Ritorna la vista di una tabella, salvata accanto alla AgGrid e usata per rispondere alle
+    sue richieste di righe: modalità di visualizzazione, feature di raggruppamento e versione
+    della tabella del file_type, che cambiando forza il ricaricamento delle righe
+    """
+    return {
+        "mode": mode,
+        "grouping_feature": grouping_feature if mode == "grouped" else None,
+        "version": GLOBAL_CACHE.tables.version(file_type),
+    }
+
 def get_table(table_id:dict[str,str],
               only_df=False,
               grouping_feat:str=None):
@@ -96,7 +96,42 @@ def children_layout(PAGE:str):
                                     color="primary",
                                     className="w-100 mt-3",
                                     size="lg"
-                                )
+                                ),
+                                # di default sono ricalcolate solo le affinità dei file cambiati
+                                dbc.Checklist(
+                                    id={'page': PAGE, 'item': 'check-full-affinity'},
+                                    options=[
+                                        {"label": "Ricalcola tutte", "value": "full"}
+                                    ],
+                                    value=[],
+                                    switch=True,
+                                    className="mt-1"
+                                ),
+                                # avanzamento del calcolo delle affinità, eseguito in background
+                                html.Div([
+                                    dbc.Progress(
+                                        id={'page': PAGE, 'item': 'progress-affinity'},
+                                        value=0,
+                                        striped=True,
+                                        animated=True,
+                                        className="mt-2"
+                                    ),
+                                    dbc.Button(
+                                        "✖ Annulla",
+                                        id={'page': PAGE, 'item': 'button-cancel-affinity'},
+                                        color="danger",
+                                        outline=True,
+                                        className="w-100 mt-1",
+                                        size="sm"
+                                    ),
+                                ],
+                                    id={'page': PAGE, 'item': 'container-affinity-job'},
+                                    style={'display': 'none'}
+                                ),
+                                dcc.Store(id={'page': PAGE, 'item': 'store-affinity-job'}, data=None),
+                                dcc.Interval(id={'page': PAGE, 'item': 'interval-affinity-job'},
+                                             interval=500,
+                                             disabled=True),
                             ], md=4, style={'display': 'block' if targets_present else 'none'}),
                         ])
                     ])
@@ -225,7 +260,17 @@ def children_layout(PAGE:str):
                                                         size="md",
                                                         className="w-100",
                                                     )
-                                                ], width=4),
+                                                ], width=3),
+                                                dbc.Col([
+                                                    dbc.Button(
+                                                        "📄 Scarica Samples",
+                                                        id={'page': PAGE, 'item': 'button-download-samples'},
+                                                        color="outline-info",
+                                                        size="md",
+                                                        className="w-100",
+                                                    ),
+                                                    dcc.Download(id={'page': PAGE, 'item': 'download-samples'}),
+                                                ], width=3),
                                                 dbc.Col([
                                                     dbc.Button(
                                                         "👀 Visualizza target",
@@ -234,7 +279,7 @@ def children_layout(PAGE:str):
                                                         size="md",
                                                         className="w-100"
                                                     )
-                                                ], width=4, style={'display': 'block' if targets_present else 'none'}),
+                                                ], width=3, style={'display': 'block' if targets_present else 'none'}),
                                                 dbc.Col([
                                                     dbc.Button(
                                                         "📊 Samples Chart",
@@ -243,7 +288,7 @@ def children_layout(PAGE:str):
                                                         size="md",
                                                         className="w-100"
                                                     ),
-                                                ], width=4),
+                                                ], width=3),
                                             ], className="d-flex flex-row-reverse")
                                         )   # colonna bottoni export e target_plotter
                                     ])
@@ -3,58 +3,235 @@ In questo modulo è definita la classe AppCache, che verrà usata per
 costruire la cache dell'applicazione tramite instantiation
 """
 
+import atexit
+import itertools
+import json
+import threading
+from collections import OrderedDict
 from copy import copy
 from pathlib import Path
 from dash import dcc
+import numpy as np
 import pandas as pd
 import plotly.io as pio
 from app_resources.parameters import ConfigCache
+from app_resources.jobs import Job, JobsManager
 from common import *  # non è un wildcard import, mi serve tutto
+from common.indexer import scan_data_dir
+from common.row_model import block_bounds, filter_mask, index_condition, index_sort
+
+# il copy-on-write di pandas è attivato all'importazione del modulo, prima che GLOBAL_CACHE
+# carichi qualunque tabella, in modo che tutte le tabelle in memoria, e le loro letture
+# (vedi TablesCache._share), seguano le stesse regole per tutta la vita del processo
+pd.set_option("mode.copy_on_write", True)
+
+
+## PARAMS ##
+# numero di ordinamenti delle righe delle AgGrid mantenuti in memoria
+ROW_ORDERS_SIZE = 32
 
 
 ## CLASS ##
 class TablesCache:
     """
     La classe contiene tutti i dati e i metodi riguardanti le tabelle di indicizzazione,
-    la loro manipolazione e il loro salvataggio in memoria
-    """
-    def __init__(self):
+    la loro manipolazione e il loro salvataggio in memoria.
+
+    Le tabelle in memoria non sono mai modificate, ma sostituite da una nuova versione:
+    le letture ritornano copie copy-on-write, che non duplicano i dati della tabella, se il
+    copy-on-write di pandas è attivo (è attivato all'importazione del modulo), altrimenti copie complete
+
+    Ogni tabella ha un numero di versione, incrementato ad ogni sua modifica, e unico anche
+    tra istanze diverse, in modo che l'interfaccia possa riconoscere le tabelle cambiate
 
-        self.index_data_dir()
+    Le tabelle modificate sono salvate in background dall'IndexWriter della cache: ogni lettura
+    dei file salvati (rilettura delle tabelle, indexer, report excel, manifest delle affinità)
+    è preceduta da un flush, in modo da non leggere mai tabelle più vecchie di quelle in memoria
+    """
+    # contatore condiviso, le versioni non si ripetono dopo la ricostruzione della cache
+    _version_counter = itertools.count(1)
 
+    def __init__(self):
+        # le tabelle possono essere aggiornate dal thread del watcher mentre vengono lette
+        self._lock = threading.RLock()
+        self._versions:dict[str,int] = {}
+        # tabelle raggruppate, per (file_type, feature di raggruppamento), con la versione della tabella
+        self._grouped:dict[tuple[str,str], tuple[int, pd.DataFrame, list[str]]] = {}
+        # indici per colonna delle tabelle, per file_type, con la versione della tabella
+        self._indexes:dict[str, tuple[int, TableIndex]] = {}
+        # posizioni delle righe filtrate e ordinate delle AgGrid, per (file_type, versione, filtri, ordinamento)
+        self._row_orders:OrderedDict[tuple[str,int,str,str], np.ndarray] = OrderedDict()
+
+        changes = self.index_data_dir()
+
+        self._store = get_index_store(ConfigCache.app_configs.data_dir)
+        self._writer = IndexWriter(self._store, on_saved=lambda _: self._export_report())
+        # le tabelle in attesa di salvataggio sono scritte anche alla chiusura dell'applicazione
+        atexit.register(self._writer.close)
         self._tables:dict[str,pd.DataFrame] = {}
         # file types non indicizzati nella data_dir corrente
         self._not_presents:set[str] = set()
         for file_type in ConfigCache.file_types:
+            self._load_table(file_type)
+
+        if changes:
+            self._export_report()
+
+    def _load_table(self, file_type:str):
+        """Carica dal backend di salvataggio la tabella del file_type, aggiornandone la versione"""
+        with self._lock:
+            # la tabella salvata deve contenere le modifiche in attesa di scrittura
+            self._writer.flush()
             try:
-                self._tables[file_type] = pd.read_excel(
-                    ConfigCache.app_configs.indexes_file,
-                    sheet_name=file_type)
+                self._tables[file_type] = self._store.load(file_type)
             except Exception as e:
                 print("\tErrore costruzione TablesCache\n"
                       f"\tfile_type: {file_type}\n"
                       f"\terror: {e}\n"
                 )
+                self._tables.pop(file_type, None)
                 self._not_presents.add(file_type)
+            else:
+                self._not_presents.discard(file_type)
+            self._bump_version(file_type)
+
+    def _bump_version(self, file_type:str):
+        self._versions[file_type] = next(self._version_counter)
+        # i raggruppamenti della versione precedente non sono più validi
+        for key in [key for key in self._grouped if key[0] == file_type]:
+            del self._grouped[key]
+        self._indexes.pop(file_type, None)
+        for key in [key for key in self._row_orders if key[0] == file_type]:
+            del self._row_orders[key]
 
     @property
     def not_presents(self):
         """Ritorna un set dei file_type non indicizzati"""
         return self._not_presents
 
-    def _save_tables(self):
-        """Salva i df in memoria nel file di indicizzazione"""
+    def version(self, file_type:str) -> int:
+        """Ritorna la versione corrente della tabella del file_type specificato"""
+        return self._versions.get(file_type, 0)
+
+    def update(self) -> dict[str, dict[str, list[str]]]:
+        """
+        Indicizza i soli file cambiati nella directory dei dati, e ricarica in memoria
+        le sole tabelle dei file_type coinvolti, senza ricostruire la cache
+
+        :return: i cambiamenti apportati alle tabelle, per file_type
+        """
+        with self._lock:
+            # l'indexer legge le tabelle salvate, che devono contenere le ultime modifiche
+            self._writer.flush()
+            changes = self.index_data_dir()
+            # l'indexer ha già applicato inserimenti ed eliminazioni alle tabelle salvate,
+            # che sono rilette solo per i file_type modificati
+            for file_type in changes:
+                self._load_table(file_type)
+
+            if changes:
+                self._export_report()
+
+        if changes:
+            self.sync_warehouses(*changes)
+        return changes
+
+    def sync_warehouses(self, *file_types:str, progress=None):
+        """
+        Aggiorna i magazzini delle curve con i file delle tabelle, se attivi nei config.
+
+        Nel caso siano specificati dei file_type, aggiorna solo i magazzini di questi ultimi
+
+        :param progress: funzione chiamata periodicamente con la frazione di file_type aggiornati
+        """
+        if not ConfigCache.app_configs.curve_warehouse:
+            return
+
+        file_types = [ft for ft in file_types or ConfigCache.file_types if ft not in self._not_presents]
+        for i, file_type in enumerate(file_types):
+            with self._lock:
+                paths = self._tables[file_type]["file_path"].tolist()
+            try:
+                CurveWarehouse.for_type(
+                    file_type, paths,
+                    None if progress is None else lambda fraction, i=i: progress((i+fraction)/len(file_types))
+                )
+            except Exception as e:
+                print(f"Errore nell'aggiornamento del magazzino delle curve {file_type}: {e}")
+
+    def _save_tables(self, *file_types:str, wait:bool=False, after_save=None):
+        """
+        Richiede il salvataggio dei df in memoria nelle tabelle di indicizzazione.
+
+        Le tabelle sono scritte in background, raggruppando le richieste ravvicinate;
+        nel caso siano specificati dei file_type, sono salvate solo le tabelle di questi ultimi
+
+        :param wait: se True, attende il termine della scrittura
+        :param after_save: funzione chiamata dopo il salvataggio di tutte le tabelle richieste
+        """
+        with self._lock:
+            file_types = file_types or tuple(self._tables.keys())
+            for i, file_type in enumerate(file_types):
+                # le tabelle in memoria non sono mai modificate, non serve copiarle;
+                # le tabelle sono scritte in ordine, la funzione è associata all'ultima
+                self._writer.schedule(file_type, self._tables[file_type],
+                                      after_save if i == len(file_types)-1 else None)
+        if wait:
+            self._writer.flush()
+
+    def flush(self, timeout:float=None) -> bool:
+        """
+        Attende il salvataggio delle tabelle modificate
+
+        :return: False nel caso il salvataggio non sia terminato entro il timeout
+        """
+        return self._writer.flush(timeout)
+
+    def close(self):
+        """Salva le tabelle modificate e termina il salvataggio in background"""
+        self._writer.close()
+        atexit.unregister(self._writer.close)
+
+    def _export_report(self):
+        """Se richiesto dai config, esporta le tabelle in memoria nel report excel"""
+        if not ConfigCache.app_configs.excel_report or self._store.name == "excel":
+            # nel caso del backend excel, il report coincide con le tabelle salvate
+            return
+        # il report non deve precedere le tabelle salvate; dal thread di salvataggio non attende
+        self._writer.flush()
         try:
-            with pd.ExcelWriter(ConfigCache.app_configs.indexes_file) as writer:
-                for file_type, table in self._tables.items():
-                    table.to_excel(writer, sheet_name=file_type, index=False)
+            # copia del dizionario senza lock: il report è esportato anche dal thread di salvataggio,
+            # che non deve attendere le operazioni sulle tabelle
+            export_excel_report(ConfigCache.app_configs.data_dir, dict(self._tables))
         except Exception as e:
-            raise Exception("Errore nel salvataggio delle tabelle") from e
-        print("Salvataggio riuscito")
+            print(f"Errore nell'esportazione del report excel: {e}")
+
+    @staticmethod
+    def _share(df:pd.DataFrame) -> pd.DataFrame:
+        """
+        Ritorna una copia della tabella che può essere modificata senza modificare l'originale:
+        con il copy-on-write di pandas attivo la copia condivide i dati con l'originale,
+        che sono copiati solo alla prima modifica; altrimenti la copia è completa
+        """
+        return df.copy(deep=pd.get_option("mode.copy_on_write") is not True)
 
     def get(self, file_type:str) -> pd.DataFrame:
-        """Ritorna una copia della tabella del file_type specificato"""
-        return self._tables[file_type].copy()
+        """
+        Ritorna una copia della tabella del file_type specificato.
+
+        Con il copy-on-write di pandas attivo, la copia condivide i dati con la tabella
+        in memoria, e li copia solo nel caso venga modificata
+        """
+        with self._lock:
+            return self._share(self._tables[file_type])
+
+    def snapshot(self, file_type:str) -> tuple[pd.DataFrame, int]:
+        """
+        Ritorna una copia della tabella del file_type specificato (vedi get),
+        insieme alla sua versione, lette insieme
+        """
+        with self._lock:
+            return self._share(self._tables[file_type]), self.version(file_type)
 
     # noinspection PyIncorrectDocstring
     def group_df(self,
@@ -70,67 +247,234 @@ class TablesCache:
         :param only_df: Boolean, se True ritorna il solo df raggruppato, altrimenti anche
             la lista delle colonne da nascondere
         """
-        if file_type not in self._tables:
-            raise ValueError(f"File type {file_type} non esistente in memoria")
+        df_out, cols_to_hide = self._grouped_view(file_type, grouping_feature)
+
+        if only_df:
+            return self._share(df_out)
+
+        return self._share(df_out), list(cols_to_hide)
 
-        if grouping_feature not in self._tables[file_type].columns:
+    def _grouped_view(self, file_type:str, grouping_feature:str) -> tuple[pd.DataFrame, list[str]]:
+        """
+        Ritorna la tabella raggruppata e le colonne da nascondere, prendendole dalla cache
+        dei raggruppamenti se calcolate sulla versione corrente della tabella.
+        La tabella ritornata è condivisa, e non va modificata
+        """
+        with self._lock:
+            if file_type not in self._tables:
+                raise ValueError(f"File type {file_type} non esistente in memoria")
+            df = self._tables[file_type]
+            version = self.version(file_type)
+            cached = self._grouped.get((file_type, grouping_feature))
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+
+        if grouping_feature not in df.columns:
             raise ValueError(
                 f"La feature di raggruppamento {grouping_feature} non appare tra quelle supportate"
             )
 
-        df:pd.DataFrame = self.get(file_type)
+        df_out, cols_to_hide = self._group_table(file_type, df, grouping_feature)
+
+        with self._lock:
+            # una tabella aggiornata durante il calcolo non va sovrascritta con un raggruppamento vecchio
+            if self.version(file_type) == version:
+                self._grouped[(file_type, grouping_feature)] = (version, df_out, cols_to_hide)
+        return df_out, cols_to_hide
 
+    def _group_table(self, file_type:str, df:pd.DataFrame, grouping_feature:str) -> tuple[pd.DataFrame, list[str]]:
+        """
+        Raggruppa la tabella passata secondo la feature specificata, senza modificarla.
+
+        I gruppi sono identificati da codici interi, ricavati colonna per colonna con pd.factorize,
+        e ordinati per prima apparizione nella tabella
+        """
         # ricavo le colonne da nascondere
         cols_to_hide = set(self.cols_to_hide(df))
         cols_to_hide.add(grouping_feature)
 
-        # Costruisco chiave del gruppo
+        # codice del gruppo di ogni riga, combinando i codici delle colonne; dopo ogni colonna i codici
+        # sono ricompattati, in modo da restare minori del numero di righe
         group_cols = [col for col in df.columns if col not in cols_to_hide and "aff_" not in col]
-        df["group_key"] = df[group_cols].astype(str).agg("_".join, axis=1)
+        group_ids = np.zeros(len(df), dtype=np.int64)
+        for col in group_cols:
+            codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+            group_ids, _ = pd.factorize(group_ids * len(uniques) + codes)
 
-        # Raggruppo
-        groups = df.groupby("group_key")
-
-        # Prendo una riga per gruppo
-        df_out = groups.first().reset_index(drop=True)
+        # Raggruppo, prendendo una riga per gruppo
+        _, first_rows = np.unique(group_ids, return_index=True)
+        df_out = df.iloc[first_rows].reset_index(drop=True)
 
         # raggruppo gli indirizzi dei file del gruppo in un'unica stringa
-        df_out["file_path"] = groups["file_path"].agg(lambda x: "#".join(map(str, x))).values
+        order = np.argsort(group_ids, kind="stable")
+        bounds = np.flatnonzero(np.diff(group_ids[order])) + 1
+        paths = df["file_path"].astype(str).to_numpy()[order]
+        df_out["file_path"] = ["#".join(group_paths) for group_paths in np.split(paths, bounds)] if len(df) else []
 
         # Calcolo medie delle colonne affinità se presenti
         if ConfigCache.files_configs[file_type].targets_presents:
-            for curve in ConfigCache.files_configs[file_type].allowed_curves:
-                aff_col = f"aff_{curve}"
-                if aff_col in df.columns:
-                    df_out[aff_col] = groups[aff_col].mean().values
-            df_out = self.add_overall_aff(df_out)
-
-        if only_df:
-            return df_out
+            aff_cols = [f"aff_{curve}" for curve in ConfigCache.files_configs[file_type].allowed_curves
+                        if f"aff_{curve}" in df.columns]
+            if aff_cols:
+                df_out[aff_cols] = df[aff_cols].groupby(group_ids).mean().to_numpy()
+            # l'affinità complessiva è ricalcolata dalle medie del gruppo, non presa dal primo file
+            df_out = self.add_overall_aff(df_out.drop(columns="aff_tot", errors="ignore"))
 
         return df_out, list(cols_to_hide)
 
-    def calculate_affinities(self, file_type:str) -> pd.DataFrame:
+    def index(self, file_type:str) -> TableIndex:
+        """
+        Ritorna gli indici per colonna della versione corrente della tabella del file_type,
+        creandoli alla prima richiesta; gli indici delle singole colonne sono costruiti
+        alla loro prima interrogazione
+        """
+        with self._lock:
+            if file_type not in self._tables:
+                raise ValueError(f"File type {file_type} non esistente in memoria")
+            version = self.version(file_type)
+            cached = self._indexes.get(file_type)
+            if cached is None or cached[0] != version:
+                cached = (version, TableIndex(self._tables[file_type]))
+                self._indexes[file_type] = cached
+            return cached[1]
+
+    def query(self,
+              file_type:str,
+              filters:dict[str,object]=None,
+              sort:list[str]=None,
+              columns:list[str]=None,
+              limit:int=None,
+              offset:int=0) -> pd.DataFrame:
+        """
+        Seleziona le righe della tabella del file_type che soddisfano i filtri, tramite gli indici
+        per colonna, senza scorrere tutte le righe.
+
+        Es. query("IDVD", {"TrapDistr":"exponential", "Vgf":{">=":-2, "<=":2}}, sort=["-aff_tot"])
+
+        :param filters: dizionario {colonna:condizione}, dove la condizione è un valore, una lista
+            di valori ammessi, o un dizionario di estremi {">", ">=", "<", "<=":valore} (vedi TableIndex)
+        :param sort: colonne di ordinamento, precedute da "-" per l'ordinamento decrescente
+        :param columns: colonne da ritornare, di default tutte
+        :param limit: numero massimo di righe da ritornare, di default tutte
+        :param offset: numero di righe da saltare, dopo l'ordinamento
+        :return: copia copy-on-write delle righe selezionate, con l'indice della tabella
+        """
+        index = self.index(file_type)
+        positions = index.select(filters, sort)
+        positions = positions[offset:None if limit is None else offset+limit]
+        df = index.df if columns is None else index.df[list(columns)]
+        return df.iloc[positions]
+
+    def rows_block(self, file_type:str, request:dict, grouping_feature:str=None) -> dict:
+        """
+        Risponde a una richiesta di righe del row model infinite delle AgGrid della tabella
+        del file_type, ordinando e filtrando la tabella sul server.
+
+        Per la tabella non raggruppata, le posizioni delle righe filtrate e ordinate sono
+        calcolate tramite gli indici della tabella alla prima richiesta, e salvate per la versione
+        della tabella, in modo che i blocchi successivi siano solo intervalli delle posizioni
+
+        :param request: getRowsRequest della AgGrid
+        :param grouping_feature: se specificata, le righe sono prese dalla tabella raggruppata
+            secondo questa feature
+        :return: getRowsResponse, con le sole righe del blocco richiesto e il numero totale di righe
+        """
+        if grouping_feature:
+            df, _ = self._grouped_view(file_type, grouping_feature)
+            return rows_block(df, request)
+
+        request = request or {}
+        index, positions = self._row_order(file_type, request.get("filterModel"), request.get("sortModel"))
+        start, end = block_bounds(request)
+        return {"rowData": index.df.iloc[positions[start:end]].to_dict("records"), "rowCount": len(positions)}
+
+    def _row_order(self,
+                   file_type:str,
+                   filter_model:dict[str,dict]=None,
+                   sort_model:list[dict]=None) -> tuple[TableIndex, np.ndarray]:
+        """
+        Ritorna gli indici della tabella del file_type e le posizioni delle righe che soddisfano
+        il filterModel, ordinate secondo il sortModel di una AgGrid.
+
+        I filtri di uguaglianza e di intervallo sono risolti dagli indici, gli altri sono verificati
+        sulle sole righe selezionate; le posizioni sono salvate per le ultime ROW_ORDERS_SIZE richieste
+        """
+        with self._lock:
+            index = self.index(file_type)
+            key = (file_type, self.version(file_type),
+                   json.dumps(filter_model or {}, sort_keys=True), json.dumps(sort_model or []))
+            if key in self._row_orders:
+                self._row_orders.move_to_end(key)
+                return index, self._row_orders[key]
+
+        columns = set(index.df.columns)
+        filters, remaining = {}, {}
+        for col, column_filter in (filter_model or {}).items():
+            if col not in columns:
+                continue
+            condition = index_condition(index, col, column_filter)
+            if condition is None:
+                remaining[col] = column_filter
+            else:
+                filters[col] = condition
+        sort = index_sort(sort_model, columns)
+
+        positions = index.select(filters, sort)
+        if remaining:
+            positions = positions[filter_mask(index.df.iloc[positions], remaining)]
+
+        with self._lock:
+            self._row_orders[key] = positions
+            while len(self._row_orders) > ROW_ORDERS_SIZE:
+                self._row_orders.popitem(last=False)
+        return index, positions
+
+    def calculate_affinities(self, file_type:str, full:bool=False, progress=None) -> pd.DataFrame:
         """Dato un file_type, calcola le affinità delle
-        curve indicizzate nella relativa tabella"""
+        curve indicizzate nella relativa tabella
+
+        Sono ricalcolate solo le affinità dei file nuovi, o il cui contenuto o target è cambiato
+        dall'ultimo calcolo, a meno che non sia richiesto il ricalcolo completo
 
-        df:pd.DataFrame = self._tables[file_type]
+        :param full: se True, ricalcola le affinità di tutti i file
+        :param progress: funzione chiamata periodicamente con la frazione di file processati,
+            usata dai job in background
+        """
 
-        feature_cols = [col for col in df.columns if "aff_" not in col]
+        df, version = self.snapshot(file_type)
 
-        # carico il df in un'istanza FileCurves, in modo da calcolarmi le affinità
-        data = FileCurves.from_df(df[feature_cols])
+        # il manifest è salvato solo dopo la tabella: attendo i salvataggi in attesa,
+        # in modo da leggere il manifest dell'ultimo calcolo
+        self._writer.flush()
 
-        # calcolo la overall affinity, se presente, e salvo il nuovo df in memoria
-        df = self.add_overall_aff(
-            pd.DataFrame(data.calculate_affinities(autosave=True))
+        # calcolo le affinità dei soli file cambiati, e la overall affinity, se presente
+        df, n_computed, save_manifest = update_affinities(
+            file_type, df, ConfigCache.app_configs.data_dir, full, progress
         )
-        df.loc[:,'file_path'] = df['file_path'].astype(str)
+        print(f"Affinità calcolate per {n_computed} file su {len(df)}")
+        if not n_computed:
+            # la tabella non cambia, il manifest non registra affinità non salvate
+            save_manifest()
+            return df
+
+        # la overall affinity è ricalcolata dalle sole affinità delle curve, non da quella precedente
+        df = self.add_overall_aff(df)
+
+        with self._lock:
+            if self.version(file_type) != version:
+                # la tabella è stata aggiornata dal watcher durante il calcolo, riporto le affinità
+                # sulle righe correnti; i file nuovi restano senza affinità
+                aff_cols = [col for col in df.columns if "aff_" in col]
+                df = self._tables[file_type].drop(columns=aff_cols, errors="ignore").merge(
+                    df[["file_path", *aff_cols]], on="file_path", how="left"
+                )
 
-        self._tables[file_type] = df.copy()
+            # il df ritornato al chiamante non deve condividere i dati modificabili con la tabella
+            self._tables[file_type] = self._share(df)
+            self._bump_version(file_type)
 
-        # salvo il nuovo df in memoria
-        self._save_tables()
+            # salvo il nuovo df in memoria, e il manifest delle affinità solo dopo la tabella
+            self._save_tables(file_type, after_save=save_manifest)
 
         return df
 
@@ -151,9 +495,10 @@ class TablesCache:
     def add_overall_aff(df: pd.DataFrame) -> pd.DataFrame:
         """
         Se il df contiene delle colonne di affinità, crea una colonna delle loro medie di riga,
-        con nome "aff_tot", altrimenti ritorna il df senza modifiche
+        con nome "aff_tot", altrimenti ritorna il df senza modifiche.
+        Una colonna "aff_tot" già presente è sostituita, senza entrare nella media
         """
-        aff_cols = [col for col in df.columns if "aff_" in col]
+        aff_cols = [col for col in df.columns if "aff_" in col and col != "aff_tot"]
 
         if not aff_cols:
             return df
@@ -170,8 +515,12 @@ class TablesCache:
 
     @staticmethod
     def index_data_dir():
-        """Richiama la funzione di indicizzazione sulla directory dei dati"""
-        indexer(ConfigCache.app_configs.data_dir)
+        """
+        Richiama la funzione di indicizzazione sulla directory dei dati
+
+        :return: i cambiamenti apportati alle tabelle, per file_type
+        """
+        return indexer(ConfigCache.app_configs.data_dir)
 
     @staticmethod
     def explode_group_paths(string: str):
@@ -299,7 +648,7 @@ class SingleTabCache:
 
         self._x_vals = vals
         self._figs["samples"] = None
-        self._figs["sample+t"] = None
+        self._figs["samples+t"] = None
 
     @property
     def label(self):
@@ -331,6 +680,24 @@ class SingleTabCache:
             raise ValueError("I dati sulla figura usata all'interno del tab non sono corretti")
         return self
 
+    def samples_table(self) -> pd.DataFrame:
+        """
+        Ritorna la tabella dei sub-samples delle curve del tab, alle ascisse caricate nell'istanza,
+        con quelli delle curve target se visualizzate, distinti dalla colonna target
+        """
+        if not self._x_vals:
+            raise ValueError("Non sono state specificate ascisse nell'istanza")
+
+        # noinspection PyProtectedMember
+        data:FileCurves = self._figure._curves
+        out = data.sample(*self._x_vals)
+        out.insert(0, "target", False)
+        if "+t" in self._used and ConfigCache.files_configs[self.file_type].targets_presents:
+            targets = data.sample(*self._x_vals, targets=True)
+            targets.insert(0, "target", True)
+            out = pd.concat([out, targets], ignore_index=True)
+        return out
+
     def switch_target(self):
         """
         Metodo per scambiate la figura utilizzata tra con valori target e senza
@@ -437,12 +804,63 @@ class OpenTabsCache:
         if paths_val not in self._tabs:
             raise ValueError(f"Il tab {paths_val} non compare tra quelli aperti")
         return self._tabs[paths_val].save_figure()
+    def samples_table(self, paths_val: str) -> pd.DataFrame:
+        """Ritorna la tabella dei sub-samples del tab relativo a paths_val"""
+        if paths_val not in self._tabs:
+            raise ValueError(f"Il tab {paths_val} non compare tra quelli aperti")
+        return self._tabs[paths_val].samples_table()
 
     def close_all_tabs(self):
         """Elimina tutti i tab aperti dalla memoria"""
         self._tabs = {}
 
 
+class DataDirWatcher(threading.Thread):
+    """
+    Thread che controlla periodicamente la directory dei dati, confrontando dimensione e
+    data di modifica dei file, e che in caso di cambiamenti aggiorna in modo incrementale
+    le tabelle della cache passata, senza riavviare l'applicazione.
+
+    La cache viene letta ad ogni controllo, in modo da seguire le sue ricostruzioni
+    """
+    def __init__(self, cache:"AppCache", interval:float=None):
+        super().__init__(name="data-dir-watcher", daemon=True)
+        self.cache = cache
+        self.interval:float = interval or ConfigCache.app_configs.watch_interval
+        self._stop_event = threading.Event()
+        self._snapshot:tuple[Path, dict] = (None, {})
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # un errore su un file in scrittura non deve fermare il monitoraggio
+                print(f"Errore nell'aggiornamento delle tabelle: {e}")
+
+    def check(self) -> dict[str, dict[str, list[str]]]:
+        """
+        Confronta lo stato della directory dei dati con quello del controllo precedente,
+        e solo in caso di differenze aggiorna le tabelle
+
+        :return: i cambiamenti apportati alle tabelle, per file_type
+        """
+        data_dir = ConfigCache.app_configs.data_dir
+        snapshot = (data_dir, scan_data_dir(data_dir))
+        if snapshot == self._snapshot:
+            return {}
+
+        changes = self.cache.tables.update()
+        self._snapshot = snapshot
+        if changes:
+            print(f"Tabelle aggiornate: {', '.join(changes)}")
+        return changes
+
+    def stop(self):
+        """Ferma il thread al termine del controllo in corso"""
+        self._stop_event.set()
+
+
 class AppCache(ConfigCache):
     """
     La classe si occupa di contenere le istanze di tutte le classi di cache mem.
@@ -452,6 +870,12 @@ class AppCache(ConfigCache):
 
     open_tabs = {file_type:OpenTabsCache(file_type) for file_type in ConfigCache.file_types}
 
+    watcher:DataDirWatcher = None
+    warehouse_sync:Job = None
+
+    # operazioni lunghe eseguite in background, come il calcolo delle affinità
+    jobs = JobsManager()
+
     @property
     def present_file_types(self):
         """Ritorna un set contenenti file_types per cui è stato possibile leggere i dati"""
@@ -460,11 +884,35 @@ class AppCache(ConfigCache):
     def refresh(self):
         """Richiama le operazioni di aggiornamento sugli attributi della classe"""
 
+        # la nuova cache rilegge le tabelle salvate, che devono contenere le ultime modifiche
+        self.tables.close()
         self.tables = TablesCache()
 
         for tabs in self.open_tabs.values():
             tabs.close_all_tabs()
 
+    def start_watcher(self):
+        """
+        Avvia, se non già attivo, il thread che aggiorna le tabelle
+        al cambiamento dei file nella directory dei dati
+        """
+        if self.watcher is None or not self.watcher.is_alive():
+            self.watcher = DataDirWatcher(self)
+            self.watcher.start()
+
+    def start_warehouse_sync(self):
+        """
+        Avvia, se non già in corso, l'aggiornamento in background dei magazzini delle curve,
+        in un thread dedicato che non occupa i posti del pool dei job.
+        Fino al termine le curve sono lette dai .csv
+        """
+        if self.warehouse_sync is None or self.warehouse_sync.finished:
+            self.warehouse_sync = self.jobs.run_detached(self.tables.sync_warehouses, name="warehouse-sync")
+
+    def table_versions(self) -> dict[str,int]:
+        """Ritorna le versioni correnti delle tabelle, per file_type"""
+        return {file_type:self.tables.version(file_type) for file_type in self.file_types}
+
     @staticmethod
     def explode_group_paths(string: str):
         """
@@ -0,0 +1,146 @@
+"""
+Il modulo implementa l'esecuzione in background delle operazioni più lunghe dell'applicazione,
+come il calcolo delle affinità, in modo che le callback di Dash non restino bloccate fino
+al loro termine.
+
+Ogni operazione è eseguita come un job in un pool di thread locale, identificato da un id,
+di cui le pagine possono leggere periodicamente lo stato e l'avanzamento, e che può essere
+annullato durante l'esecuzione
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing_extensions import Any, Callable
+
+
+## PARAMS ##
+JOB_TTL = 600       # secondi dopo i quali un job terminato e mai letto viene eliminato dalla memoria
+
+
+## CLASSES ##
+class JobCancelled(Exception):
+    """Eccezione sollevata all'interno di un job annullato, al primo aggiornamento dell'avanzamento"""
+
+
+class Job:
+    """
+    Operazione eseguita in background.
+
+    La funzione del job riceve il parametro progress, una funzione da chiamare con la
+    frazione completata (tra 0 e 1), che solleva JobCancelled nel caso il job sia stato annullato
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+    def __init__(self, func:Callable, *args, **kwargs):
+        self.id:str = uuid.uuid4().hex
+        self.status:str = self.PENDING
+        self.progress:float = 0
+        self.result:Any = None
+        self.error:str = None
+        self.finished_at:float = None
+
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._cancel_event = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        """Ritorna True se il job è terminato, con successo o meno"""
+        return self.status in (self.DONE, self.CANCELLED, self.FAILED)
+
+    def report(self, fraction:float):
+        """Aggiorna l'avanzamento del job, interrompendolo se è stato annullato"""
+        if self._cancel_event.is_set():
+            raise JobCancelled(f"Job {self.id} annullato")
+        self.progress = min(max(fraction, 0), 1) * 100
+
+    def cancel(self):
+        """Richiede l'annullamento del job, che si interromperà al prossimo aggiornamento"""
+        self._cancel_event.set()
+
+    def run(self):
+        """Esegue la funzione del job, salvandone il risultato o l'errore"""
+        try:
+            # un job annullato prima dell'avvio non viene eseguito
+            self.report(0)
+            self.status = self.RUNNING
+            self.result = self._func(*self._args, progress=self.report, **self._kwargs)
+        except JobCancelled:
+            self.status = self.CANCELLED
+        except Exception as e:
+            self.error = str(e)
+            self.status = self.FAILED
+            print(f"Errore nel job {self.id}: {e}")
+        else:
+            self.progress = 100
+            self.status = self.DONE
+        finally:
+            self.finished_at = time.monotonic()
+
+
+class JobsManager:
+    """
+    Esegue i job in un pool di thread e li mantiene in memoria fino alla lettura del risultato,
+    o al più per ttl secondi dal loro termine se il risultato non viene mai letto
+    """
+    def __init__(self, max_workers:int=2, ttl:float=JOB_TTL):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs:dict[str,Job] = {}
+        self._lock = threading.Lock()
+        self._ttl = ttl
+
+    def _evict(self):
+        """Elimina i job terminati da più di ttl secondi, da chiamare con il lock acquisito"""
+        now = time.monotonic()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.finished_at is not None and now - job.finished_at > self._ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, func:Callable, *args, **kwargs) -> Job:
+        """Avvia in background la funzione passata, ritornando il job creato"""
+        job = Job(func, *args, **kwargs)
+        with self._lock:
+            self._evict()
+            self._jobs[job.id] = job
+        self._pool.submit(job.run)
+        return job
+
+    def run_detached(self, func:Callable, *args, name:str="job-detached", **kwargs) -> Job:
+        """
+        Avvia la funzione passata in un thread dedicato, al di fuori del pool, in modo che le
+        operazioni di servizio (es. la sincronizzazione dei magazzini delle curve all'avvio)
+        non occupino i posti riservati ai job richiesti dalle pagine.
+        Il job ritornato non viene registrato tra quelli consultabili tramite id
+        """
+        job = Job(func, *args, **kwargs)
+        threading.Thread(target=job.run, name=name, daemon=True).start()
+        return job
+
+    def get(self, job_id:str) -> Job|None:
+        """Ritorna il job con l'id specificato, o None se non esiste"""
+        with self._lock:
+            self._evict()
+            return self._jobs.get(job_id)
+
+    def pop(self, job_id:str) -> Job|None:
+        """Ritorna il job con l'id specificato, eliminandolo dalla memoria se terminato"""
+        with self._lock:
+            self._evict()
+            job = self._jobs.get(job_id)
+            if job is not None and job.finished:
+                del self._jobs[job_id]
+            return job
+
+    def cancel(self, job_id:str):
+        """Richiede l'annullamento del job con l'id specificato, se esiste"""
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
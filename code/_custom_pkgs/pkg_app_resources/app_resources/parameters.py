@@ -22,7 +22,22 @@ class AppConfigs:
                 "export_format": "png",
                 "legend": True,
                 "colors": True,
-                "DPI": 150,}
+                "DPI": 150,
+                "index_backend": "parquet",
+                "excel_report": False,
+                "index_workers": 0,
+                "watch_data_dir": False,
+                "watch_interval": 2,
+                # il magazzino delle curve rende superflua la cache su disco dei singoli file,
+                # attivarle entrambe salverebbe le coordinate di ogni .csv due volte
+                "curve_cache": False,
+                "curve_cache_mb": 512,
+                "load_workers": 8,
+                "load_pool": "thread",
+                "interp_backend": "interp1d",
+                "curve_dtype": "float64",
+                "curve_warehouse": True,
+                "save_delay": 1,}
 
     def __init__(self):
         self._all:dict = self.load_configs()
@@ -56,11 +71,66 @@ class AppConfigs:
     def dpi(self)->int:
         """Ritorna la risoluzione impostata per i grafici"""
         return int(self._all["DPI"])
+    @property
+    def index_backend(self)->str:
+        """Ritorna il backend di salvataggio delle tabelle di indicizzazione ("parquet" o "excel")"""
+        return str(self._all.get("index_backend", self.defaults["index_backend"]))
+    @property
+    def excel_report(self)->bool:
+        """Ritorna bool, se le tabelle di indicizzazione sono esportate anche nel report excel"""
+        return self._all.get("excel_report", self.defaults["excel_report"]) in (True, "True")
+    @property
+    def index_workers(self)->int:
+        """Ritorna il numero di processi usati per l'indicizzazione (0 per usare tutti i core)"""
+        return int(self._all.get("index_workers", self.defaults["index_workers"]))
+    @property
+    def watch_data_dir(self)->bool:
+        """Ritorna bool, se la directory dei dati è monitorata per aggiornare le tabelle senza riavvii"""
+        return self._all.get("watch_data_dir", self.defaults["watch_data_dir"]) in (True, "True")
+    @property
+    def watch_interval(self)->float:
+        """Ritorna l'intervallo in secondi tra due controlli della directory dei dati"""
+        return float(self._all.get("watch_interval", self.defaults["watch_interval"]))
+    @property
+    def curve_cache(self)->bool:
+        """
+        Ritorna bool, se le curve lette dai file .csv sono salvate nella cache su disco;
+        disattivata di default, in alternativa al magazzino delle curve (vedi curve_warehouse)
+        """
+        return self._all.get("curve_cache", self.defaults["curve_cache"]) in (True, "True")
+    @property
+    def curve_cache_mb(self)->float:
+        """Ritorna la memoria massima, in MB, occupabile dalle curve caricate in memoria"""
+        return float(self._all.get("curve_cache_mb", self.defaults["curve_cache_mb"]))
+    @property
+    def load_workers(self)->int:
+        """Ritorna il numero di file .csv letti in parallelo (1 per la lettura sequenziale)"""
+        return int(self._all.get("load_workers", self.defaults["load_workers"]))
+    @property
+    def load_pool(self)->str:
+        """Ritorna il tipo di pool usato per la lettura parallela dei file ("thread" o "process")"""
+        return str(self._all.get("load_pool", self.defaults["load_pool"]))
+    @property
+    def interp_backend(self)->str:
+        """Ritorna il tipo di funzione di interpolazione delle curve ("interp1d" o "spline")"""
+        return str(self._all.get("interp_backend", self.defaults["interp_backend"]))
+    @property
+    def curve_dtype(self)->str:
+        """Ritorna il tipo di dato delle coordinate delle curve in memoria ("float64" o "float32")"""
+        return str(self._all.get("curve_dtype", self.defaults["curve_dtype"]))
+    @property
+    def curve_warehouse(self)->bool:
+        """Ritorna bool, se le curve di ogni file_type sono raccolte nel magazzino su disco"""
+        return self._all.get("curve_warehouse", self.defaults["curve_warehouse"]) in (True, "True")
+    @property
+    def save_delay(self)->float:
+        """Ritorna l'attesa in secondi prima del salvataggio delle tabelle modificate, in cui le modifiche sono raggruppate"""
+        return float(self._all.get("save_delay", self.defaults["save_delay"]))
 
     # derived
     @property
     def indexes_file(self)->Path:
-        """Ritorna l'indirizzo del file di indicizzazione"""
+        """Ritorna l'indirizzo del file excel di indicizzazione, usato come report"""
         return self.data_dir / 'indexes.xlsx'
 
     # APP CONFIGS SETTERS
@@ -85,6 +155,45 @@ class AppConfigs:
     @dpi.setter
     def dpi(self, val):
         self._all["DPI"] = str(val)
+    @index_backend.setter
+    def index_backend(self, val):
+        self._all["index_backend"] = str(val)
+    @excel_report.setter
+    def excel_report(self, val):
+        self._all["excel_report"] = str(val)
+    @index_workers.setter
+    def index_workers(self, val):
+        self._all["index_workers"] = str(val)
+    @watch_data_dir.setter
+    def watch_data_dir(self, val):
+        self._all["watch_data_dir"] = str(val)
+    @watch_interval.setter
+    def watch_interval(self, val):
+        self._all["watch_interval"] = str(val)
+    @curve_cache.setter
+    def curve_cache(self, val):
+        self._all["curve_cache"] = str(val)
+    @curve_cache_mb.setter
+    def curve_cache_mb(self, val):
+        self._all["curve_cache_mb"] = str(val)
+    @load_workers.setter
+    def load_workers(self, val):
+        self._all["load_workers"] = str(val)
+    @load_pool.setter
+    def load_pool(self, val):
+        self._all["load_pool"] = str(val)
+    @interp_backend.setter
+    def interp_backend(self, val):
+        self._all["interp_backend"] = str(val)
+    @curve_dtype.setter
+    def curve_dtype(self, val):
+        self._all["curve_dtype"] = str(val)
+    @curve_warehouse.setter
+    def curve_warehouse(self, val):
+        self._all["curve_warehouse"] = str(val)
+    @save_delay.setter
+    def save_delay(self, val):
+        self._all["save_delay"] = str(val)
 
     def save_all(self):
         """Salva la configurazione aggiornata"""
@@ -165,7 +274,6 @@ class FileConfigs:
                 "headerName": "",
                 "field": "selection",
                 "checkboxSelection": True,
-                "headerCheckboxSelection": True,
                 "width": 40,
                 "maxWidth": 40,
                 "suppressSizeToFit": True,
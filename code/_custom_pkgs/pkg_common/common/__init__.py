@@ -1,5 +1,10 @@
 from .classes import FileCurves
 from .indexer import indexer
+from .index_store import get_index_store, export_excel_report, IndexWriter
+from .affinity import batch_affinities, update_affinities
+from .warehouse import CurveWarehouse
+from .row_model import rows_block
+from .table_index import TableIndex
 from .plot import plot_tab, CustomFigure
 
-__all__ = ['FileCurves', 'indexer', 'plot_tab', 'CustomFigure']
\ No newline at end of file
+__all__ = ['FileCurves', 'indexer', 'get_index_store', 'export_excel_report', 'IndexWriter', 'batch_affinities', 'update_affinities', 'CurveWarehouse', 'rows_block', 'TableIndex', 'plot_tab', 'CustomFigure']
\ No newline at end of file
@@ -0,0 +1,280 @@
+"""
+Il modulo implementa il calcolo delle affinità di tutti i file di una tabella di indicizzazione
+in blocco.
+
+Le coordinate delle curve di tutti i file sono concatenate, per curva, in array unici, presi
+dal magazzino delle curve del file_type se attivo, in modo che gli integrali di tutte
+le curve siano calcolati con poche operazioni vettoriali. I file sono
+poi raggruppati per target, i cui integrali sono calcolati una sola volta dall'indice dei target,
+e le affinità di tutti i file sono ricavate con un'unica operazione per curva.
+
+Le affinità calcolate sono registrate, in un manifest nella directory dei dati, insieme
+alle impronte (data di modifica e dimensione) del file e del suo target, e alle curve
+di cui non è stato possibile calcolare l'affinità, in modo che i calcoli successivi debbano
+processare solo i file il cui contenuto o target è cambiato, o le cui affinità sono state
+perse (ad esempio dopo la ricostruzione della tabella).
+
+Il manifest deve essere salvato dopo la tabella contenente le affinità, in modo che non
+registri mai affinità non salvate
+"""
+
+import os
+import json
+from pathlib import Path
+from typing_extensions import Callable
+import numpy as np
+import pandas as pd
+from common.classes import FileCurves, FilesFeatures, TargetIndex
+from common.curve_cache import CURVES_CACHE
+from common.warehouse import CurveWarehouse
+from app_resources.parameters import ConfigCache
+
+
+## PARAMS ##
+AFFINITY_MANIFEST_FILE_NAME = "affinities_manifest.json"
+
+
+## HELPER FUNC ##
+def file_coordinates(file_path:str|Path) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """
+    Ritorna le coordinate delle curve del file, prendendole dalla cache in memoria se presenti,
+    senza costruire le curve e le loro funzioni di interpolazione
+    """
+    key = FileCurves.file_key(file_path)
+    curves = CURVES_CACHE.get(file_path, key)
+    if curves is not None:
+        return {name:(curve.X, curve.Y) for name,curve in curves.items()}
+    return FileCurves.load_coordinates(file_path, key)
+
+def pack_curves(paths:list[str|Path],
+                curve_names:list[str],
+                progress:Callable[[float],None]=None) -> dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Carica le curve dei file passati, concatenandone le coordinate per curva.
+
+    :param progress: funzione chiamata periodicamente con la frazione di file caricati
+
+    :return: dizionario {curve_acronym:(X, Y, offsets)}, dove le coordinate della curva del
+        file i sono X[offsets[i]:offsets[i+1]]; i file che non contengono la curva hanno un
+        segmento vuoto
+    """
+    xs = {name:[] for name in curve_names}
+    ys = {name:[] for name in curve_names}
+    lengths = {name:np.zeros(len(paths), dtype=np.int64) for name in curve_names}
+
+    step = max(len(paths)//100, 1)
+    for i, path in enumerate(paths):
+        if progress is not None and i % step == 0:
+            progress(i/len(paths))
+        for name, (x, y) in file_coordinates(path).items():
+            if name in xs:
+                xs[name].append(x)
+                ys[name].append(y)
+                lengths[name][i] = len(x)
+
+    out = {}
+    for name in curve_names:
+        offsets = np.zeros(len(paths)+1, dtype=np.int64)
+        np.cumsum(lengths[name], out=offsets[1:])
+        out[name] = (
+            np.concatenate(xs[name]) if xs[name] else np.empty(0),
+            np.concatenate(ys[name]) if ys[name] else np.empty(0),
+            offsets,
+        )
+    return out
+
+def packed_integrals(x:np.ndarray, y:np.ndarray, offsets:np.ndarray) -> np.ndarray:
+    """
+    Integra con il metodo dei trapezi tutte le curve concatenate in x, y.
+
+    :return: array degli integrali delle curve, NaN per i segmenti vuoti
+    """
+    n_curves = len(offsets)-1
+    out = np.full(n_curves, np.nan)
+    if x.size == 0:
+        return out
+
+    # trapezi tra punti consecutivi, con uno zero in coda per avere un'area per ogni punto
+    areas = np.zeros(x.size)
+    areas[:-1] = np.diff(x) * (y[1:] + y[:-1]) / 2
+    # annullo i trapezi a cavallo tra l'ultimo punto di una curva e il primo della successiva
+    bounds = offsets[1:-1] - 1
+    areas[bounds[bounds >= 0]] = 0
+
+    not_empty = np.flatnonzero(np.diff(offsets) > 0)
+    out[not_empty] = np.add.reduceat(areas, offsets[not_empty])
+    return out
+
+
+def load_affinity_manifest(manifest_file:Path) -> dict:
+    """
+    Carica il manifest delle affinità calcolate, del tipo
+    {file_type:{"curves":[...], "files":{file_path:[source_fp, target_fp, curve_vuote]}}},
+    dove curve_vuote sono le curve la cui affinità calcolata è NaN.
+
+    Nel caso il file non esista o non sia leggibile, ritorna un manifest vuoto
+    """
+    try:
+        with open(manifest_file, 'r', encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def save_affinity_manifest(manifest:dict, manifest_file:Path):
+    """
+    Salva il manifest delle affinità nella directory dei dati, in un file temporaneo
+    poi rinominato, in modo che un'interruzione non lasci un manifest scritto a metà
+    """
+    tmp_file = manifest_file.with_name(f"{manifest_file.stem}.{os.getpid()}.tmp")
+    with open(tmp_file, 'w', encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_file, manifest_file)
+
+def source_fingerprints(paths:list[str]) -> list[str|None]:
+    """Ritorna le impronte (data di modifica e dimensione) dei file passati, None per i file assenti"""
+    out = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            out.append(None)
+        else:
+            out.append(f"{stat.st_mtime_ns}-{stat.st_size}")
+    return out
+
+def target_fingerprints(targets:TargetIndex, df:pd.DataFrame) -> list[str|None]:
+    """Ritorna le impronte dei target dei file della tabella, None per i file senza target"""
+    by_key = {}
+    out = []
+    for record in df.to_dict("records"):
+        key = targets.key(record)
+        if key not in by_key:
+            try:
+                by_key[key] = targets.fingerprint(record)
+            except FileNotFoundError:
+                by_key[key] = None
+        out.append(by_key[key])
+    return out
+
+
+## MAIN FUNC ##
+def batch_affinities(file_type:str,
+                     df:pd.DataFrame,
+                     progress:Callable[[float],None]=None) -> pd.DataFrame:
+    """
+    Calcola le affinità di tutti i file della tabella passata rispetto alle rispettive curve target.
+
+    :param df: tabella di indicizzazione, o una sua parte, contenente le feature dei file
+    :param progress: funzione chiamata periodicamente con la frazione di file processati
+    :return: df con le colonne "aff_<curve_acronym>", con lo stesso indice della tabella passata;
+        le affinità delle curve assenti nel file o nel target sono NaN
+    """
+    type_configs = FilesFeatures.get_type_configs(file_type)
+    if not type_configs.targets_presents:
+        raise ValueError(f"I file {file_type} non supportano il calcolo delle affinità")
+
+    curve_names = list(type_configs.allowed_curves)
+    out = pd.DataFrame(np.nan, index=df.index, columns=[f"aff_{name}" for name in curve_names])
+    if df.empty:
+        return out
+
+    # raggruppo i file per target, caricando e integrando ogni target una sola volta
+    targets = TargetIndex.for_type(file_type)
+    records = df.to_dict("records")
+    keys = [targets.key(record) for record in records]
+    # primo file di ogni target, usato per trovarlo nell'indice
+    first_records = {}
+    for key, record in zip(keys, records):
+        first_records.setdefault(key, record)
+    key_ids = {key:i for i, key in enumerate(first_records)}
+    target_rows = np.array([key_ids[key] for key in keys], dtype=np.int64)
+
+    target_integrals = np.full((len(first_records), len(curve_names)), np.nan)
+    for i, record in enumerate(first_records.values()):
+        _, integrals = targets.get(record)
+        target_integrals[i] = [integrals.get(name, np.nan) for name in curve_names]
+
+    paths = df["file_path"].tolist()
+    if ConfigCache.app_configs.curve_warehouse:
+        warehouse = CurveWarehouse.for_type(file_type, paths, progress)
+        packed = {name:warehouse.packed(paths, name) for name in curve_names}
+    else:
+        packed = pack_curves(paths, curve_names, progress)
+
+    for j, name in enumerate(curve_names):
+        integrals = packed_integrals(*packed[name])
+        target_areas = target_integrals[target_rows, j]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[f"aff_{name}"] = np.maximum(1 - np.abs(integrals-target_areas)/np.abs(target_areas), 0)
+
+    return out
+
+
+def update_affinities(file_type:str,
+                      df:pd.DataFrame,
+                      data_directory:str|Path,
+                      full:bool=False,
+                      progress:Callable[[float],None]=None) -> tuple[pd.DataFrame, int, Callable[[],None]]:
+    """
+    Aggiorna le affinità della tabella passata, ricalcolando solo le righe dei file nuovi,
+    il cui contenuto o target è cambiato dall'ultimo calcolo, o con affinità vuote
+    non registrate nel manifest.
+
+    Il manifest non è salvato dalla funzione, che ritorna la funzione che lo salva,
+    da chiamare solo dopo aver salvato la tabella aggiornata
+
+    :param df: tabella di indicizzazione del file_type
+    :param data_directory: directory dei dati, in cui è salvato il manifest
+    :param full: se True, ricalcola le affinità di tutte le righe
+    :param progress: funzione chiamata periodicamente con la frazione di righe da ricalcolare processate
+    :return: copia della tabella con le colonne "aff_<curve_acronym>" aggiornate,
+        il numero di righe ricalcolate, e la funzione che salva il manifest aggiornato
+    """
+    manifest_file = Path(data_directory) / AFFINITY_MANIFEST_FILE_NAME
+    manifest = load_affinity_manifest(manifest_file)
+
+    curve_names = list(FilesFeatures.get_type_configs(file_type).allowed_curves)
+    aff_cols = [f"aff_{name}" for name in curve_names]
+
+    type_manifest = manifest.get(file_type, {})
+    # le affinità calcolate con curve diverse da quelle correnti vanno ricalcolate
+    old_files = type_manifest.get("files", {}) if type_manifest.get("curves") == curve_names else {}
+
+    df = df.copy()
+    for col in aff_cols:
+        if col not in df.columns:
+            df[col] = np.nan
+
+    paths = df["file_path"].astype(str).tolist()
+    fingerprints = list(zip(source_fingerprints(paths),
+                            target_fingerprints(TargetIndex.for_type(file_type), df)))
+
+    # affinità vuote non registrate come tali nel manifest, ad esempio dopo una reindicizzazione
+    recorded = [set(old_files[path][2]) if len(old_files.get(path, [])) > 2 else set() for path in paths]
+    expected_empty = np.array([[name in names for name in curve_names] for names in recorded], dtype=bool)
+    unexpected_empty = df[aff_cols].isna().to_numpy() & ~expected_empty.reshape(len(paths), len(curve_names))
+
+    to_compute = np.array(
+        [full or old_files.get(path, [])[:2] != list(fp) for path, fp in zip(paths, fingerprints)],
+        dtype=bool
+    ) | unexpected_empty.any(axis=1)
+    if to_compute.any():
+        feature_cols = [col for col in df.columns if "aff_" not in col]
+        df.loc[to_compute, aff_cols] = batch_affinities(
+            file_type, df.loc[to_compute, feature_cols], progress
+        ).to_numpy()
+
+    # registro solo i file presenti nella tabella, eliminando quelli non più indicizzati
+    empty = df[aff_cols].isna().to_numpy()
+    manifest[file_type] = {
+        "curves": curve_names,
+        "files": {
+            path:[*fp, [name for name, is_empty in zip(curve_names, row) if is_empty]]
+            for path, fp, row in zip(paths, fingerprints, empty)
+        },
+    }
+
+    def save():
+        save_affinity_manifest(manifest, manifest_file)
+
+    return df, int(to_compute.sum()), save
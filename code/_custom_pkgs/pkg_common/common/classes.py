@@ -3,14 +3,22 @@ Il modulo contiene le classi principali utilizzate dall'applicazione per la gest
 manipolazione e presentazione dei dati
 """
 
+import os
+import threading
+import zlib
 from pathlib import Path
 import copy
-from typing_extensions import Any, Generator
-from scipy.interpolate import interp1d
+import importlib.util
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing_extensions import Any, Generator, Iterable
+from scipy.interpolate import interp1d, make_interp_spline
 import numpy as np
 import pandas as pd
 from app_resources.parameters import ConfigCache
 from common.PlotterConfigs import PlotterConfigs
+from common.curve_cache import (CURVES_CACHE, NORMALIZATION_VERSION, file_key,
+                                load_cached_curves, save_cached_curves)
 
 ## CLASSES ##
 class FilesFeatures:
@@ -46,19 +54,15 @@ class FilesFeatures:
 
         inst = cls()
         inst.file_type = cls.extract_features(Path(args[0]), only_file_type=True)
-        for arg in set(args):
 
-            if not Path(arg).exists():
-                raise FileNotFoundError(f'file {arg} non trovato!')
+        # elimino i duplicati mantenendo l'ordine
+        paths = list(dict.fromkeys(str(arg) for arg in args))
+        for path in paths:
+            if not Path(path).exists():
+                raise FileNotFoundError(f'file {path} non trovato!')
 
-            file_type, data = cls.extract_features(arg)
-
-            if file_type != inst.file_type:
-                raise ValueError(
-                    f"Il file {arg} non è dello stesso tipo dei precedenti ({inst.file_type})"
-                )
-
-            inst._data.append(data)
+        df = FeaturesParser.for_type(inst.file_type).parse(paths)
+        inst._data = cls._records(df)
 
         if grouping_feature:
             inst.grouped_by = grouping_feature
@@ -84,12 +88,11 @@ class FilesFeatures:
             raise KeyError("Colonna file_path inesistente") from e
 
         # controllo che la colonna file_type contenga un solo valore
-        if len(
-                {FilesFeatures.extract_features(file_path, only_file_type=True) for file_path in file_path_col}
-        ) != 1:
+        file_types = set(FeaturesParser.file_types(file_path_col))
+        if len(file_types) != 1:
             raise ValueError("I file passati non sono parte dello stesso file_type")
 
-        file_type = FilesFeatures.extract_features(file_path_col[0], only_file_type=True)
+        file_type = file_types.pop()
 
         type_configs = FilesFeatures.get_type_configs(file_type)
 
@@ -101,7 +104,8 @@ class FilesFeatures:
                 """)
 
         try:
-            df.loc[:,"file_path"] = df["file_path"].apply(lambda p: Path(p))
+            # la colonna è sostituita e non modificata, il df passato può essere condiviso
+            df = df.assign(file_path=df["file_path"].apply(lambda p: Path(p)))
         except Exception as e:
             raise ValueError(
                 "Non è stato possibile convertire in indirizzi la colonna file_path del dataframe"
@@ -270,6 +274,16 @@ class FilesFeatures:
 
         return file_type, dict_features
     @staticmethod
+    def _records(df:pd.DataFrame) -> list[dict[str,Any]]:
+        """
+        Converte un df di feature nella lista di dizionari salvata nell'istanza,
+        con i valori mancanti a None e i file_path come oggetti Path
+        """
+        records = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+        for record in records:
+            record["file_path"] = Path(record["file_path"])
+        return records
+    @staticmethod
     def get_type_configs(file_type:str):
         """Ritorna i parametri di configurazione dei file con file_type specificato"""
         try:
@@ -290,6 +304,152 @@ class FilesFeatures:
         return "/".join(features)
 
 
+class FeaturesParser:
+    """
+    Parser delle feature contenute nei nomi dei file di un certo file_type.
+
+    Viene costruito una sola volta per file_type, a partire dalle AllowedFeatures dei config,
+    e analizza intere colonne di indirizzi con operazioni vettoriali: i nomi sono divisi in token
+    un'unica volta, e per ogni feature vengono cercate in blocco le posizioni dei token uguali
+    al nome della feature, il cui valore è il token successivo
+    """
+    __slots__ = ('file_type', 'features')
+    _parsers:dict[str,"FeaturesParser"] = {}
+
+    # rimuove la cartella e l'estensione dall'indirizzo, lasciando lo stem del file
+    _stem_pattern = r'^.*[\\/]|\.[^.\\/]*$'
+    _use_arrow = importlib.util.find_spec("pyarrow") is not None
+
+    def __init__(self, file_type:str):
+        self.file_type:str = file_type
+        self.features:dict[str,str] = dict(FilesFeatures.get_type_configs(file_type).allowed_features)
+
+    @classmethod
+    def for_type(cls, file_type:str) -> "FeaturesParser":
+        """Ritorna il parser del file_type specificato, costruendolo solo alla prima richiesta"""
+        if file_type not in cls._parsers:
+            cls._parsers[file_type] = cls(file_type)
+        return cls._parsers[file_type]
+
+    @classmethod
+    def _tokenize(cls, paths:list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Divide gli stem dei file nei token separati da '_'
+
+        :return: l'array di tutti i token, uno di seguito all'altro, e l'array degli
+            offset, tale che i token del file i siano tokens[offsets[i]:offsets[i+1]]
+        """
+        if cls._use_arrow:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+            stems = pc.replace_substring_regex(pa.array(paths, type=pa.string()), cls._stem_pattern, "")
+            lists = pc.split_pattern(stems, "_")
+            return (pc.list_flatten(lists).to_numpy(zero_copy_only=False),
+                    lists.offsets.to_numpy())
+
+        lists = pd.Series(paths, dtype=object).str.replace(cls._stem_pattern, "", regex=True).str.split("_")
+        offsets = np.zeros(len(paths)+1, dtype=np.int64)
+        np.cumsum(lists.str.len().to_numpy(), out=offsets[1:])
+        tokens = np.empty(offsets[-1], dtype=object)
+        tokens[:] = [token for tokens_list in lists for token in tokens_list]
+        return tokens, offsets
+
+    @classmethod
+    def file_types(cls, paths:Iterable[str|Path]) -> np.ndarray:
+        """Ritorna l'array dei file_type (primo token dello stem) dei file passati"""
+        paths = [str(p) for p in paths]
+        tokens, offsets = cls._tokenize(paths)
+        return tokens[offsets[:-1]]
+
+    @classmethod
+    def parse_by_type(cls, paths:Iterable[str|Path]) -> dict[str, pd.DataFrame]:
+        """
+        Divide i file passati secondo il loro file_type, ignorando quelli non supportati,
+        e ne estrae le feature.
+
+        :return: dizionario {file_type:df}, dove ogni df ha come colonne le AllowedFeatures
+            del file_type
+        """
+        paths = [str(p) for p in paths]
+        tokens, offsets = cls._tokenize(paths)
+        types = tokens[offsets[:-1]]
+
+        return {
+            file_type:cls.for_type(file_type)._build(paths, tokens, offsets, np.flatnonzero(types==file_type))
+            for file_type in set(types) & ConfigCache.file_types
+        }
+
+    def parse(self, paths:Iterable[str|Path]) -> pd.DataFrame:
+        """
+        Estrae le feature dei file passati, che devono essere tutti del file_type del parser
+
+        :return: df con le AllowedFeatures del file_type come colonne, tipizzate secondo i config;
+            la colonna file_path contiene gli indirizzi passati come stringhe
+        """
+        paths = [str(p) for p in paths]
+        tokens, offsets = self._tokenize(paths)
+        types = tokens[offsets[:-1]]
+
+        wrong_type = np.flatnonzero(types != self.file_type)
+        if wrong_type.size:
+            raise ValueError(
+                f"Il file {paths[wrong_type[0]]} non è del tipo {self.file_type}"
+            )
+
+        return self._build(paths, tokens, offsets, np.arange(len(paths)))
+
+    def _build(self, paths:list[str], tokens:np.ndarray, offsets:np.ndarray, rows:np.ndarray) -> pd.DataFrame:
+        """Costruisce il df delle feature dei file di indice rows, dati i token di tutti i file"""
+        # riga di appartenenza di ogni token
+        parents = np.repeat(np.arange(len(offsets)-1), np.diff(offsets))
+        in_rows = np.zeros(len(offsets)-1, dtype=bool)
+        in_rows[rows] = True
+
+        out = {}
+        for feature, f_type in self.features.items():
+            if feature == "file_path":
+                out[feature] = np.asarray(paths, dtype=object)[rows]
+                continue
+
+            # token uguali al nome della feature, seguiti da un token dello stesso file
+            idx = np.flatnonzero(tokens == feature)
+            idx = idx[idx+1 < len(tokens)]
+            idx = idx[(parents[idx+1] == parents[idx]) & in_rows[parents[idx]]]
+            # per ogni file considero solo la prima occorrenza della feature
+            feature_rows, first = np.unique(parents[idx], return_index=True)
+
+            values = np.full(len(rows), None, dtype=object)
+            values[np.searchsorted(rows, feature_rows)] = tokens[idx[first]+1]
+
+            out[feature] = values if f_type == 'text' else self._to_numeric(
+                values, f_type, feature, np.asarray(paths, dtype=object)[rows]
+            )
+
+        return pd.DataFrame(out, columns=list(self.features.keys()))
+
+    @staticmethod
+    def _to_numeric(values:np.ndarray, f_type:str, feature:str, paths:np.ndarray) -> pd.Series:
+        """
+        Converte i valori di una feature numerica, arrotondandoli alla seconda cifra decimale.
+
+        Solleva ValueError, indicando i file coinvolti, nel caso dei valori non vuoti non siano numeri
+        """
+        values = pd.Series(values)
+        numbers = pd.to_numeric(values, errors="coerce")
+
+        malformed = np.flatnonzero(numbers.isna().to_numpy() & (values.fillna("").astype(str) != "").to_numpy())
+        if malformed.size:
+            examples = ", ".join(f"{paths[i]} ({values[i]})" for i in malformed[:5])
+            raise ValueError(
+                f"Impossibile convertire in numero la feature {feature} di {malformed.size} file: {examples}"
+            )
+
+        numbers = numbers.round(2)
+        if f_type == "integer" and (numbers.dropna() % 1 == 0).all():
+            return numbers.astype("Int64")
+        return numbers
+
+
 class Curve:
     """
     Identifica una singola curva
@@ -298,18 +458,25 @@ class Curve:
     :type name: str
     """
 
+    __slots__ = ('name', '_xy', '_f_cubic', '_interp_func')
+
     # noinspection PyTypeChecker
     def __init__(self, name:str):
         self.name:str = name
-        self.X: np.ndarray = None
-        self.Y: np.ndarray = None
+        # coordinate della curva, righe X e Y di un unico array 2xN,
+        # eventualmente vista del blocco di tutte le curve del file
+        self._xy: np.ndarray = None
+        # funzione di interpolazione, creata al primo utilizzo
         self._f_cubic = None
+        self._interp_func:bool = True
     def __str__(self):
         return self.name
     def __copy__(self):
         inst_copy = type(self)(self.name)
-        inst_copy.X = self.X.copy() if self.X is not None else None
-        inst_copy.Y = self.Y.copy() if self.Y is not None else None
+        inst_copy._xy = np.array(self._xy) if self._xy is not None else None
+        # la funzione di interpolazione non viene modificata, può essere condivisa
+        inst_copy._f_cubic = self._f_cubic
+        inst_copy._interp_func = self._interp_func
         return inst_copy
 
     @classmethod
@@ -317,16 +484,63 @@ class Curve:
                X:np.ndarray[float],
                Y:np.ndarray[float],
                interp_func=True):
-        if len(X) != len(Y):
-            raise ValueError("Le liste delle coordinate X e Y devono avere la stessa lunghezza")
+        return cls.create_many([(name, X, Y)], interp_func=interp_func)[0]
+    @classmethod
+    def create_many(cls,
+                    coordinates:Iterable[tuple[str, np.ndarray, np.ndarray]],
+                    interp_func=True) -> list["Curve"]:
+        """
+        Crea più curve, salvandone le coordinate in un unico array 2xN, di cui ogni
+        curva mantiene una vista, con il tipo di dato impostato nei config (curve_dtype)
 
-        out = cls(name)
-        out.X, out.Y = X, Y
-        out._sort(interp_func=interp_func)
+        :param coordinates: tuple (nome, X, Y) delle curve da creare
+        """
+        coordinates = list(coordinates)
+        for _, x, y in coordinates:
+            if len(x) != len(y):
+                raise ValueError("Le liste delle coordinate X e Y devono avere la stessa lunghezza")
+
+        offsets = np.zeros(len(coordinates)+1, dtype=np.int64)
+        np.cumsum([len(x) for _, x, _ in coordinates], out=offsets[1:])
+        block = np.empty((2, offsets[-1]), dtype=ConfigCache.app_configs.curve_dtype)
+
+        out = []
+        for (name, x, y), start, end in zip(coordinates, offsets[:-1], offsets[1:]):
+            block[0, start:end], block[1, start:end] = x, y
+            curve = cls(name)
+            curve._xy = block[:, start:end]
+            curve._sort(interp_func=interp_func)
+            out.append(curve)
+        return out
+    @classmethod
+    def from_view(cls, name:str, xy:np.ndarray) -> "Curve":
+        """
+        Crea una curva dalle coordinate, già ordinate, di un array 2xN, senza copiarle.
 
+        Se l'array è in sola lettura, come le viste del magazzino delle curve, le coordinate
+        sono copiate solo alla prima modifica della curva (copy-on-write)
+        """
+        out = cls(name)
+        out._xy = xy
         return out
 
     @property
+    def X(self) -> np.ndarray:
+        """Ritorna le ascisse della curva"""
+        return self._xy[0] if self._xy is not None else None
+    @X.setter
+    def X(self, values:np.ndarray):
+        self._writable_xy()[0] = values
+        self._f_cubic = None
+    @property
+    def Y(self) -> np.ndarray:
+        """Ritorna le ordinate della curva"""
+        return self._xy[1] if self._xy is not None else None
+    @Y.setter
+    def Y(self, values:np.ndarray):
+        self._writable_xy()[1] = values
+        self._f_cubic = None
+    @property
     def y_scale(self):
         """Ritorna la scala delle ordinate della curva"""
         return self.get_data_scale(self.Y)
@@ -342,29 +556,69 @@ class Curve:
     def x_limits(self):
         """Ritorna la tupla x_min,x_max"""
         return min(self.X),max(self.X)
+    @property
+    def nbytes(self)->int:
+        """
+        Ritorna la memoria occupata dagli array della curva e della sua funzione di interpolazione, se creata.
+        Le coordinate mappate da disco, condivise tramite la cache del sistema operativo, non sono contate
+        """
+        out = self._xy.nbytes if self._xy is not None and not isinstance(self._xy, np.memmap) else 0
+        if self._f_cubic is not None:
+            # interp1d mantiene una copia delle coordinate, oltre alla spline
+            spline = getattr(self._f_cubic, "_spline", self._f_cubic)
+            arrays = (getattr(self._f_cubic, "x", None), getattr(self._f_cubic, "y", None),
+                      getattr(spline, "t", None), getattr(spline, "c", None))
+            out += sum(arr.nbytes for arr in arrays if arr is not None)
+        return out
+    @property
+    def f_cubic(self):
+        """
+        Ritorna la funzione di interpolazione cubica della curva, creandola al primo utilizzo.
+
+        Il tipo di funzione dipende dal config interp_backend: "interp1d" per scipy interp1d,
+        "spline" per la BSpline equivalente di make_interp_spline, più rapida da valutare
+        """
+        if self._f_cubic is None:
+            if not self._interp_func:
+                raise AttributeError(f"Non è stata creata una funzione di interpolazione per la curva {self.name}")
+            if ConfigCache.app_configs.interp_backend == "spline":
+                self._f_cubic = make_interp_spline(self.X, self.Y, k=3)
+            else:
+                self._f_cubic = interp1d(self.X, self.Y, kind='cubic')
+        return self._f_cubic
 
     def _sort(self, interp_func=True)->None:   #
         """
         Ordina gli array delle coordinate in modo crescente, rispetto alle ordinate
 
-        Crea in più l'attributo _f_cubic, ossia la funzione di interpolazione usata
-        per calcolare ordinate della curva.
+        Se interp_func è False, la curva non potrà creare una funzione di interpolazione;
+        altrimenti la funzione è creata al primo utilizzo, vedi f_cubic
         """
         i_sorted = np.argsort(self.X)
-        self.X = self.X[i_sorted]
-        self.Y = self.Y[i_sorted]
-        if interp_func:
-            self._f_cubic = interp1d(self.X, self.Y, kind='cubic')
+        # riordino sul posto, le coordinate possono essere una vista del blocco del file
+        self._xy[:] = self._xy[:, i_sorted]
+        self._interp_func = interp_func
+        self._f_cubic = None
+    def _writable_xy(self) -> np.ndarray:
+        """Ritorna le coordinate modificabili della curva, copiandole se in sola lettura"""
+        if not self._xy.flags.writeable:
+            self._xy = np.array(self._xy)
+        return self._xy
     def integral_affinity(self, curve:'Curve')->float:
         """calcola il rapporto di affinità tra l'istanza e un'altra curva"""
-        target_area = curve.integral
+        return self.area_affinity(curve.integral)
+    def area_affinity(self, target_area:float)->float:
+        """calcola il rapporto di affinità tra l'integrale dell'istanza e quello, già calcolato, di una curva target"""
         return max(1-abs(self.integral-target_area)/abs(target_area),0)
     def translate_till_left(self):
         """
         Trasla la curva in modo che il valore più alto sia 0
         Utile per le curve di occupazione delle trappole, per avere la conduction band a 0
         """
-        self.X -= self.X[-1]
+        xy = self._writable_xy()
+        xy[0] -= xy[0, -1]
+        # la funzione di interpolazione, se creata, si riferisce alle ascisse precedenti
+        self._f_cubic = None
     def create_sub_sample(self, *x_vals:float)->"Curve":
         """
         Crea una nuova istanza di classe contenente i punti, relativi alle ascisse
@@ -373,19 +627,18 @@ class Curve:
         if not x_vals:
             raise ValueError("Immettere dei valori per le ascisse")
 
-        if not self._f_cubic:
-            raise AttributeError(f"Non è stata creata una funzione di interpolazione per la curva {self.name}")
+        f_cubic = self.f_cubic
 
         x_min, x_max = self.x_limits
         for x in x_vals:
             if not x_min <= x <= x_max:
                 raise ValueError(f"Immettere solo valori compresi tra {x_min} e {x_max} per la curva {self.name}")
 
-        y_vals = self._f_cubic(x_vals)
+        y_vals = f_cubic(x_vals)
 
         return self.create(
             self.name,
-            np.asarray(x_vals, dtype=float), self._f_cubic(x_vals), interp_func=False
+            np.asarray(x_vals, dtype=float), y_vals, interp_func=False
         )
 
     @staticmethod
@@ -398,6 +651,37 @@ class Curve:
         # esponente arrotondato alla decade (1e13 → 13)
         return exponent
     @staticmethod
+    def evaluate_many(curves:Iterable["Curve"], x_vals:Iterable[float])->np.ndarray:
+        """
+        Valuta le funzioni di interpolazione di più curve su più ascisse.
+
+        Le curve con le stesse ascisse sono interpolate da un'unica spline a più colonne,
+        creata e valutata una sola volta per tutto il gruppo; le altre curve sono valutate
+        ognuna con la propria funzione di interpolazione
+
+        :return: array di dimensione (numero di curve, numero di ascisse), con NaN
+            per le ascisse esterne ai limiti di ciascuna curva
+        """
+        curves = list(curves)
+        x_vals = np.asarray(x_vals, dtype=float)
+        out = np.full((len(curves), x_vals.size), np.nan)
+
+        groups:dict[bytes, list[int]] = {}
+        for i, curve in enumerate(curves):
+            groups.setdefault(curve.X.tobytes(), []).append(i)
+
+        for rows in groups.values():
+            x = curves[rows[0]].X
+            inside = (x_vals >= x[0]) & (x_vals <= x[-1])
+            if not inside.any():
+                continue
+            if len(rows) == 1:
+                out[rows[0], inside] = curves[rows[0]].f_cubic(x_vals[inside])
+            else:
+                spline = make_interp_spline(x, np.column_stack([curves[i].Y for i in rows]), k=3)
+                out[np.ix_(rows, np.flatnonzero(inside))] = spline(x_vals[inside]).T
+        return out
+    @staticmethod
     def get_curves_scales(*args:"Curve")->dict[str,float]:
         """
         Ritorna le scale di ordinate e ascisse del gruppo di curve passato come argomento
@@ -416,6 +700,11 @@ class FileCurves(FilesFeatures):
     Classe contenete i dati e le curve di un file dati o di un gruppo di file dati
     """
     __slots__ = ('file_type', '_data', 'grouped_by', '_curves', '_sub_samples')
+    # pool di lettura dei file, creati alla prima richiesta e riutilizzati, per tipo e numero di worker
+    _load_pools:dict[tuple[str,int], Executor] = {}
+    # parser dei .csv, quello multithread di pyarrow se installato
+    _csv_engine = "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "c"
+
     def __init__(self):
         super().__init__()
         self._curves:dict[str,dict[str,Curve]] = {}     #{'file_path':{'curva_name':Curve}}
@@ -529,54 +818,283 @@ class FileCurves(FilesFeatures):
             curves = self._curves.get(f["file_path"])
             yield f, curves
 
-    def import_all(self):
-        """importa i dati dei file contenuti nell'istanza, salvandoli nell'attributo curves"""
-        for path in self.paths:
+    def import_all(self, workers:int=None):
+        """
+        importa i dati dei file contenuti nell'istanza, salvandoli nell'attributo curves
+
+        I file non presenti nella cache in memoria sono letti in parallelo, da un pool di thread
+        o di processi come impostato nei config, mantenendo l'ordine dei file dell'istanza.
+        I file che non è possibile leggere dal magazzino delle curve sono letti dai .csv.
+        Gli errori di lettura dei singoli file sono raccolti e sollevati insieme,
+        al termine della lettura di tutti i file
+
+        :param workers: numero di file letti in parallelo; di default quello impostato nei config
+        """
+        paths = list(self.paths)
+        errors:dict[Path,Exception] = {}
+
+        keys = {}
+        for path in paths:
+            try:
+                keys[path] = self.file_key(path)
+            except Exception as e:
+                errors[path] = e
+
+        curves = {path:CURVES_CACHE.get(path, key) for path, key in keys.items()}
+        for path, file_curves in curves.items():
+            if file_curves is None:
+                try:
+                    curves[path] = self._mapped_curves(path, keys[path])
+                except Exception as e:
+                    # un errore del magazzino non blocca la lettura, il file è letto dal .csv
+                    print(f"Errore nella lettura di {Path(path).name} dal magazzino delle curve: {e}")
+        to_load = [path for path, file_curves in curves.items() if file_curves is None]
+        loaded = self.load_all_coordinates(to_load, [keys[path] for path in to_load], workers)
+        for path, (coordinates, error) in zip(to_load, loaded):
+            if error is not None:
+                errors[path] = error
+            else:
+                curves[path] = self._build_curves(path, keys[path], coordinates)
+
+        if errors:
+            raise Exception(
+                f"errore leggendo {len(errors)} file su {len(paths)}:\n\t"
+                + "\n\t".join(f"{path}: {error}" for path, error in errors.items())
+            ) from next(iter(errors.values()))
+
+        for path in paths:
             # noinspection PyTypeChecker
-            self._curves[path] = self.import_file_data(path)
+            self._curves[path] = dict(curves[path])
         return self
     def import_file_data(self, file_path:Path|str):
         """
         Importa i dati del file passato come variabile al metodo
         I dati sono presentati in seguito come un dizionario di oggetti Curve
+
+        Le curve sono prese dalla cache in memoria, se il file non è stato modificato dal
+        caricamento, o create come viste del magazzino delle curve, se lo contiene aggiornato;
+        altrimenti le coordinate pulite e ordinate sono lette dalla cache su disco,
+        se valida, o dal file .csv, e in questo caso salvate nella cache su disco.
+        Le curve, condivise tra le istanze, non vanno modificate
+        """
+        key = self.file_key(file_path)
+
+        curves:dict[str,Curve] = CURVES_CACHE.get(file_path, key)
+        if curves is None:
+            try:
+                curves = self._mapped_curves(file_path, key)
+            except Exception as e:
+                print(f"Errore nella lettura di {Path(file_path).name} dal magazzino delle curve: {e}")
+        if curves is None:
+            curves = self._build_curves(file_path, key, self.load_coordinates(file_path, key))
+
+        return dict(curves)
+    def _build_curves(self,
+                      file_path:Path|str,
+                      key:np.ndarray,
+                      coordinates:dict[str, tuple[np.ndarray, np.ndarray]]) -> dict[str,Curve]:
+        """Crea le curve del file a partire dalle coordinate lette, salvandole nella cache in memoria"""
+        allowed_curves = self.allowed_curves
+
+        names = []
+        for curve_name in coordinates:
+            if curve_name in allowed_curves:
+                names.append(curve_name)
+            else:
+                print(f"Errore: la curva {curve_name} non risulta contenuta nel file {file_path}")
+
+        # le coordinate di tutte le curve del file sono salvate in un unico array
+        curves = dict(zip(names, Curve.create_many(
+            (allowed_curves[name], *coordinates[name]) for name in names
+        )))
+
+        return self._finish_curves(file_path, key, curves)
+    def _mapped_curves(self, file_path:Path|str, key:np.ndarray) -> dict[str,Curve]|None:
+        """
+        Crea le curve del file come viste in sola lettura del magazzino delle curve,
+        senza copiarne le coordinate, salvandole nella cache in memoria
+
+        :return: le curve create, o None se il magazzino è disattivato, in aggiornamento
+            o non contiene il file aggiornato
         """
+        if not ConfigCache.app_configs.curve_warehouse:
+            return None
+        # import locale, il modulo warehouse importa questo modulo
+        from common.warehouse import CurveWarehouse
+
+        warehouse = CurveWarehouse.current(self.file_type)
+        if warehouse is None:
+            # durante l'aggiornamento del magazzino i file sono letti dai .csv
+            return None
+        views = warehouse.views(file_path, key)
+        if views is None:
+            return None
+
         allowed_curves = self.allowed_curves
-        curves:dict[str,Curve] = {}
+        curves = {name:Curve.from_view(allowed_curves[name], xy) for name, xy in views.items()}
+        return self._finish_curves(file_path, key, curves)
+    @staticmethod
+    def _finish_curves(file_path:Path|str, key:np.ndarray, curves:dict[str,Curve]) -> dict[str,Curve]:
+        """Salva le curve create nella cache in memoria"""
+        CURVES_CACHE.put(file_path, key, curves, sum(curve.nbytes for curve in curves.values()))
+
+        return curves
+    @classmethod
+    def load_all_coordinates(cls,
+                             paths:list[Path|str],
+                             keys:list[np.ndarray],
+                             workers:int=None) -> list[tuple[dict|None, Exception|None]]:
+        """
+        Legge le coordinate delle curve dei file passati, in parallelo se i file sono più di uno
+
+        :param keys: chiavi di validità dei file, nello stesso ordine
+        :param workers: numero di file letti in parallelo; di default quello impostato nei config
+        :return: lista di tuple (coordinate, errore), nello stesso ordine dei file passati
+        """
+        workers = ConfigCache.app_configs.load_workers if workers is None else workers
+        if workers <= 1 or len(paths) <= 1:
+            return [cls._load_coordinates_safe(path, key) for path, key in zip(paths, keys)]
+
+        pool = cls._load_pool(ConfigCache.app_configs.load_pool, workers)
+        chunk_size = max(len(paths) // (4*workers), 1)
+        return list(pool.map(cls._load_coordinates_safe, paths, keys, chunksize=chunk_size))
+    @classmethod
+    def _load_pool(cls, kind:str, workers:int) -> Executor:
+        """
+        Ritorna il pool di lettura dei file del tipo richiesto, "thread" o "process".
+
+        I processi sono avviati con spawn, che su Windows reimporta il modulo principale
+        dell'applicazione: il pool è creato una sola volta e riutilizzato
+        """
+        if (kind, workers) not in cls._load_pools:
+            if kind == "process":
+                pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            elif kind == "thread":
+                pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="load")
+            else:
+                raise ValueError(f"Tipo di pool di lettura {kind} non supportato")
+            cls._load_pools[(kind, workers)] = pool
+        return cls._load_pools[(kind, workers)]
+    @staticmethod
+    def _load_coordinates_safe(file_path:Path|str, key:np.ndarray) -> tuple[dict|None, Exception|None]:
+        """Legge le coordinate del file, ritornando l'errore invece di sollevarlo"""
+        try:
+            return FileCurves.load_coordinates(file_path, key), None
+        except Exception as e:
+            return None, e
+    @staticmethod
+    def file_key(file_path:Path|str) -> np.ndarray:
+        """
+        Ritorna la chiave di validità delle cache del file: data di modifica, dimensione
+        e tag della normalizzazione delle coordinate del suo file_type
+        """
+        file_type = Path(file_path).stem.split("_")[0]
         try:
-            data = pd.read_csv(file_path, na_values="-")
-            # data.replace("-", np.nan, inplace=True)
-            curves_file: set[str] = {
-                col.split(' ')[0] for col in data.columns
+            return file_key(file_path, FileCurves.normalization_tag(file_type))
+        except OSError as error:
+            raise Exception(f"errore leggendo il file {file_path}: \n\t{error}") from error
+    @classmethod
+    def load_coordinates(cls, file_path:Path|str, key:np.ndarray=None) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """
+        Ritorna le coordinate normalizzate delle curve del file, senza costruire le curve,
+        leggendole dalla cache su disco se valida, altrimenti dal file .csv, salvandole nella cache.
+        La normalizzazione è applicata una sola volta, alla lettura del .csv
+
+        :param key: chiave di validità del file, se già letta
+        :return: dizionario {curve_acronym:(X, Y)}
+        """
+        # la chiave è letta prima del file, in modo che una modifica durante la lettura invalidi la cache
+        key = cls.file_key(file_path) if key is None else key
+
+        coordinates = load_cached_curves(file_path, key)
+        if coordinates is None:
+            coordinates = cls.read_file_coordinates(
+                file_path, cls.read_curve_names(Path(file_path).stem.split("_")[0])
+            )
+            coordinates = cls.normalize_coordinates(file_path, coordinates)
+            save_cached_curves(file_path, coordinates, key)
+        return coordinates
+    @staticmethod
+    def normalization_tag(file_type:str) -> int:
+        """
+        Ritorna il tag della normalizzazione delle coordinate dei file del file_type:
+        la versione della normalizzazione, se le curve sono traslate (FinishAt0)
+        e le curve lette dal .csv
+        """
+        configs = PlotterConfigs.files_configs.get(file_type)
+        tag = NORMALIZATION_VERSION*2 + int(bool(configs and configs.plot_finishes_at_0))
+        # dal .csv sono lette solo le curve ammesse, che cambiandole invalidano le cache
+        curve_names = FileCurves.read_curve_names(file_type)
+        if curve_names is not None:
+            tag += zlib.crc32(",".join(sorted(curve_names)).encode()) << 8
+        return tag
+    @staticmethod
+    def normalize_coordinates(file_path:Path|str,
+                              coordinates:dict[str, tuple[np.ndarray, np.ndarray]]) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """
+        Applica alle coordinate lette, già pulite e ordinate, le trasformazioni del file_type del file:
+        per i file_type FinishAt0, le curve sono traslate in modo che l'ascissa più alta sia 0
+        (vedi Curve.translate_till_left)
+        """
+        configs = PlotterConfigs.files_configs.get(Path(file_path).stem.split("_")[0])
+        if not (configs and configs.plot_finishes_at_0):
+            return coordinates
+        return {name:(x - x[-1] if len(x) else x, y) for name, (x, y) in coordinates.items()}
+    @staticmethod
+    def read_curve_names(file_type:str) -> list[str]|None:
+        """
+        Ritorna gli acronimi delle curve da leggere dai file del file_type,
+        o None nel caso il file_type non sia configurato e vadano lette tutte
+        """
+        configs = ConfigCache.files_configs.get(file_type)
+        return list(configs.allowed_curves) if configs is not None else None
+    @staticmethod
+    def read_file_coordinates(file_path:Path|str,
+                              curve_names:Iterable[str]=None) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """
+        Legge il file .csv passato, e ritorna le coordinate delle curve contenute,
+        senza valori vuoti e ascisse duplicate, e ordinate per ascisse crescenti.
+
+        Sono lette solo le colonne delle curve richieste, con il parser di pyarrow,
+        multithread, se installato
+
+        :param curve_names: acronimi delle curve da leggere, di default tutte quelle del file
+        :return: dizionario {curve_acronym:(X, Y)}
+        """
+        try:
+            header = pd.read_csv(file_path, nrows=0).columns
+            curves_file: dict[str, None] = {
+                col.split(' ')[0]:None for col in header
             }  # [curve_name X/Y]
+            if curve_names is not None:
+                curve_names = set(curve_names)
+                curves_file = {name:None for name in curves_file if name in curve_names}
+            used_cols = [col for col in header if col.split(' ')[0] in curves_file]
+            if FileCurves._csv_engine == "pyarrow":
+                data = pd.read_csv(file_path, usecols=used_cols, na_values=["-"], engine="pyarrow")
+            else:
+                # round_trip legge i valori esatti, come pyarrow, in modo che i due parser coincidano
+                data = pd.read_csv(file_path, usecols=used_cols, na_values=["-"],
+                                   float_precision="round_trip")
         except Exception as error:
             raise Exception(f"errore leggendo il file {file_path}: \n\t{error}") from error
 
+        coordinates = {}
         for curve_name in curves_file:
-            if curve_name in allowed_curves:
-                x_col, y_col = f"{curve_name} X", f"{curve_name} Y"
-                if x_col in data.columns and y_col in data.columns:
-                    # elimino i valori vuoti
-                    cleaned_coordinates = data[[x_col, y_col]].dropna()
-                    # 'subset' indica di guardare solo i duplicati in x_col
-                    # 'keep=first' mantiene la prima riga trovata e cancella le altre
-                    cleaned_coordinates = cleaned_coordinates.drop_duplicates(subset=[x_col], keep='first')
-                    # creo e aggiungo la curva a curves
-                    curves[curve_name] = Curve.create(
-                        allowed_curves[curve_name],
-                        cleaned_coordinates[x_col].to_numpy(dtype=float),
-                        cleaned_coordinates[y_col].to_numpy(dtype=float)
-                    )
-                else:
-                    print(f"Errore: non sono state trovate entrambe le colonne {x_col}, {y_col} all'interno del file {file_path}")
+            x_col, y_col = f"{curve_name} X", f"{curve_name} Y"
+            if x_col in data.columns and y_col in data.columns:
+                x = data[x_col].to_numpy(dtype=float, na_value=np.nan)
+                y = data[y_col].to_numpy(dtype=float, na_value=np.nan)
+                # elimino i valori vuoti
+                not_empty = ~(np.isnan(x) | np.isnan(y))
+                x, y = x[not_empty], y[not_empty]
+                # np.unique ritorna le ascisse ordinate, con l'indice della loro prima occorrenza
+                _, i_first = np.unique(x, return_index=True)
+                coordinates[curve_name] = (x[i_first], y[i_first])
             else:
-                print(f"Errore: la curva {curve_name} non risulta contenuta nel file {file_path}")
-
-        # controllo se le curve debbano essere traslate a sinistra dell'asse y
-        if PlotterConfigs.files_configs[self.file_type].plot_finishes_at_0:
-            for curve in curves.values():
-                curve.translate_till_left()
+                print(f"Errore: non sono state trovate entrambe le colonne {x_col}, {y_col} all'interno del file {file_path}")
 
-        return curves
+        return coordinates
     def calculate_affinities(self, autosave=False):
         """
         Calcola le affinità delle curve contenute nei file definiti nell'istanza.
@@ -592,31 +1110,62 @@ class FileCurves(FilesFeatures):
             print("Questa tipologia di file non supporta il calcolo delle affinità")
             return None
 
-        # pylint disable:protected-access
-
-        if not autosave:
-            affinities = {}
-            for file_features,curves in self.expose_all:
-
-                affinities[file_features["file_path"]] = {}
-                target = self.find_target_file(self.file_type, file_features)
-
-                for name,curve in curves.items():
-                    target_path = target._data[0]["file_path"]
-                    affinities[file_features["file_path"]][name] = curve.integral_affinity(target._curves[target_path][name])
-
-            return affinities
+        # il target di ogni file è caricato e integrato una sola volta per tutti i file che lo condividono
+        targets = TargetIndex.for_type(self.file_type)
 
-        #else
+        affinities = {}
         for file_features,curves in self.expose_all:
 
-            target = self.find_target_file(self.file_type, file_features)
+            _, target_integrals = targets.get(file_features)
 
-            for name,curve in curves.items():
-                target_path = target._data[0]["file_path"]
-                file_features[f"aff_{name}"] = curve.integral_affinity(target._curves[target_path][name])
+            file_affinities = {
+                name:curve.area_affinity(target_integrals[name]) for name,curve in curves.items()
+            }
+            if autosave:
+                for name, affinity in file_affinities.items():
+                    file_features[f"aff_{name}"] = affinity
+            else:
+                affinities[file_features["file_path"]] = file_affinities
 
-        return self._data
+        return self._data if autosave else affinities
+    def sample(self, *x_vals:float, curves:Iterable[str]=None, targets:bool=False) -> pd.DataFrame:
+        """
+        Valuta le curve dei file dell'istanza alle ascisse richieste, in un'unica operazione
+        vettoriale per tutte le curve, tramite le loro funzioni di interpolazione
+
+        :param curves: acronimi delle curve da valutare, di default tutte
+        :param targets: se True, valuta le curve dei target dei file dell'istanza,
+            una sola volta per ogni target
+        :return: df con una riga per ogni curva e ascissa, e colonne
+            file_path, curve (acronimo), name (nome della curva), x, y;
+            y è NaN per le ascisse esterne ai limiti della curva
+        """
+        if not x_vals:
+            raise ValueError("Immettere dei valori per le ascisse")
+
+        if targets:
+            files = {}
+            for f_features in self._data:
+                files.update(self.find_target_file(self.file_type, f_features)._curves)
+        else:
+            files = self._curves
+
+        keys = []
+        to_sample = []
+        for path, f_curves in files.items():
+            for key, curve in f_curves.items():
+                if curves is None or key in curves:
+                    keys.append((str(path), key, curve.name))
+                    to_sample.append(curve)
+
+        x_vals = np.asarray(x_vals, dtype=float)
+        y_vals = Curve.evaluate_many(to_sample, x_vals)
+
+        keys = pd.DataFrame(keys, columns=["file_path", "curve", "name"])
+        out = keys.iloc[np.repeat(np.arange(len(keys)), x_vals.size)].reset_index(drop=True)
+        out["x"] = np.tile(x_vals, len(keys))
+        out["y"] = y_vals.ravel()
+        return out
 
     # noinspection PyTypeChecker
     def divide_in_groups(self, grouping_feat:str) -> Generator["FileCurves"]:
@@ -641,26 +1190,113 @@ class FileCurves(FilesFeatures):
     @staticmethod
     def find_target_file(file_type, file_features:dict):
         """Trova il file target corretto tra tutti quelli in cartella e ritorna un'istanza FileCurves contenente i dati"""
-        type_configs = FilesFeatures.get_type_configs(file_type)
+        return TargetIndex.for_type(file_type).get(file_features)[0]
 
-        target_dir = ConfigCache.app_configs.targets_dirs / file_type   # cartella file target
-        if not target_dir.exists():
-            raise FileNotFoundError(f"Cartella {str(target_dir)} non trovata")
 
-        target_files = target_dir.glob("*.csv")
+class TargetIndex:
+    """
+    Indice delle curve target di un file_type.
+
+    Associa ad ogni combinazione di valori delle TargetFeatures il file target corrispondente,
+    e mantiene in memoria i target già caricati con gli integrali delle loro curve, in modo
+    che ogni target sia letto e integrato una sola volta.
 
-        # costruisco i token da cercare nel nome del file target
-        target_features = [
-            f"{feature}_{file_features[feature]}" for feature in type_configs.target_features
+    L'indice di un file_type è costruito una sola volta, e ricostruito solo quando cambia la
+    data di modifica della cartella dei target, cioè quando vi sono aggiunti, eliminati o
+    rinominati dei file; le impronte dei target sono lette al momento della richiesta, e i
+    target modificati sono ricaricati
+    """
+    __slots__ = ('file_type', 'target_dir', 'target_features', '_dir_mtime', '_fingerprints', '_files', '_loaded')
+    _indexes:dict[str,"TargetIndex"] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, file_type:str):
+        self.file_type:str = file_type
+        self.target_features:list[str] = FilesFeatures.get_type_configs(file_type).target_features
+
+        self.target_dir:Path = ConfigCache.app_configs.targets_dirs / file_type   # cartella file target
+        if not self.target_dir.exists():
+            raise FileNotFoundError(f"Cartella {str(self.target_dir)} non trovata")
+        self._dir_mtime:int = os.stat(self.target_dir).st_mtime_ns
+
+        # un'unica stat per file, ottenuta insieme al listing della cartella
+        self._fingerprints:dict[str,str] = {}
+        files = []
+        with os.scandir(self.target_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".csv"):
+                    stat = entry.stat()
+                    self._fingerprints[entry.name] = f"{stat.st_mtime_ns}-{stat.st_size}"
+                    files.append(self.target_dir / entry.name)
+
+        # in caso di più target con le stesse feature, viene usato il primo in ordine alfabetico
+        files.sort()
+        df = FeaturesParser.parse_by_type(files).get(file_type, pd.DataFrame(columns=["file_path"]))
+        self._files:dict[tuple[str,...], Path] = {}
+        for row in df.to_dict("records"):
+            self._files.setdefault(self.key(row), Path(row["file_path"]))
+
+        self._loaded:dict[tuple[str,...], tuple[FileCurves, dict[str,float], str]] = {}
+
+    @classmethod
+    def for_type(cls, file_type:str) -> "TargetIndex":
+        """
+        Ritorna l'indice dei target del file_type, ricostruendolo solo se è cambiata
+        la cartella dei target, controllata con un'unica stat
+        """
+        with cls._lock:
+            index = cls._indexes.get(file_type)
+            target_dir = ConfigCache.app_configs.targets_dirs / file_type
+            if (index is None or index.target_dir != target_dir
+                    or index._dir_mtime != os.stat(target_dir).st_mtime_ns):
+                index = cls._indexes[file_type] = cls(file_type)
+            return index
+
+    def key(self, file_features:dict) -> tuple[str,...]:
+        """Ritorna la chiave del target relativo al file con le feature passate"""
+        return tuple(str(file_features.get(feature)) for feature in self.target_features)
+
+    def find(self, file_features:dict) -> Path:
+        """Ritorna l'indirizzo del file target relativo al file con le feature passate"""
+        t_file = self._files.get(self.key(file_features))
+        if t_file is not None:
+            return t_file
+
+        # nomi dei target non riconosciuti dal parser, cerco i token nel nome del file
+        target_tokens = [
+            f"{feature}_{file_features[feature]}" for feature in self.target_features
         ]
-        for t_file in target_files:
-            if all(token in t_file.stem for token in target_features):
-                print(f"Target file request. Using -> {t_file.name}\n")
-                return FileCurves.from_paths(t_file)
+        for t_file in sorted(self.target_dir.glob("*.csv")):
+            if all(token in t_file.stem for token in target_tokens):
+                return t_file
         raise FileNotFoundError(
-            f"Non è stato possibile trovare il file target per le curve del file {file_features["file_path"].stem}"
+            f"Non è stato possibile trovare il file target per le curve del file {Path(file_features["file_path"]).stem}"
         )
 
+    def fingerprint(self, file_features:dict) -> str:
+        """Ritorna l'impronta (data di modifica e dimensione) attuale del file target relativo al file con le feature passate"""
+        t_file = self.find(file_features)
+        stat = os.stat(t_file)
+        self._fingerprints[t_file.name] = f"{stat.st_mtime_ns}-{stat.st_size}"
+        return self._fingerprints[t_file.name]
+
+    def get(self, file_features:dict) -> tuple[FileCurves, dict[str,float]]:
+        """
+        Ritorna i dati del target relativo al file con le feature passate,
+        caricandoli solo alla prima richiesta, o se il file target è stato modificato
+
+        :return: istanza FileCurves del target e dizionario {curve_acronym:integrale}
+        """
+        key = self.key(file_features)
+        fingerprint = self.fingerprint(file_features)
+        if key not in self._loaded or self._loaded[key][2] != fingerprint:
+            t_file = self.find(file_features)
+            print(f"Target file request. Using -> {t_file.name}\n")
+            target = FileCurves.from_paths(t_file)
+            t_curves = next(iter(target._curves.values()))
+            self._loaded[key] = (target, {name:curve.integral for name,curve in t_curves.items()}, fingerprint)
+        return self._loaded[key][:2]
+
 
 if __name__ == '__main__':
-    print(PlotterConfigs.files_configs["IDVD"].plot_finishes_at_0)
\ No newline at end of file
+    print(PlotterConfigs.files_configs["IDVD"].plot_finishes_at_0)
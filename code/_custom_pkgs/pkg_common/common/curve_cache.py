@@ -0,0 +1,201 @@
+"""
+Il modulo implementa le cache delle curve lette dai file .csv: una cache su disco delle
+coordinate, e una cache in memoria, condivisa da tutto il processo, delle curve già caricate.
+
+Per ogni file .csv letto, le coordinate delle curve già normalizzate (senza valori vuoti e
+ascisse duplicate, ordinate e traslate per i file_type FinishAt0) sono salvate in un file .npz, nella cartella .curves_cache
+accanto al file originale. Ogni file della cache contiene dimensione e data di modifica
+del .csv da cui è stato creato, e la versione della normalizzazione applicata,
+in modo che una modifica del .csv o della normalizzazione invalidi automaticamente
+il corrispondente file della cache, e le letture successive non debbano rianalizzare il .csv.
+
+La cache in memoria mantiene le curve dei file usati più di recente, entro un limite di
+memoria impostato nei config, in modo che tab, esportazioni e calcolo delle affinità
+non debbano ricaricare più volte gli stessi file
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing_extensions import Any
+import numpy as np
+from app_resources.parameters import ConfigCache
+
+
+## PARAMS ##
+CACHE_DIR_NAME = ".curves_cache"
+# da incrementare nel caso cambi il formato dei dati salvati, invalida tutta la cache
+CACHE_VERSION = 2
+# da incrementare nel caso cambino le trasformazioni applicate alle coordinate lette dai .csv
+NORMALIZATION_VERSION = 1
+
+
+## CLASSES ##
+class CurvesLRUCache:
+    """
+    Cache in memoria delle curve caricate, per file, con politica LRU.
+
+    Ogni elemento è associato alla chiave di validità del file da cui è stato letto,
+    e viene ignorato se il file è stato modificato. Quando la memoria occupata dagli array
+    delle curve supera il budget, sono eliminati i file usati meno di recente
+    """
+    def __init__(self, budget_bytes:int=None):
+        self._budget_bytes = budget_bytes
+        self._entries:OrderedDict[str, tuple[tuple[int,...], Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes:int = 0
+        self.hits:int = 0
+        self.misses:int = 0
+        self.evictions:int = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def budget_bytes(self) -> int:
+        """Ritorna la memoria massima occupabile dalla cache, di default quella impostata nei config"""
+        if self._budget_bytes is None:
+            return int(ConfigCache.app_configs.curve_cache_mb * 2**20)
+        return self._budget_bytes
+    @property
+    def stats(self) -> dict[str,int]:
+        """Ritorna i contatori di utilizzo della cache"""
+        return {"entries": len(self), "nbytes": self.nbytes, "budget_bytes": self.budget_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def get(self, file_path:str|Path, key:np.ndarray) -> Any|None:
+        """Ritorna le curve salvate per il file, o None se assenti o non più valide"""
+        file_path = str(file_path)
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is None or entry[0] != tuple(key):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(file_path)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, file_path:str|Path, key:np.ndarray, curves:Any, nbytes:int):
+        """
+        Salva le curve del file, eliminando i file usati meno di recente
+        fino a rientrare nel budget di memoria
+
+        :param nbytes: memoria occupata dalle curve
+        """
+        file_path = str(file_path)
+        budget = self.budget_bytes
+        with self._lock:
+            self._pop(file_path)
+            if nbytes > budget:
+                return
+            self._entries[file_path] = (tuple(key), curves, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > budget:
+                _, (_, _, evicted_nbytes) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+                self.evictions += 1
+
+    def discard(self, *file_paths:str|Path):
+        """Elimina dalla cache i file passati, se presenti"""
+        with self._lock:
+            for file_path in file_paths:
+                self._pop(str(file_path))
+
+    def clear(self):
+        """Svuota la cache, azzerandone i contatori"""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = self.hits = self.misses = self.evictions = 0
+
+    def _pop(self, file_path:str):
+        entry = self._entries.pop(file_path, None)
+        if entry is not None:
+            self.nbytes -= entry[2]
+
+
+## HELPER FUNC ##
+def cache_file(file_path:str|Path) -> Path:
+    """Ritorna l'indirizzo del file della cache corrispondente al file .csv passato"""
+    file_path = Path(file_path)
+    return file_path.parent / CACHE_DIR_NAME / f"{file_path.stem}.npz"
+
+def file_key(file_path:str|Path, normalization:int=0) -> np.ndarray:
+    """
+    Ritorna la chiave di validità del file: data di modifica, dimensione,
+    versione della cache e tag della normalizzazione applicata alle coordinate
+    """
+    stat = os.stat(file_path)
+    return np.array([stat.st_mtime_ns, stat.st_size, CACHE_VERSION, normalization], dtype=np.int64)
+
+
+## MAIN FUNC ##
+def load_cached_curves(file_path:str|Path, key:np.ndarray=None) -> dict[str, tuple[np.ndarray, np.ndarray]]|None:
+    """
+    Carica dalla cache le coordinate delle curve del file passato.
+
+    :param key: chiave di validità attuale del file, se già letta; altrimenti viene letta
+
+    :return: dizionario {curve_acronym:(X, Y)}, o None nel caso la cache sia disattivata,
+        non contenga il file o il file sia stato modificato dopo il salvataggio
+    """
+    if not ConfigCache.app_configs.curve_cache:
+        return None
+
+    path = cache_file(file_path)
+    try:
+        with np.load(path) as data:
+            if not np.array_equal(data["_key"], file_key(file_path) if key is None else key):
+                return None
+            names = [key[2:] for key in data.files if key.startswith("X_")]
+            return {name:(data[f"X_{name}"], data[f"Y_{name}"]) for name in names}
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # un file della cache corrotto viene semplicemente ricreato
+        print(f"Errore nella lettura della cache {path.name}: {e}")
+        return None
+
+def save_cached_curves(file_path:str|Path,
+                       coordinates:dict[str, tuple[np.ndarray, np.ndarray]],
+                       key:np.ndarray=None):
+    """
+    Salva nella cache le coordinate delle curve del file passato.
+
+    Il file è scritto in un file temporaneo e poi rinominato, in modo che
+    letture concorrenti non trovino mai un file scritto a metà
+
+    :param key: chiave di validità del file, da calcolare prima della lettura del .csv;
+        di default quella attuale
+    """
+    if not ConfigCache.app_configs.curve_cache:
+        return
+
+    path = cache_file(file_path)
+    arrays = {"_key": file_key(file_path) if key is None else key}
+    for name, (x, y) in coordinates.items():
+        arrays[f"X_{name}"], arrays[f"Y_{name}"] = x, y
+
+    try:
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}-{threading.get_ident()}.tmp.npz")
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        # la cache è solo un'ottimizzazione, un errore di scrittura non blocca la lettura dei dati
+        print(f"Errore nel salvataggio della cache di {Path(file_path).name}: {e}")
+
+def remove_cached_curves(*file_paths:str|Path):
+    """Elimina dalle cache, in memoria e su disco, le curve dei .csv passati, se presenti"""
+    CURVES_CACHE.discard(*file_paths)
+    for file_path in file_paths:
+        try:
+            cache_file(file_path).unlink(missing_ok=True)
+        except OSError as e:
+            print(f"Errore nell'eliminazione della cache di {Path(file_path).name}: {e}")
+
+
+## INST ##
+
+# cache in memoria condivisa da tutte le istanze FileCurves del processo
+CURVES_CACHE = CurvesLRUCache()
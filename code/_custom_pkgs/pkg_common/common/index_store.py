@@ -0,0 +1,382 @@
+"""
+Il modulo implementa le classi preposte al salvataggio e al caricamento delle
+tabelle di indicizzazione.
+
+Le tabelle sono salvate una per file_type, in modo che la modifica di un file_type
+non richieda di riscrivere anche le tabelle degli altri. Il backend di default salva
+le tabelle in formato parquet; il file excel degli indici è mantenuto solo come
+report da consultare, esportato su richiesta.
+
+I file sono scritti in un file temporaneo e poi rinominati, in modo che un'interruzione
+durante la scrittura lasci intatta la versione precedente. Le tabelle modificate
+dall'applicazione sono salvate in background da un IndexWriter, che raggruppa gli
+aggiornamenti ravvicinati in un'unica scrittura
+"""
+
+import importlib.util
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing_extensions import Callable
+import pandas as pd
+from app_resources.parameters import ConfigCache
+
+
+## PARAMS ##
+# le feature con un numero di valori distinti fino a questa frazione delle righe sono categoriche
+CATEGORICAL_MAX_RATIO = 0.5
+
+## CLASSES ##
+class IndexStore:
+    """
+    Interfaccia comune dei backend di salvataggio delle tabelle di indicizzazione
+    di una directory dei dati.
+
+    Le tabelle caricate hanno le colonne codificate in forma compatta (vedi encode)
+    """
+    name = None
+
+    def __init__(self, data_directory:str|Path):
+        self.data_directory = Path(data_directory)
+
+    def exists(self, file_type:str) -> bool:
+        """Ritorna True se è salvata una tabella per il file_type specificato"""
+        raise NotImplementedError
+    def load(self, file_type:str) -> pd.DataFrame:
+        """Carica la tabella del file_type specificato"""
+        raise NotImplementedError
+    def save(self, file_type:str, df:pd.DataFrame):
+        """Salva la tabella del file_type specificato, lasciando inalterate le altre"""
+        raise NotImplementedError
+    def delete(self, file_type:str):
+        """Elimina la tabella del file_type specificato, se presente"""
+        raise NotImplementedError
+
+    def save_all(self, tables:dict[str,pd.DataFrame]):
+        """Salva le tabelle passate; le tabelle vuote sono eliminate"""
+        for file_type, df in tables.items():
+            if df.empty:
+                self.delete(file_type)
+            else:
+                self.save(file_type, df)
+
+    @staticmethod
+    def normalize(file_type:str, df:pd.DataFrame) -> pd.DataFrame:
+        """
+        Uniforma i tipi delle colonne della tabella a quelli specificati nei config,
+        in modo che le tabelle lette da backend diversi siano equivalenti
+
+        Le feature 'text' e la colonna file_path sono convertite in stringhe,
+        le colonne delle affinità in float
+        """
+        df = df.copy()
+        features = ConfigCache.files_configs[file_type].allowed_features
+        for col in df.columns:
+            if "aff_" in col:
+                if df[col].dtype != float:
+                    df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+            elif features.get(col, "text") == "text":
+                # converto solo le colonne che non contengono già solo stringhe
+                if pd.api.types.infer_dtype(df[col], skipna=True) not in ("string", "empty"):
+                    df[col] = df[col].astype(object).where(df[col].isna(), df[col].astype(str))
+        return df
+
+    @staticmethod
+    def encode(df:pd.DataFrame) -> pd.DataFrame:
+        """
+        Codifica in forma compatta le colonne di testo della tabella caricata, senza cambiarne i valori:
+        le feature con pochi valori distinti sono convertite in categoriche, che salvano ogni valore
+        una sola volta e lo riferiscono con un codice intero, e gli indirizzi dei file, se pyarrow
+        è installato, in stringhe arrow, salvate in un unico buffer invece che come oggetti python
+        """
+        for col in df.columns:
+            if col == "file_path":
+                if importlib.util.find_spec("pyarrow") is not None:
+                    df[col] = df[col].astype("string[pyarrow]")
+            elif "aff_" not in col and df[col].dtype == object:
+                if df[col].nunique(dropna=True) <= CATEGORICAL_MAX_RATIO * len(df):
+                    df[col] = df[col].astype("category")
+        return df
+
+
+class ParquetIndexStore(IndexStore):
+    """Salva ogni tabella in un file parquet nella cartella .indexes della directory dei dati"""
+    name = "parquet"
+
+    @property
+    def indexes_dir(self) -> Path:
+        """Ritorna la cartella contenente i file delle tabelle"""
+        return self.data_directory / ".indexes"
+
+    def _file(self, file_type:str) -> Path:
+        return self.indexes_dir / f"{file_type}.parquet"
+
+    def exists(self, file_type:str) -> bool:
+        return self._file(file_type).exists()
+    def load(self, file_type:str) -> pd.DataFrame:
+        return self.encode(pd.read_parquet(self._file(file_type)))
+    def save(self, file_type:str, df:pd.DataFrame):
+        self.indexes_dir.mkdir(parents=True, exist_ok=True)
+        path = self._file(file_type)
+        tmp_path = temp_file(path)
+        try:
+            self.normalize(file_type, df).to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            raise
+    def delete(self, file_type:str):
+        self._file(file_type).unlink(missing_ok=True)
+
+    def migrate_from(self, store:IndexStore):
+        """Copia nel backend corrente le tabelle salvate in un altro backend"""
+        for file_type in ConfigCache.file_types:
+            try:
+                if store.exists(file_type):
+                    self.save(file_type, store.load(file_type))
+            except Exception as e:
+                print(f"Errore nella migrazione della tabella {file_type}: {e}")
+
+
+class ExcelIndexStore(IndexStore):
+    """
+    Salva le tabelle nei fogli del file excel degli indici.
+
+    Il backend è molto più lento di quello parquet, ed è mantenuto per compatibilità
+    e per l'esportazione delle tabelle come report consultabile
+    """
+    name = "excel"
+
+    @property
+    def indexes_file(self) -> Path:
+        """Ritorna l'indirizzo del file excel degli indici"""
+        return self.data_directory / "indexes.xlsx"
+
+    def exists(self, file_type:str) -> bool:
+        if not self.indexes_file.exists():
+            return False
+        try:
+            return file_type in pd.ExcelFile(self.indexes_file).sheet_names
+        except Exception:
+            return False
+    def load(self, file_type:str) -> pd.DataFrame:
+        return self.encode(self.normalize(file_type, pd.read_excel(self.indexes_file, sheet_name=file_type)))
+    def save(self, file_type:str, df:pd.DataFrame):
+        self.save_all({file_type:df})
+    def delete(self, file_type:str):
+        self.save_all({file_type:pd.DataFrame()})
+
+    def save_all(self, tables:dict[str,pd.DataFrame], keep_others:bool=True):
+        """
+        Scrive nel file di indicizzazione solo i fogli dei file_type passati,
+        lasciando inalterati gli altri.
+
+        I fogli con tabelle vuote sono eliminati; se il file di indicizzazione
+        non contiene più nessun foglio, viene eliminato.
+
+        Il workbook è modificato in una copia temporanea, che sostituisce il file solo
+        a scrittura completata
+
+        :param keep_others: se False, il file è riscritto con le sole tabelle passate
+        """
+        to_write = {key:df for key,df in tables.items() if not df.empty}
+        to_delete = [key for key,df in tables.items() if df.empty]
+
+        append = keep_others and self.indexes_file.exists()
+        if not append and not to_write:
+            self.indexes_file.unlink(missing_ok=True)
+            return
+
+        tmp_file = temp_file(self.indexes_file)
+        try:
+            if not append:
+                with pd.ExcelWriter(tmp_file) as writer:
+                    for key, df in to_write.items():
+                        df.to_excel(writer, sheet_name=key, index=False)
+                os.replace(tmp_file, self.indexes_file)
+                return
+
+            shutil.copyfile(self.indexes_file, tmp_file)
+            with pd.ExcelWriter(tmp_file, engine="openpyxl",
+                                mode='a', if_sheet_exists='replace') as writer:
+                for key, df in to_write.items():
+                    df.to_excel(writer, sheet_name=key, index=False)
+
+                for key in to_delete:
+                    # un workbook deve contenere almeno un foglio
+                    if key in writer.book.sheetnames and len(writer.book.sheetnames) > 1:
+                        writer.book.remove(writer.book[key])
+
+                only_empty_left = set(writer.book.sheetnames) <= set(to_delete)
+
+            if only_empty_left:
+                tmp_file.unlink()
+                self.indexes_file.unlink()
+            else:
+                os.replace(tmp_file, self.indexes_file)
+        except Exception:
+            tmp_file.unlink(missing_ok=True)
+            raise
+
+
+class IndexWriter(threading.Thread):
+    """
+    Thread che salva in background le tabelle di indicizzazione modificate (write-behind),
+    in modo che le callback non attendano la scrittura dei file.
+
+    Le tabelle in attesa sono tenute per file_type: un aggiornamento successivo della stessa
+    tabella sostituisce quello non ancora salvato, e dopo ogni richiesta il thread attende
+    l'intervallo impostato nei config, in modo che gli aggiornamenti ravvicinati siano
+    raggruppati in un'unica scrittura dei soli file_type modificati.
+
+    Le tabelle passate non devono essere modificate dopo la richiesta di salvataggio.
+
+    Garanzia di ordinamento: i file salvati riflettono una richiesta solo dopo il termine di
+    flush(), quindi chi legge i file delle tabelle (indexer, report excel, manifest delle affinità)
+    deve chiamare flush() prima della lettura; le funzioni after_save e on_saved sono chiamate
+    nel thread di salvataggio dopo la scrittura delle tabelle, e al loro interno flush() non attende
+    """
+    def __init__(self, store:IndexStore, delay:float=None, on_saved:Callable[[list[str]],None]=None):
+        """
+        :param delay: attesa in secondi tra la prima richiesta e la scrittura; di default quella dei config
+        :param on_saved: funzione chiamata con i file_type salvati, dopo ogni scrittura riuscita
+        """
+        super().__init__(name="index-writer", daemon=True)
+        self.store = store
+        self.delay:float = ConfigCache.app_configs.save_delay if delay is None else delay
+        self.on_saved = on_saved
+        self.writes:int = 0
+        self._pending:dict[str,pd.DataFrame] = {}
+        # funzioni da chiamare dopo il salvataggio delle tabelle in attesa
+        self._after_save:list[Callable[[],None]] = []
+        self._writing = False
+        self._urgent = False
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @property
+    def idle(self) -> bool:
+        """Ritorna True se non ci sono tabelle in attesa o in scrittura"""
+        return not self._pending and not self._writing
+
+    def schedule(self, file_type:str, df:pd.DataFrame, after_save:Callable[[],None]=None):
+        """
+        Richiede il salvataggio della tabella del file_type, sostituendo quella in attesa
+
+        :param after_save: funzione chiamata solo dopo che la tabella è stata salvata, ad esempio
+            per salvare dati che dipendono da essa; non è chiamata se la scrittura fallisce
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Il salvataggio delle tabelle è stato chiuso")
+            self._pending[file_type] = df
+            if after_save is not None:
+                self._after_save.append(after_save)
+            if self.ident is None:
+                # il thread è avviato alla prima richiesta
+                self.start()
+            self._condition.notify_all()
+
+    def flush(self, timeout:float=None) -> bool:
+        """
+        Salva subito le tabelle in attesa, attendendo il termine della scrittura
+
+        :return: False nel caso la scrittura non sia terminata entro il timeout
+        """
+        if threading.current_thread() is self:
+            # chiamata da una funzione dopo il salvataggio: le tabelle della scrittura in corso sono
+            # già salvate, e attendere le successive bloccherebbe il thread su sé stesso
+            return not self._pending
+        with self._condition:
+            if self.idle:
+                return True
+            self._urgent = True
+            self._condition.notify_all()
+            done = self._condition.wait_for(lambda: self.idle, timeout)
+            self._urgent = False
+            return done
+
+    def close(self, timeout:float=None):
+        """Salva le tabelle in attesa e termina il thread; le richieste successive sono rifiutate"""
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                # le richieste successive durante l'attesa sono raggruppate con questa
+                self._condition.wait_for(lambda: self._urgent or self._closed, self.delay)
+                tables, self._pending = self._pending, {}
+                after_save, self._after_save = self._after_save, []
+                self._writing = True
+
+            try:
+                self.store.save_all(tables)
+            except Exception as e:
+                # le tabelle in memoria restano valide, e sono salvate al prossimo aggiornamento
+                print(f"Errore nel salvataggio delle tabelle {', '.join(tables)}: {e}")
+            else:
+                self.writes += 1
+                print(f"Tabelle salvate: {', '.join(tables)}")
+                if self.on_saved is not None:
+                    after_save.append(lambda: self.on_saved(list(tables)))
+                for callback in after_save:
+                    try:
+                        callback()
+                    except Exception as e:
+                        print(f"Errore dopo il salvataggio delle tabelle: {e}")
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+
+## HELPER FUNC ##
+def temp_file(path:Path) -> Path:
+    """
+    Ritorna un indirizzo temporaneo, accanto al file passato e con la stessa estensione,
+    in cui scrivere il file prima di rinominarlo; è diverso per ogni processo e thread
+    """
+    return path.with_name(f"{path.stem}.{os.getpid()}-{threading.get_ident()}.tmp{path.suffix}")
+
+
+## MAIN FUNC ##
+def get_index_store(data_directory:str|Path, backend:str=None) -> IndexStore:
+    """
+    Ritorna il backend di salvataggio delle tabelle di indicizzazione della directory.
+
+    Nel caso sia richiesto il backend parquet ma pyarrow non sia installato, viene usato
+    il backend excel. Alla prima apertura di una directory indicizzata col solo file excel,
+    le tabelle sono migrate nel backend parquet.
+
+    :param data_directory: directory dei dati
+    :param backend: "parquet" o "excel"; di default quello impostato nei config
+    """
+    backend = backend or ConfigCache.app_configs.index_backend
+
+    if backend == ParquetIndexStore.name:
+        if importlib.util.find_spec("pyarrow") is None:
+            print("pyarrow non installato, le tabelle saranno salvate nel file excel")
+            return ExcelIndexStore(data_directory)
+
+        store = ParquetIndexStore(data_directory)
+        legacy_store = ExcelIndexStore(data_directory)
+        if not store.indexes_dir.exists() and legacy_store.indexes_file.exists():
+            print("Migrazione delle tabelle di indicizzazione dal file excel")
+            store.migrate_from(legacy_store)
+        return store
+
+    if backend == ExcelIndexStore.name:
+        return ExcelIndexStore(data_directory)
+
+    raise ValueError(f"Backend di indicizzazione {backend} non supportato")
+
+def export_excel_report(data_directory:str|Path, tables:dict[str,pd.DataFrame]):
+    """Esporta le tabelle passate nel file excel degli indici, da consultare come report"""
+    ExcelIndexStore(data_directory).save_all(tables, keep_others=False)
@@ -1,17 +1,38 @@
 """
 Il modulo implementa la funzione di indexing da utilizzare sulla directory dei dati,
-in modo da creare un file di indicizzazione con i parametri dei vari file supportati
-dall'applicazione
+in modo da creare le tabelle di indicizzazione con i parametri dei vari file supportati
+dall'applicazione.
+
+Per evitare di rileggere e riscrivere tutte le tabelle di indicizzazione ad ogni avvio,
+l'indexer mantiene nella directory dei dati un manifest con dimensione, data di modifica
+(e opzionalmente hash del contenuto) di ogni file .csv, in modo da processare solo i file
+aggiunti, eliminati o modificati dall'ultima indicizzazione.
+
+L'estrazione delle feature di grandi quantità di file nuovi è distribuita su un pool di processi
 """
 
+import os
+import json
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
-from common.classes import FilesFeatures
+from common.classes import FeaturesParser
+from common.index_store import IndexStore, get_index_store
+from common.curve_cache import remove_cached_curves
 from app_resources.parameters import ConfigCache
 
 
+## PARAMS ##
+MANIFEST_FILE_NAME = "indexes_manifest.json"
+MANIFEST_VERSION = 1
+# sotto questo numero di file da processare, l'avvio del pool di processi costa più dell'estrazione
+PARALLEL_THRESHOLD = 2000
+
+
 ## HELPER FUNC ##
-def load_or_create_df_data_type(file_type:str, idx_file:Path):
+def load_or_create_df_data_type(file_type:str, store:IndexStore):
     type_configs = ConfigCache.files_configs[file_type]
     expected_df = pd.DataFrame(
         None,
@@ -19,7 +40,7 @@ def load_or_create_df_data_type(file_type:str, idx_file:Path):
         )
 
     try:
-        idxs = pd.read_excel(idx_file, sheet_name=file_type)
+        idxs = store.load(file_type)
         if set(idxs.columns)!=set(expected_df.columns):
             raise ValueError("Le feature contenute nel file non sono quelle specificate nei config")
         return idxs
@@ -34,16 +55,184 @@ def add_aff_cols(data_type:str, df:pd.DataFrame):
             df[f"aff_{curve}"] = None
     return df
 
+def configs_signature() -> dict[str, list[str]]:
+    """
+    Ritorna le colonne attese per ogni file_type supportato.
+
+    Salvata nel manifest, permette di capire se i config sono cambiati
+    dall'ultima indicizzazione, e quindi se il manifest è ancora valido
+    """
+    return {file_type:ConfigCache.files_configs[file_type].get_table_cols
+            for file_type in sorted(ConfigCache.file_types)}
+
+def empty_manifest() -> dict:
+    """Ritorna un manifest vuoto, valido per i config correnti"""
+    return {"version":MANIFEST_VERSION, "configs":configs_signature(), "files":{}}
+
+def load_manifest(manifest_file:Path) -> dict:
+    """
+    Carica il manifest dell'ultima indicizzazione.
+
+    Nel caso il file non esista, non sia leggibile o sia stato creato con
+    config diversi da quelli correnti, ritorna un manifest vuoto
+    """
+    try:
+        with open(manifest_file, 'r', encoding="utf-8") as f:
+            manifest = json.load(f)
+    except Exception:
+        return empty_manifest()
+
+    if (manifest.get("version") != MANIFEST_VERSION or
+            manifest.get("configs") != configs_signature()):
+        return empty_manifest()
+
+    return manifest
+
+def save_manifest(manifest:dict, manifest_file:Path):
+    """Salva il manifest nella directory dei dati"""
+    with open(manifest_file, 'w', encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+def scan_data_dir(data_directory:Path) -> dict[str, dict]:
+    """
+    Ritorna un dizionario {file_path:{"size":..., "mtime":...}} di tutti i file .csv
+    contenuti nella directory.
+
+    Viene usato os.scandir, che su Windows ottiene le informazioni di stat
+    insieme al listing della cartella, senza una system call per ogni file.
+    Nel caso la directory non esista, ritorna un dizionario vuoto
+    """
+    out = {}
+    if not os.path.isdir(data_directory):
+        return out
+    with os.scandir(data_directory) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".csv") or not entry.is_file():
+                continue
+            stat = entry.stat()
+            out[str(data_directory / entry.name)] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns,
+            }
+    return out
+
+def file_hash(file_path:str|Path) -> str:
+    """Ritorna l'hash blake2b del contenuto del file"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1<<20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def diff_files(old_files:dict[str,dict],
+               new_files:dict[str,dict],
+               use_hash=False) -> tuple[list[str], list[str], list[str]]:
+    """
+    Confronta lo stato dei file salvato nel manifest con quello corrente.
+
+    Un file è considerato modificato se ne sono cambiate dimensione o data di modifica;
+    nel caso use_hash sia True, un file con data di modifica diversa ma stesso contenuto
+    non è considerato modificato. Gli hash calcolati sono salvati in new_files.
+
+    :return: le liste dei file aggiunti, modificati ed eliminati
+    """
+    added, modified = [], []
+    for path, stat in new_files.items():
+        old = old_files.get(path)
+        if old is None:
+            added.append(path)
+            continue
+
+        stat["file_type"] = old.get("file_type")
+        unchanged = old["size"] == stat["size"] and old["mtime"] == stat["mtime"]
+
+        if unchanged and old.get("hash"):
+            stat["hash"] = old["hash"]
+        elif not unchanged and use_hash and old["size"] == stat["size"] and old.get("hash"):
+            stat["hash"] = file_hash(path)
+            unchanged = stat["hash"] == old["hash"]
+
+        if not unchanged:
+            modified.append(path)
+
+    removed = [path for path in old_files if path not in new_files]
+
+    return added, modified, removed
+
+def is_pool_worker() -> bool:
+    """
+    Ritorna True se il processo corrente è un worker di un pool di processi.
+
+    Su Windows i worker sono avviati reimportando il modulo principale dell'applicazione,
+    e quindi ricostruendo la cache: l'indicizzazione va eseguita solo dal processo principale
+    """
+    return multiprocessing.parent_process() is not None
+
+def extract_chunk(paths:list[str]) -> dict[str, pd.DataFrame]:
+    """
+    Estrae file_type e feature dei file passati, con un solo parsing vettorizzato dei nomi.
+
+    :return: dizionario {file_type:df} con una riga per file e la colonna file_path;
+        i file di tipo non supportato sono ignorati
+    """
+    return FeaturesParser.parse_by_type(paths)
+
+def extract_all(paths:list[str],
+                workers:int=None,
+                chunk_size:int=500) -> dict[str, pd.DataFrame]:
+    """
+    Estrae file_type e feature di tutti i file passati, dividendoli in blocchi
+    distribuiti su un pool di processi.
+
+    Il pool è usato solo se i file sono almeno PARALLEL_THRESHOLD, altrimenti i file
+    sono processati tutti insieme nel processo corrente.
+
+    :param paths: indirizzi dei file
+    :param workers: numero di processi del pool; di default quello impostato nei config
+    :param chunk_size: numero di file per blocco
+    :return: come extract_chunk
+    """
+    workers = ConfigCache.app_configs.index_workers if workers is None else workers
+    workers = workers or os.cpu_count() or 1
+
+    chunks = [paths[i:i+chunk_size] for i in range(0, len(paths), chunk_size)]
+
+    if workers <= 1 or len(chunks) <= 1 or len(paths) < PARALLEL_THRESHOLD or is_pool_worker():
+        return extract_chunk(paths)
+
+    # spawn anche su linux, lo stesso comportamento di Windows ed evita fork di processi multi-thread
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        chunks_res = list(pool.map(extract_chunk, chunks))
+
+    out:dict[str, list[pd.DataFrame]] = {}
+    for chunk_res in chunks_res:
+        for file_type, df in chunk_res.items():
+            out.setdefault(file_type, []).append(df)
+    return {file_type:pd.concat(dfs, ignore_index=True) for file_type, dfs in out.items()}
+
 ## MAIN FUNC ##
-def indexer(data_directory:str|Path):
+def indexer(data_directory:str|Path,
+            use_hash=False,
+            workers:int=None,
+            chunk_size:int=500) -> dict[str, dict[str, list[str]]]:
     """
     La funzione di occupa di indicizzare tutti i file .csv contenuti nella cartella
-    specificata, data_directory, creando un corrispondente file nella suddetta.
+    specificata, data_directory, creando le corrispondenti tabelle nella suddetta.
 
-    Nel caso un file di indicizzazione sia già presente, esso verrà solamente aggiornato,
+    Nel caso le tabelle di indicizzazione siano già presenti, esse verranno solamente aggiornate,
     aggiungendo file nuovi, eliminando i file non più presenti e aggiungendo le feature non
     presenti, nel caso venissero aggiunte.
 
+    Il confronto è fatto rispetto al manifest dell'ultima indicizzazione, in modo che
+    vengano processati solo i file aggiunti, eliminati o modificati, e che siano rilette
+    e riscritte solo le tabelle dei file_type coinvolti. Ai file modificati sono azzerate
+    le affinità, non più valide.
+
+    Il nome di ogni file da processare è analizzato una sola volta; nel caso i file
+    siano molti, l'estrazione delle feature è distribuita su un pool di processi.
+    La funzione non fa nulla se chiamata all'interno di un worker di un pool.
+
     Sono considerati solo i file il cui data_type appare nel file di configurazione.
     Sono estratte quindi tutte le feature utili contenute nel nome, tralasciando quelle
     non specificate nel file di configurazione, e lasciando vuote quelle non specificate
@@ -53,78 +242,107 @@ def indexer(data_directory:str|Path):
     colonne preposte a contenere tali dati, nel caso non fossero già presenti, con nomi
     del tipo "aff_<curve_acronym>"
 
-    :param data_directory:
-    :return:
+    :param data_directory: directory contenente i file .csv da indicizzare
+    :param use_hash: se True, usa anche l'hash del contenuto per riconoscere i file
+        modificati, in modo da ignorare i file la cui data di modifica è cambiata
+        senza che lo sia il contenuto
+    :param workers: numero di processi usati per l'estrazione delle feature;
+        di default quello impostato nei config
+    :param chunk_size: numero di file processati da ogni worker per volta
+    :return: dizionario {file_type:{"added":[...], "modified":[...], "removed":[...]}}
+        dei soli file_type modificati dall'operazione
     """
+    if is_pool_worker():
+        return {}
+
     # params
     data_directory = Path(data_directory)
-    excel_indexes_file = data_directory / "indexes.xlsx"
+    if not data_directory.is_dir():
+        # nessun file da indicizzare, i file_type risulteranno non presenti
+        return {}
+    store = get_index_store(data_directory)
+    manifest_file = data_directory / MANIFEST_FILE_NAME
+
+    manifest = load_manifest(manifest_file)
+    # i file dei file_type senza tabella salvata vanno reindicizzati
+    missing_types = {stat.get("file_type") for stat in manifest["files"].values()}
+    missing_types = {f_type for f_type in missing_types if f_type and not store.exists(f_type)}
+    old_files:dict[str,dict] = {
+        path:stat for path,stat in manifest["files"].items() if stat.get("file_type") not in missing_types
+    }
 
-    files_set = set(str(p) for p in data_directory.glob("*.csv"))
+    new_files = scan_data_dir(data_directory)
+    added, modified, removed = diff_files(old_files, new_files, use_hash)
 
-    files_data_list = []
-    for file in files_set:
-        try:
-            file_type = FilesFeatures.extract_features(file, only_file_type=True)
-        except KeyError:
-            # ignoro i file con un tipo non supportato
-            pass
-        else:
-            files_data_list.append(
-                {
-                    "file_type": file_type,
-                    "file_path":str(file)
-                }
-            )
+    if not (added or modified or removed):
+        if new_files != old_files:
+            # salvo le date di modifica dei file con contenuto invariato
+            manifest["files"] = new_files
+            save_manifest(manifest, manifest_file)
+        return {}
 
-    df_files = pd.DataFrame(files_data_list)
+    # estraggo file_type e feature dei soli file nuovi o modificati
+    to_parse = [*added, *modified]
+    parsed = extract_all(to_parse, workers, chunk_size)
+    parsed_types = {path:f_type for f_type, df in parsed.items() for path in df["file_path"]}
 
-    if df_files.empty:
-        return []
+    for path in added:
+        new_files[path]["file_type"] = parsed_types.get(path)
 
-    present_file_types = set(df_files["file_type"].tolist())
+    if use_hash:
+        for path in (*added, *modified):
+            if "hash" not in new_files[path]:
+                new_files[path]["hash"] = file_hash(path)
+
+    changes:dict[str, dict[str, list[str]]] = {}
+    def _changes(f_type:str):
+        return changes.setdefault(f_type, {"added": [], "modified": [], "removed": []})
+
+    for path in added:
+        if new_files[path]["file_type"]:
+            _changes(new_files[path]["file_type"])["added"].append(path)
+    for path in modified:
+        if new_files[path]["file_type"]:
+            _changes(new_files[path]["file_type"])["modified"].append(path)
+    for path in removed:
+        if old_files[path].get("file_type"):
+            _changes(old_files[path]["file_type"])["removed"].append(path)
 
     # cache dict to save df before writing them
     df_to_save = {}
 
-    # processing one supported data_type per loop
-    for file_type in ConfigCache.file_types:
+    # processing only the changed data_types
+    for file_type, f_changes in changes.items():
 
-        if file_type not in present_file_types:
-            continue
+        # controlla che esista la tabella degli indici e in caso negativo crea un df vuoto
+        df_data_type = load_or_create_df_data_type(file_type, store)
 
-        # controlla che esista il file degli indici e in caso negativo crea un df vuoto
-        df_data_type = load_or_create_df_data_type(file_type, excel_indexes_file)
+        # rimuove le righe dei file eliminati e di quelli modificati, che verranno reinseriti
+        to_remove = set(f_changes["removed"]) | set(f_changes["modified"])
+        df_data_type = df_data_type[~df_data_type['file_path'].isin(to_remove)]
 
-        df_to_save[file_type] = df_data_type
+        # nel caso il manifest sia stato ricreato, i file "aggiunti" potrebbero già essere indicizzati
+        indexed_files:set[str] = set(df_data_type['file_path'].tolist())
+        f_changes["added"] = [f for f in f_changes["added"] if f not in indexed_files]
 
-        # rimuove le righe con file non esistenti
-        df_data_type = df_data_type[df_data_type['file_path'].isin(files_set)]
+        rows = parsed.get(file_type, pd.DataFrame(columns=["file_path"]))
+        rows = rows[rows["file_path"].isin({*f_changes["added"], *f_changes["modified"]})].reset_index(drop=True)
 
-        # add not indexed files to a list
-        indexed_files:set[str] = set(df_data_type['file_path'].tolist())
-        rows = []   # vi aggiungerò le features dei file non indicizzati
+        if not rows.empty:
+            df_to_concat = add_aff_cols(file_type, rows)
 
-        # gli indirizzi da controllare sono tutti quelli con lo stesso data_type di df_data_type
-        df_paths_to_check = df_files.loc[df_files["file_type"] == file_type, "file_path"]
-        # creo una maschera con i file presenti in indice, che poi negherò per trovare i non presenti
-        mask_indexed =df_paths_to_check.isin(indexed_files)
-        for f in df_paths_to_check[~mask_indexed]:
-            rows.append(FilesFeatures.extract_features(f, only_file_features=True))
+            df_data_type = df_to_concat if df_data_type.empty else pd.concat([df_data_type, df_to_concat])
 
-        if rows:
-            df_to_concat = add_aff_cols(file_type, pd.DataFrame(data=rows))
+        df_to_save[file_type] = df_data_type
 
-            df_to_save[file_type] = df_to_concat if df_data_type.empty else pd.concat([df_data_type, df_to_concat])
+    # salvo i df alla fine del processo, riscrivendo le sole tabelle modificate
+    store.save_all(df_to_save)
 
-    # salvo i df alla fine del processo
-    with pd.ExcelWriter(excel_indexes_file) as writer:
-        for key, df in df_to_save.items():
-            df.to_excel(writer, sheet_name=key, index=False)
+    # le curve dei file modificati sono invalidate dalla loro chiave, quelle dei file eliminati vanno rimosse
+    remove_cached_curves(*removed)
 
-if __name__ == "__main__":
-    data_dir = Path(
-        r'C:\Users\user\Documents\Uni\Tirocinio\webapp\data'
-    )
+    manifest["files"] = new_files
+    save_manifest(manifest, manifest_file)
 
-    indexer(data_dir)
\ No newline at end of file
+    return {f_type:f_changes for f_type,f_changes in changes.items()
+            if any(f_changes.values())}
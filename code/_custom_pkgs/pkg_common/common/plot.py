@@ -5,6 +5,7 @@ nonché la funzione semplificata per il plotting dei dati contenuti nei tab
 
 
 import plotly.graph_objects as go
+import pandas as pd
 from common.PlotterConfigs import PlotterConfigs
 from common.classes import FileCurves, Curve
 
@@ -32,6 +33,35 @@ def plot_tab(curves:FileCurves,
         return custom_fig.plot_all(target_curves=plot_targets)[0]
 
 ## CLASS ##
+class StyledCurve:
+    """
+    Curva con lo stile con cui è disegnata in figura.
+
+    Lo stile è mantenuto separato dai dati, in modo che le curve, condivise dalla cache,
+    non debbano essere copiate o modificate per essere disegnate
+    """
+    __slots__ = ('curve', 'name', 'color', 'linestyle', 'width', 'markers')
+
+    def __init__(self, curve:Curve):
+        self.curve:Curve = curve
+        self.name:str = curve.name
+        self.color:str = None
+        self.linestyle:str = None
+        self.width:float = None
+        self.markers:str = None
+    def __str__(self):
+        return self.name
+
+    @property
+    def X(self):
+        """Ritorna le ascisse della curva"""
+        return self.curve.X
+    @property
+    def Y(self):
+        """Ritorna le ordinate della curva"""
+        return self.curve.Y
+
+
 class CustomFigure(go.Figure):
     def __init__(self,
                  curves:FileCurves,
@@ -94,6 +124,21 @@ class CustomFigure(go.Figure):
 
         return out.plot_all_subsamples(*x_vals)[0]
 
+    @staticmethod
+    def _sub_sample_curves(samples:pd.DataFrame) -> dict[tuple[str,str],Curve]:
+        """
+        Crea le curve dei sub-samples a partire dal df ritornato da FileCurves.sample,
+        scartando le ascisse esterne ai limiti delle curve
+
+        :return: dizionario {(file_path, curve_acronym):Curve}
+        """
+        samples = samples.dropna(subset=["y"])
+        return {
+            (path, key):Curve.create(rows["name"].iat[0], rows["x"].to_numpy(), rows["y"].to_numpy(),
+                                     interp_func=False)
+            for (path, key), rows in samples.groupby(["file_path", "curve"], sort=False)
+        }
+
     @property
     def _get_group_markers(self):
         """
@@ -159,7 +204,7 @@ class CustomFigure(go.Figure):
 
 
     def _add_curve(self,
-                   curve:Curve,
+                   curve:StyledCurve,
                    scales:dict[str,float] = None,
                    marker_size:int = 6) -> "CustomFigure":
         """Aggiunge all'istanza la curva specificata, con colore, stile di linea, marker e nome come impostati"""
@@ -190,7 +235,7 @@ class CustomFigure(go.Figure):
         return self
 
     def _add_scatter(self,
-                     curve:Curve,
+                     curve:StyledCurve,
                      scales:dict[str,float] = None,
                      mode = "markers",
                      marker_size:int = 6) -> "CustomFigure":
@@ -390,6 +435,8 @@ class CustomFigure(go.Figure):
                 t_scales = Curve.get_curves_scales(*t_curves.values())
                 for key,curve in t_curves.items():
                     N += 1
+                    # le curve target sono condivise dall'indice dei target, lo stile è tenuto a parte
+                    curve = StyledCurve(curve)
                     curve.color = "gray"
                     curve.linestyle = linestyles_dict[key] if linestyles_dict else None
                     if self._contains_group:
@@ -432,14 +479,18 @@ class CustomFigure(go.Figure):
 
         colors_dict = self._configs.colors
 
+        # sub-samples di tutti i target, valutati in blocco
+        sub_samples = self._sub_sample_curves(self._curves.sample(*x_vals, targets=True))
+
         for f_features,_ in self._curves.expose_all:
             target = FileCurves.find_target_file(self._curves.file_type, f_features)
             for t_features,t_curves in target.expose_all:
                 t_scales = Curve.get_curves_scales(*t_curves.values())
-                sub_samples = {
-                    t_id:t.create_sub_sample(*x_vals) for t_id,t in t_curves.items()
-                }
-                for key,curve in sub_samples.items():
+                for key in t_curves:
+                    if (str(t_features["file_path"]), key) not in sub_samples:
+                        continue
+                    # lo stesso target può essere condiviso da più file, lo stile è tenuto a parte
+                    curve = StyledCurve(sub_samples[(str(t_features["file_path"]), key)])
                     curve.color = colors_dict[key]
                     curve.linestyle = None
                     if contains_group:
@@ -500,7 +551,7 @@ class CustomFigure(go.Figure):
 
                 if key in self._c_to_plot or self._all_c:
 
-                    curve = curve.__copy__()
+                    curve = StyledCurve(curve)
                     # per ogni curva salviamo colore, linestyle, width e marker utilizzato e modifichiamo il nome
                     curve.color = colors_dict[key] if self._colored else "black"
                     curve.linestyle = None if self._colored else linestyles_dict[key]
@@ -532,7 +583,7 @@ class CustomFigure(go.Figure):
             for f_features, f_curves in self._curves.expose_all:
                 scales = Curve.get_curves_scales(*f_curves.values())
                 for key, curve in f_curves.items():
-                    curve = curve.__copy__()
+                    curve = StyledCurve(curve)
                     curve.color = self._configs.colors[key] if self._colored else "black"
                     curve.linestyle = None if self._colored else self._configs.linestyles[key]
                     curve.width = 1
@@ -576,14 +627,19 @@ class CustomFigure(go.Figure):
 
         colors_dict = self._configs.colors
 
+        # sub-samples di tutte le curve del gruppo, valutati in blocco
+        samples = self._sub_sample_curves(
+            self._curves.sample(*x_vals, curves=None if self._all_c else self._c_to_plot)
+        )
+
         for f_features, f_curves in self._curves.expose_all:
             # f_features: dizionario delle features del file correntemente considerato
             # f_curves: dizionario delle curve contenute nel file
 
             for key, curve in f_curves.items():
-                if key in self._c_to_plot or self._all_c:
+                if (str(f_features["file_path"]), key) in samples:
 
-                    sub_samples = curve.create_sub_sample(*x_vals)
+                    sub_samples = StyledCurve(samples[(str(f_features["file_path"]), key)])
                     # per ogni curva salviamo colore, linestyle, width e marker utilizzato e modifichiamo il nome
                     sub_samples.color = colors_dict[key]
                     sub_samples.linestyle = None
@@ -619,11 +675,9 @@ class CustomFigure(go.Figure):
 
             for f_features, f_curves in self._curves.expose_all:
                 scales = Curve.get_curves_scales(*f_curves.values())
-                sub_samples = {
-                    c_id:c.create_sub_sample(*x_vals) for c_id,c in f_curves.items()
-                }
-                for key, curve in sub_samples.items():
-                    curve = curve.__copy__()
+                sub_samples = self._sub_sample_curves(self._curves.sample(*x_vals))
+                for (_, key), curve in sub_samples.items():
+                    curve = StyledCurve(curve)
                     curve.color = colors_dict[key]
                     curve.linestyle = None
                     curve.width = 1
@@ -0,0 +1,195 @@
+"""
+Il modulo implementa le risposte alle richieste di righe del row model infinite delle AgGrid,
+in modo che ordinamento, filtri e paginazione delle tabelle siano eseguiti sul server, e al
+browser siano inviati solo i blocchi di righe visualizzati.
+
+Le richieste (getRowsRequest) contengono l'intervallo di righe richiesto, startRow ed endRow,
+il sortModel, lista di {colId, sort}, e il filterModel, dizionario {colonna:filtro}, nel formato
+dei filtri di testo e numerici di AG Grid, semplici o combinati con operator e conditions.
+
+I filtri semplici di uguaglianza e di intervallo possono essere tradotti in condizioni
+di TableIndex (vedi index_condition), in modo da non scorrere tutte le righe della tabella
+"""
+
+import numpy as np
+import pandas as pd
+from common.table_index import TableIndex
+
+
+## PARAMS ##
+# dimensione massima di un blocco di righe, nel caso la richiesta non specifichi endRow
+MAX_BLOCK_SIZE = 1000
+# corrispondenza tra i filtri numerici di AG Grid e le condizioni di TableIndex
+NUMBER_OPERATORS = {"lessThan":"<", "lessThanOrEqual":"<=", "greaterThan":">", "greaterThanOrEqual":">="}
+
+
+## HELPER FUNC ##
+def _text_condition(values:pd.Series, condition:dict) -> np.ndarray:
+    """Ritorna la maschera delle righe che soddisfano la condizione di un filtro di testo"""
+    kind = condition.get("type", "contains")
+    blank = values.isna().to_numpy() | (values.astype(str).str.strip() == "").to_numpy()
+    if kind == "blank":
+        return blank
+    if kind == "notBlank":
+        return ~blank
+
+    # come in AG Grid, il confronto non distingue maiuscole e minuscole
+    text = values.astype(str).str.lower()
+    target = str(condition.get("filter") or "").lower()
+    if kind == "equals":
+        mask = (text == target).to_numpy()
+    elif kind == "notEqual":
+        mask = (text != target).to_numpy()
+    elif kind == "contains":
+        mask = text.str.contains(target, regex=False).to_numpy()
+    elif kind == "notContains":
+        mask = (~text.str.contains(target, regex=False)).to_numpy()
+    elif kind == "startsWith":
+        mask = text.str.startswith(target).to_numpy()
+    elif kind == "endsWith":
+        mask = text.str.endswith(target).to_numpy()
+    else:
+        raise ValueError(f"Tipo di filtro di testo {kind} non supportato")
+
+    # le celle vuote soddisfano solo le condizioni negative
+    empty = values.isna().to_numpy()
+    return np.where(empty, kind in ("notEqual", "notContains"), mask)
+
+def _number_condition(values:pd.Series, condition:dict) -> np.ndarray:
+    """Ritorna la maschera delle righe che soddisfano la condizione di un filtro numerico"""
+    kind = condition.get("type", "equals")
+    numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+    blank = np.isnan(numbers)
+    if kind == "blank":
+        return blank
+    if kind == "notBlank":
+        return ~blank
+
+    target = float(condition.get("filter"))
+    with np.errstate(invalid="ignore"):
+        if kind == "equals":
+            mask = numbers == target
+        elif kind == "notEqual":
+            mask = numbers != target
+        elif kind == "lessThan":
+            mask = numbers < target
+        elif kind == "lessThanOrEqual":
+            mask = numbers <= target
+        elif kind == "greaterThan":
+            mask = numbers > target
+        elif kind == "greaterThanOrEqual":
+            mask = numbers >= target
+        elif kind == "inRange":
+            target_to = float(condition.get("filterTo"))
+            mask = (numbers > min(target, target_to)) & (numbers < max(target, target_to))
+        else:
+            raise ValueError(f"Tipo di filtro numerico {kind} non supportato")
+
+    # come in AG Grid, le celle vuote non soddisfano nessuna condizione numerica
+    return mask & ~blank
+
+def _column_mask(values:pd.Series, column_filter:dict) -> np.ndarray:
+    """Ritorna la maschera delle righe che soddisfano il filtro, semplice o combinato, di una colonna"""
+    if "conditions" in column_filter:
+        masks = [_column_mask(values, {"filterType":column_filter.get("filterType"), **condition})
+                 for condition in column_filter["conditions"]]
+        if column_filter.get("operator", "AND") == "OR":
+            return np.logical_or.reduce(masks)
+        return np.logical_and.reduce(masks)
+
+    if column_filter.get("filterType") == "number":
+        return _number_condition(values, column_filter)
+    if column_filter.get("filterType", "text") == "text":
+        return _text_condition(values, column_filter)
+    raise ValueError(f"Filtro {column_filter.get('filterType')} non supportato")
+
+
+## MAIN FUNC ##
+def block_bounds(request:dict) -> tuple[int, int]:
+    """Ritorna l'intervallo [startRow, endRow) di righe richiesto, di al più MAX_BLOCK_SIZE righe"""
+    request = request or {}
+    start = int(request.get("startRow") or 0)
+    end = request.get("endRow")
+    end = start + MAX_BLOCK_SIZE if end is None else min(int(end), start + MAX_BLOCK_SIZE)
+    return start, end
+
+def index_condition(index:TableIndex, col:str, column_filter:dict) -> object|None:
+    """
+    Traduce il filtro di una colonna nella condizione equivalente di TableIndex.
+
+    Sono tradotti i soli filtri semplici di uguaglianza di testo, che come in AG Grid non
+    distinguono maiuscole e minuscole, e i filtri numerici di uguaglianza e intervallo
+    sulle colonne numeriche; per gli altri filtri ritorna None
+    """
+    if "conditions" in column_filter:
+        return None
+    kind = column_filter.get("type")
+    target = column_filter.get("filter")
+
+    if column_filter.get("filterType", "text") == "text":
+        if kind != "equals" or target is None:
+            return None
+        target = str(target).lower()
+        return [value for value in index.distinct(col) if str(value).lower() == target]
+
+    if column_filter.get("filterType") != "number" or target is None or not index.is_numeric(col):
+        return None
+    if kind == "equals":
+        return {">=":float(target), "<=":float(target)}
+    if kind in NUMBER_OPERATORS:
+        return {NUMBER_OPERATORS[kind]:float(target)}
+    if kind == "inRange" and column_filter.get("filterTo") is not None:
+        bounds = sorted((float(target), float(column_filter["filterTo"])))
+        return {">":bounds[0], "<":bounds[1]}
+    return None
+
+def filter_mask(df:pd.DataFrame, filter_model:dict[str,dict]=None) -> np.ndarray:
+    """
+    Ritorna la maschera delle righe della tabella che soddisfano tutti i filtri del filterModel.
+    I filtri su colonne assenti nella tabella sono ignorati
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for col, column_filter in (filter_model or {}).items():
+        if col in df.columns:
+            mask &= _column_mask(df[col], column_filter)
+    return mask
+
+def index_sort(sort_model:list[dict], columns) -> list[str]:
+    """
+    Traduce il sortModel di una AgGrid nelle colonne di ordinamento di TableIndex,
+    precedute da "-" per l'ordinamento decrescente. Le colonne non in columns sono ignorate
+    """
+    columns = set(columns)
+    return [("-" if sort.get("sort", "asc") == "desc" else "") + sort["colId"]
+            for sort in (sort_model or []) if sort.get("colId") in columns]
+
+def sort_rows(df:pd.DataFrame, sort_model:list[dict]=None) -> pd.DataFrame:
+    """
+    Ordina la tabella secondo il sortModel, con le celle vuote in testa negli ordinamenti
+    crescenti e in coda in quelli decrescenti, per ogni colonna, come in AG Grid.
+    Le colonne assenti nella tabella sono ignorate.
+
+    L'ordinamento usa i ranghi di TableIndex, come quello della tabella non raggruppata,
+    in modo che le colonne di testo numeriche (es. Vgf) siano ordinate numericamente in entrambe le viste
+    """
+    sort = index_sort(sort_model, df.columns)
+    if not sort:
+        return df
+    return df.iloc[TableIndex(df).select(sort=sort)]
+
+def rows_block(df:pd.DataFrame, request:dict) -> dict:
+    """
+    Risponde a una richiesta di righe del row model infinite di una AgGrid,
+    filtrando e ordinando la tabella passata
+
+    :param request: getRowsRequest della AgGrid
+    :return: getRowsResponse, {"rowData":righe del blocco richiesto, "rowCount":numero di righe filtrate}
+    """
+    request = request or {}
+    start, end = block_bounds(request)
+
+    mask = filter_mask(df, request.get("filterModel"))
+    rows = df if mask.all() else df[mask]
+    rows = sort_rows(rows, request.get("sortModel"))
+
+    return {"rowData": rows.iloc[start:end].to_dict("records"), "rowCount": len(rows)}
@@ -0,0 +1,235 @@
+"""
+Il modulo implementa gli indici per colonna delle tabelle di indicizzazione, usati per
+selezionare sottoinsiemi dei file indicizzati senza scorrere tutte le righe della tabella.
+
+Per ogni colonna interrogata sono costruiti, alla prima richiesta:
+    - i codici categorici dei valori, con le righe ordinate per codice, in modo che le righe
+      con un dato valore siano un intervallo contiguo dell'ordinamento;
+    - per le colonne numeriche, o di testo con soli valori numerici (es. Vgf), i valori
+      ordinati, su cui gli intervalli sono cercati con una ricerca binaria;
+    - il rango di ogni riga, usato per ordinare le righe selezionate senza confrontarne i valori.
+
+Gli indici si riferiscono a una versione della tabella, che non deve essere modificata
+"""
+
+import numpy as np
+import pandas as pd
+
+
+## PARAMS ##
+RANGE_OPERATORS = (">", ">=", "<", "<=")
+
+
+## CLASSES ##
+class TableIndex:
+    """
+    Indici per colonna di una tabella di indicizzazione, costruiti alla prima interrogazione
+    di ogni colonna.
+
+    I filtri sono un dizionario {colonna:condizione}, dove la condizione può essere:
+        - un valore, per le righe con quel valore;
+        - una lista, tupla o set di valori, per le righe con uno qualunque dei valori;
+        - un dizionario con chiavi tra ">", ">=", "<", "<=", per le righe nell'intervallo.
+    I valori numerici sono confrontati numericamente anche con le colonne di testo numeriche,
+    in modo che -2 selezioni le righe con Vgf "-2"
+    """
+    def __init__(self, df:pd.DataFrame):
+        self.df = df
+        self.n_rows:int = len(df)
+        self._categories:dict[str, tuple[np.ndarray, pd.Index, np.ndarray, np.ndarray]] = {}
+        self._numbers:dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]|None] = {}
+        self._ranks:dict[str, np.ndarray] = {}
+
+    def select(self, filters:dict[str,object]=None, sort:list[str]=None) -> np.ndarray:
+        """
+        Ritorna le posizioni delle righe che soddisfano tutti i filtri, ordinate.
+
+        Le righe candidate sono quelle del filtro più selettivo, ricavate dagli indici;
+        gli altri filtri sono verificati sulle sole righe candidate
+
+        :param sort: colonne di ordinamento, in ordine di priorità, precedute da "-" per l'ordinamento
+            decrescente; le celle vuote sono in testa negli ordinamenti crescenti.
+            Di default le righe sono nell'ordine della tabella
+        """
+        filters = filters or {}
+        if filters:
+            found = {col:self._positions(col, condition) for col, condition in filters.items()}
+            best = min(found, key=lambda col: len(found[col]))
+            positions = np.sort(found[best])
+            for col, condition in filters.items():
+                if col != best and len(positions):
+                    positions = positions[self._mask(col, condition, positions)]
+        else:
+            positions = np.arange(self.n_rows)
+
+        if sort and len(positions) > 1:
+            # lexsort ordina secondo l'ultima chiave, ed è stabile
+            keys = []
+            for col in reversed(sort):
+                descending = col.startswith("-")
+                rank = self._rank(col[1:] if descending else col)[positions]
+                keys.append(-rank if descending else rank)
+            positions = positions[np.lexsort(keys)]
+        return positions
+
+    def distinct(self, col:str) -> pd.Index:
+        """Ritorna i valori distinti, non vuoti, della colonna"""
+        self._check_column(col)
+        return self._category_index(col)[1]
+
+    def is_numeric(self, col:str) -> bool:
+        """Ritorna True se la colonna contiene solo valori numerici, e supporta quindi le condizioni di intervallo"""
+        self._check_column(col)
+        return self._number_index(col) is not None
+
+    def _check_column(self, col:str):
+        if col not in self.df.columns:
+            raise ValueError(f"La colonna {col} non appare nella tabella")
+
+    @staticmethod
+    def _is_number(value) -> bool:
+        return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+    def _positions(self, col:str, condition) -> np.ndarray:
+        """Ritorna le posizioni, non ordinate, delle righe che soddisfano la condizione sulla colonna"""
+        self._check_column(col)
+        if isinstance(condition, dict):
+            if not condition or set(condition) - set(RANGE_OPERATORS):
+                raise ValueError(f"Condizione {condition} non supportata, operatori ammessi: {RANGE_OPERATORS}")
+            return self._range_positions(col, condition)
+        if isinstance(condition, (list, tuple, set, np.ndarray, pd.Index)):
+            found = [self._equal_positions(col, value) for value in condition]
+            if len(found) == 1:
+                return found[0]
+            return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.intp)
+        return self._equal_positions(col, condition)
+
+    def _mask(self, col:str, condition, positions:np.ndarray) -> np.ndarray:
+        """Ritorna la maschera delle righe passate che soddisfano la condizione sulla colonna"""
+        self._check_column(col)
+        if isinstance(condition, dict):
+            values = self._row_numbers(col, condition)[positions]
+            mask = np.ones(len(positions), dtype=bool)
+            for operator, value in condition.items():
+                if operator not in RANGE_OPERATORS:
+                    raise ValueError(f"Condizione {condition} non supportata, operatori ammessi: {RANGE_OPERATORS}")
+                value = float(value)
+                with np.errstate(invalid="ignore"):
+                    if operator == ">":
+                        mask &= values > value
+                    elif operator == ">=":
+                        mask &= values >= value
+                    elif operator == "<":
+                        mask &= values < value
+                    else:
+                        mask &= values <= value
+            return mask
+        if isinstance(condition, (list, tuple, set, np.ndarray, pd.Index)):
+            mask = np.zeros(len(positions), dtype=bool)
+            for value in condition:
+                mask |= self._mask(col, value, positions)
+            return mask
+
+        if self._is_number(condition) and self._number_index(col):
+            return self._row_numbers(col, condition)[positions] == condition
+        codes = self._category_index(col)[0]
+        return codes[positions] == self._code(col, condition)
+
+    def _code(self, col:str, value) -> int:
+        """Ritorna il codice categorico del valore nella colonna, -2 se assente"""
+        categories = self._category_index(col)[1]
+        code = categories.get_indexer([value])[0]
+        if code < 0 and not isinstance(value, str):
+            # le feature di testo sono salvate come stringhe
+            code = categories.get_indexer([str(value)])[0]
+        return code if code >= 0 else -2
+
+    def _equal_positions(self, col:str, value) -> np.ndarray:
+        """Ritorna le posizioni delle righe della colonna con il valore passato"""
+        if self._is_number(value) and self._number_index(col):
+            return self._range_positions(col, {">=": value, "<=": value})
+
+        _, _, order, starts = self._category_index(col)
+        code = self._code(col, value)
+        if code < 0:
+            return np.empty(0, dtype=np.intp)
+        return order[starts[code]:starts[code+1]]
+
+    def _range_positions(self, col:str, condition:dict) -> np.ndarray:
+        """Ritorna le posizioni delle righe della colonna numerica nell'intervallo passato"""
+        sorted_values, order, _ = self._checked_number_index(col, condition)
+
+        start, end = 0, len(sorted_values)
+        for operator, value in condition.items():
+            value = float(value)
+            if operator == ">":
+                start = max(start, np.searchsorted(sorted_values, value, side="right"))
+            elif operator == ">=":
+                start = max(start, np.searchsorted(sorted_values, value, side="left"))
+            elif operator == "<":
+                end = min(end, np.searchsorted(sorted_values, value, side="left"))
+            else:
+                end = min(end, np.searchsorted(sorted_values, value, side="right"))
+        return order[start:end] if start < end else np.empty(0, dtype=np.intp)
+
+    def _checked_number_index(self, col:str, condition) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        numbers = self._number_index(col)
+        if numbers is None:
+            raise ValueError(f"La colonna {col} non è numerica, non supporta la condizione {condition}")
+        return numbers
+
+    def _row_numbers(self, col:str, condition) -> np.ndarray:
+        """Ritorna i valori numerici delle righe della colonna, NaN per le celle vuote"""
+        return self._checked_number_index(col, condition)[2]
+
+    def _category_index(self, col:str) -> tuple[np.ndarray, pd.Index, np.ndarray, np.ndarray]:
+        """
+        Ritorna l'indice categorico della colonna: i codici delle righe (-1 per le celle vuote),
+        i valori corrispondenti ai codici, le posizioni delle righe ordinate per codice, e l'inizio
+        del segmento di ogni codice nell'ordinamento
+        """
+        if col not in self._categories:
+            codes, categories = pd.factorize(self.df[col])
+            order = np.argsort(codes, kind="stable")
+            starts = np.searchsorted(codes[order], np.arange(len(categories)+1))
+            self._categories[col] = (codes, pd.Index(categories), order, starts)
+        return self._categories[col]
+
+    def _number_index(self, col:str) -> tuple[np.ndarray, np.ndarray, np.ndarray]|None:
+        """
+        Ritorna i valori numerici della colonna ordinati, senza le celle vuote, le posizioni
+        delle righe corrispondenti, e i valori di tutte le righe nell'ordine della tabella,
+        o None nel caso la colonna contenga valori non numerici
+        """
+        if col not in self._numbers:
+            values = self.df[col]
+            numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+            if (np.isnan(numbers) & values.notna().to_numpy()).any():
+                self._numbers[col] = None
+            else:
+                order = np.argsort(numbers, kind="stable")
+                n_valid = np.count_nonzero(~np.isnan(numbers))
+                self._numbers[col] = (numbers[order[:n_valid]], order[:n_valid], numbers)
+        return self._numbers[col]
+
+    def _rank(self, col:str) -> np.ndarray:
+        """
+        Ritorna il rango di ogni riga della colonna, uguale per valori uguali, e -1 per le celle vuote.
+        Le colonne di testo numeriche sono ordinate numericamente
+        """
+        if col not in self._ranks:
+            self._check_column(col)
+            rank = np.full(self.n_rows, -1, dtype=np.int64)
+            numbers = self._number_index(col)
+            if numbers is not None:
+                sorted_values, order, _ = numbers
+                if len(sorted_values):
+                    rank[order] = np.concatenate(([0], np.cumsum(np.diff(sorted_values) != 0)))
+            else:
+                codes, categories, _, _ = self._category_index(col)
+                category_rank = np.empty(len(categories), dtype=np.int64)
+                category_rank[np.argsort(categories.astype(str).to_numpy(), kind="stable")] = np.arange(len(categories))
+                not_empty = codes >= 0
+                rank[not_empty] = category_rank[codes[not_empty]]
+            self._ranks[col] = rank
+        return self._ranks[col]
@@ -0,0 +1,416 @@
+"""
+Il modulo implementa il magazzino delle curve di un file_type: le coordinate delle curve di
+tutti i file indicizzati sono salvate, nella directory dei dati, in file binari su disco (blocchi),
+insieme ad un indice con file, curva, blocco, inizio e lunghezza di ogni curva.
+
+I blocchi sono letti in memory mapping, in modo che le operazioni su migliaia di file,
+come il calcolo delle affinità, siano slicing di buffer condivisi tra i processi invece di
+dizionari di oggetti Curve. Anche le curve di FileCurves sono create come viste dei buffer,
+senza copiarne le coordinate, che sono condivise dai processi tramite la cache del sistema operativo.
+
+Il magazzino è aggiornato in modo incrementale: le coordinate dei soli file nuovi o modificati
+sono lette, una alla volta, e scritte in coda ad un nuovo blocco, mentre i file non modificati
+restano nei blocchi esistenti. Quando lo spazio dei file eliminati o riscritti supera quello
+ancora in uso, o i blocchi sono troppi, il magazzino è compattato in un unico blocco
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from typing_extensions import Callable, Iterable
+import numpy as np
+from app_resources.parameters import ConfigCache
+from common.classes import FileCurves, FilesFeatures
+
+
+## PARAMS ##
+WAREHOUSE_DIR_NAME = ".warehouse"
+# da incrementare nel caso cambi il formato dei dati salvati, invalida tutti i magazzini
+WAREHOUSE_VERSION = 3
+INDEX_DTYPE = np.dtype([("file", np.int64), ("curve", np.int64), ("chunk", np.int64),
+                        ("start", np.int64), ("length", np.int64)])
+# numero di blocchi oltre il quale il magazzino è compattato
+MAX_CHUNKS = 8
+
+
+## CLASSES ##
+class CurveWarehouse:
+    """
+    Magazzino delle curve dei file di un file_type.
+
+    Le coordinate sono in blocchi di float64 in sola lettura, e la curva j del file i occupa
+    2*lengths[i,j] valori del blocco chunks[i,j] a partire da starts[i,j], prima le X e poi
+    le Y, in modo che la vista 2xN della curva non richieda copie; i file che non contengono
+    la curva hanno lunghezza 0. Ogni aggiornamento scrive una nuova generazione dell'indice,
+    e i blocchi sono scritti una sola volta, in modo che i processi che leggono la generazione
+    precedente non vedano mai dati scritti a metà.
+
+    I file che non è stato possibile leggere sono registrati con la loro chiave di validità,
+    e riletti solo dopo una loro modifica
+    """
+    _warehouses:dict[tuple[str,str], "CurveWarehouse"] = {}
+    # magazzini in aggiornamento, e lock che serializzano gli aggiornamenti di ogni magazzino
+    _syncing:set[tuple[str,str]] = set()
+    _sync_locks:dict[tuple[str,str], threading.Lock] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, file_type:str, directory:Path):
+        self.file_type:str = file_type
+        self.directory:Path = directory
+        self.curve_names:list[str] = list(FilesFeatures.get_type_configs(file_type).allowed_curves)
+        self.generation:str = None
+
+        self.files:list[str] = []
+        self.keys:np.ndarray = np.empty((0, 0), dtype=np.int64)
+        self.chunks:list[str] = []
+        self.index:np.ndarray = np.empty(0, dtype=INDEX_DTYPE)
+        # file non leggibili, con la chiave di validità al momento dell'errore
+        self.failed:dict[str,list[int]] = {}
+
+        self._data:list[np.ndarray] = []
+        self._positions:dict[str,int] = {}
+        self._chunks:np.ndarray = np.empty((0, len(self.curve_names)), dtype=np.int64)
+        self._starts:np.ndarray = np.empty((0, len(self.curve_names)), dtype=np.int64)
+        self._lengths:np.ndarray = np.empty((0, len(self.curve_names)), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.files)
+
+    @staticmethod
+    def _location(file_type:str) -> tuple[tuple[str,str], Path]:
+        """Ritorna la chiave e la cartella del magazzino del file_type nella directory dei dati corrente"""
+        directory = ConfigCache.app_configs.data_dir / WAREHOUSE_DIR_NAME / file_type
+        return (str(directory), file_type), directory
+
+    @classmethod
+    def for_type(cls,
+                 file_type:str,
+                 paths:Iterable[str|Path]=None,
+                 progress:Callable[[float],None]=None) -> "CurveWarehouse":
+        """
+        Ritorna il magazzino del file_type nella directory dei dati corrente, caricandolo
+        da disco alla prima richiesta.
+
+        L'aggiornamento è eseguito senza il lock condiviso, e il nuovo magazzino sostituisce
+        quello corrente solo al suo termine; gli aggiornamenti dello stesso magazzino sono
+        eseguiti uno alla volta
+
+        :param paths: file che il magazzino deve contenere, aggiornati se modificati
+        :param progress: funzione chiamata periodicamente con la frazione di file letti
+        """
+        key, directory = cls._location(file_type)
+        with cls._lock:
+            if key not in cls._warehouses:
+                cls._warehouses[key] = cls.load(file_type, directory)
+            if paths is None:
+                return cls._warehouses[key]
+            sync_lock = cls._sync_locks.setdefault(key, threading.Lock())
+
+        with sync_lock:
+            with cls._lock:
+                warehouse = cls._warehouses[key]
+                cls._syncing.add(key)
+            try:
+                warehouse = warehouse.sync(paths, progress)
+                with cls._lock:
+                    cls._warehouses[key] = warehouse
+            finally:
+                with cls._lock:
+                    cls._syncing.discard(key)
+        return warehouse
+
+    @classmethod
+    def current(cls, file_type:str) -> "CurveWarehouse|None":
+        """
+        Ritorna il magazzino del file_type nella directory dei dati corrente, senza aggiornarlo,
+        o None se è in corso un suo aggiornamento, in modo che le letture dei singoli file
+        non attendano la fine dell'aggiornamento
+        """
+        key, directory = cls._location(file_type)
+        with cls._lock:
+            if key in cls._syncing:
+                return None
+            if key not in cls._warehouses:
+                cls._warehouses[key] = cls.load(file_type, directory)
+            return cls._warehouses[key]
+
+    @classmethod
+    def load(cls, file_type:str, directory:Path) -> "CurveWarehouse":
+        """
+        Carica da disco, in memory mapping, il magazzino salvato nella directory.
+        Nel caso non esista, non sia leggibile o sia stato creato con curve o formato
+        diversi da quelli correnti, ritorna un magazzino vuoto
+        """
+        inst = cls(file_type, directory)
+        try:
+            with open(directory / "meta.json", 'r', encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["version"] != WAREHOUSE_VERSION or meta["curves"] != inst.curve_names:
+                return inst
+            generation = meta["generation"]
+            index = np.load(directory / f"index.{generation}.npy")
+            keys = np.load(directory / f"keys.{generation}.npy")
+            inst._set_data(generation, meta["files"], keys, meta["chunks"], index, meta["failed"])
+        except FileNotFoundError:
+            return cls(file_type, directory)
+        except Exception as e:
+            print(f"Errore nella lettura del magazzino delle curve {file_type}: {e}")
+            return cls(file_type, directory)
+        return inst
+
+    @property
+    def nbytes(self) -> int:
+        """Ritorna la dimensione dei dati del magazzino"""
+        return sum(data.nbytes for data in self._data) + self.index.nbytes + self.keys.nbytes
+
+    def positions(self, paths:Iterable[str|Path]) -> np.ndarray:
+        """Ritorna le righe del magazzino dei file passati, ad esempio la colonna file_path di una tabella"""
+        try:
+            return np.array([self._positions[str(path)] for path in paths], dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f"Il file {e.args[0]} non è contenuto nel magazzino delle curve {self.file_type}") from e
+
+    def _block(self, i:int, j:int) -> np.ndarray:
+        """Ritorna la vista 2xN della curva j del file alla riga i del magazzino"""
+        start, length = self._starts[i, j], self._lengths[i, j]
+        return self._data[self._chunks[i, j]][start:start+2*length].reshape(2, length)
+
+    def coordinates(self, path:str|Path) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """Ritorna le coordinate delle curve del file, come viste in sola lettura del magazzino"""
+        i = self.positions([path])[0]
+        return {
+            name:tuple(self._block(i, j))
+            for j, name in enumerate(self.curve_names) if self._lengths[i, j]
+        }
+
+    def views(self, path:str|Path, key:np.ndarray) -> dict[str, np.ndarray]|None:
+        """
+        Ritorna le coordinate delle curve del file come viste 2xN in sola lettura del magazzino
+
+        :param key: chiave di validità attuale del file
+        :return: dizionario {curve_acronym:xy}, o None se il magazzino non contiene il file
+            o il file è stato modificato dopo il suo inserimento
+        """
+        i = self._positions.get(str(path))
+        if i is None or not np.array_equal(self.keys[i], key):
+            return None
+        return {
+            name:self._block(i, j)
+            for j, name in enumerate(self.curve_names) if self._lengths[i, j]
+        }
+
+    def packed(self, paths:Iterable[str|Path], curve_name:str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Ritorna le coordinate di una curva dei file passati, concatenate in ordine
+
+        :return: tupla (X, Y, offsets), dove le coordinate della curva del file i sono
+            X[offsets[i]:offsets[i+1]]; i file che non contengono la curva, o che non è stato
+            possibile leggere, hanno un segmento vuoto
+        """
+        paths = [str(path) for path in paths]
+        found = np.array([path in self._positions for path in paths], dtype=bool)
+        missing = [path for path in paths if path not in self._positions and path not in self.failed]
+        if missing:
+            raise ValueError(f"Il file {missing[0]} non è contenuto nel magazzino delle curve {self.file_type}")
+
+        rows = np.array([self._positions.get(path, 0) for path in paths], dtype=np.int64)
+        j = self.curve_names.index(curve_name)
+        chunks, starts = self._chunks[rows, j], self._starts[rows, j]
+        lengths = np.where(found, self._lengths[rows, j], 0) if len(rows) else np.empty(0, dtype=np.int64)
+
+        offsets = np.zeros(len(rows)+1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        x, y = np.empty(offsets[-1]), np.empty(offsets[-1])
+        for chunk in np.unique(chunks[lengths > 0]):
+            segments = np.flatnonzero((chunks == chunk) & (lengths > 0))
+            segment_lengths = lengths[segments]
+            segment_offsets = np.zeros(len(segments)+1, dtype=np.int64)
+            np.cumsum(segment_lengths, out=segment_offsets[1:])
+            # posizione di ogni punto all'interno del proprio segmento
+            within = np.arange(segment_offsets[-1]) - np.repeat(segment_offsets[:-1], segment_lengths)
+            source = np.repeat(starts[segments], segment_lengths) + within
+            target = np.repeat(offsets[segments], segment_lengths) + within
+            data = self._data[chunk]
+            x[target] = data[source]
+            y[target] = data[source + np.repeat(segment_lengths, segment_lengths)]
+        return x, y, offsets
+
+    def _is_current(self, path:str, key:np.ndarray) -> bool:
+        """Ritorna True se il magazzino contiene il file aggiornato, o il suo errore di lettura"""
+        if path in self.failed:
+            return np.array_equal(self.failed[path], key)
+        i = self._positions.get(path)
+        return i is not None and np.array_equal(self.keys[i], key)
+
+    def sync(self, paths:Iterable[str|Path], progress:Callable[[float],None]=None) -> "CurveWarehouse":
+        """
+        Controlla che il magazzino contenga i dati aggiornati dei file passati.
+        I file non più esistenti sono ignorati
+
+        :return: l'istanza stessa se aggiornata, altrimenti un nuovo magazzino contenente
+            i file passati e quelli ancora esistenti del magazzino corrente
+        """
+        keys = {}
+        for path in paths:
+            try:
+                keys[str(path)] = FileCurves.file_key(path)
+            except OSError:
+                continue
+        changed = [path for path, key in keys.items() if not self._is_current(path, key)]
+        if not changed:
+            return self
+
+        # mantengo i file non richiesti solo se non sono stati modificati
+        for path in [*self.files, *self.failed]:
+            if path not in keys:
+                try:
+                    key = FileCurves.file_key(path)
+                except OSError:
+                    continue
+                if self._is_current(path, key):
+                    keys[path] = key
+
+        return self._update(keys, changed, progress)
+
+    def _update(self,
+                keys:dict[str,np.ndarray],
+                changed:list[str],
+                progress:Callable[[float],None]=None) -> "CurveWarehouse":
+        """
+        Scrive su disco una nuova generazione del magazzino: le coordinate dei file modificati
+        sono lette una alla volta e scritte in un nuovo blocco, quelle degli altri file restano
+        nei blocchi esistenti, salvo il caso in cui il magazzino debba essere compattato
+        """
+        n_curves = len(self.curve_names)
+        to_read = set(changed)
+        failed = {path:self.failed[path] for path in keys if path not in to_read and path in self.failed}
+        unchanged = [path for path in keys if path not in to_read and path not in failed]
+        rows = np.array([self._positions[path] for path in unchanged], dtype=np.int64)
+
+        # spazio ancora in uso nei blocchi esistenti, contro quello complessivo
+        live = 2 * int(self._lengths[rows].sum()) if len(rows) else 0
+        compact = (len(self.chunks) >= MAX_CHUNKS or
+                   sum(data.size for data in self._data) > 2 * live)
+
+        generation = f"{time.time_ns()}-{os.getpid()}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        chunk_name = f"xy.{generation}.bin"
+        chunks = [] if compact else list(self.chunks)
+        new_chunk = len(chunks)
+
+        files:list[str] = []
+        entries:list[np.ndarray] = []
+        with open(self.directory / chunk_name, 'wb') as f:
+            offset = 0
+            def write(block:np.ndarray) -> int:
+                # ritorna la posizione nel nuovo blocco dei dati scritti
+                nonlocal offset
+                f.write(np.ascontiguousarray(block, dtype=np.float64).tobytes())
+                offset += block.size
+                return offset - block.size
+
+            for path, i in zip(unchanged, rows):
+                entry = np.zeros((3, n_curves), dtype=np.int64)
+                entry[2] = self._lengths[i]
+                if compact:
+                    entry[0] = new_chunk
+                    for j in np.flatnonzero(entry[2]):
+                        entry[1, j] = write(self._block(i, j))
+                else:
+                    entry[0], entry[1] = self._chunks[i], self._starts[i]
+                files.append(path)
+                entries.append(entry)
+
+            step = max(len(changed)//100, 1)
+            for n, path in enumerate(changed):
+                if progress is not None and n % step == 0:
+                    progress(n/len(changed))
+                try:
+                    coordinates = FileCurves.load_coordinates(path, keys[path])
+                except Exception as e:
+                    # il file è escluso dal magazzino, e riletto solo dopo una sua modifica
+                    print(f"Errore nell'inserimento di {Path(path).name} nel magazzino delle curve: {e}")
+                    failed[path] = keys[path].tolist()
+                    continue
+                entry = np.zeros((3, n_curves), dtype=np.int64)
+                entry[0] = new_chunk
+                for j, name in enumerate(self.curve_names):
+                    if name in coordinates:
+                        x, y = coordinates[name]
+                        entry[1, j], entry[2, j] = write(np.stack([x, y])), len(x)
+                files.append(path)
+                entries.append(entry)
+
+        if offset:
+            chunks.append(chunk_name)
+        else:
+            (self.directory / chunk_name).unlink()
+        entries = np.stack(entries) if entries else np.zeros((0, 3, n_curves), dtype=np.int64)
+
+        # elimino dalla lista i blocchi non più usati, rinumerando quelli rimasti
+        used = np.unique(entries[:, 0][entries[:, 2] > 0])
+        renumber = np.zeros(max(len(chunks), 1), dtype=np.int64)
+        renumber[used] = np.arange(len(used))
+        chunks = [chunks[c] for c in used]
+
+        file_rows, curves = np.nonzero(entries[:, 2])
+        index = np.empty(len(file_rows), dtype=INDEX_DTYPE)
+        index["file"], index["curve"] = file_rows, curves
+        index["chunk"] = renumber[entries[file_rows, 0, curves]]
+        index["start"], index["length"] = entries[file_rows, 1, curves], entries[file_rows, 2, curves]
+        keys = np.vstack([keys[path] for path in files]) if files else np.empty((0, 0), dtype=np.int64)
+        np.save(self.directory / f"index.{generation}.npy", index)
+        np.save(self.directory / f"keys.{generation}.npy", keys)
+
+        # il meta è rinominato per ultimo, in modo che punti sempre ad una generazione completa
+        tmp_meta = self.directory / f"meta.{generation}.tmp"
+        with open(tmp_meta, 'w', encoding="utf-8") as f:
+            json.dump({"version":WAREHOUSE_VERSION, "generation":generation, "curves":self.curve_names,
+                       "files":files, "chunks":chunks, "failed":failed}, f)
+        os.replace(tmp_meta, self.directory / "meta.json")
+        self._remove_generations(keep=generation, chunks=chunks)
+
+        inst = type(self)(self.file_type, self.directory)
+        inst._set_data(generation, files, keys, chunks, index, failed)
+        return inst
+
+    def _set_data(self,
+                  generation:str,
+                  files:list[str],
+                  keys:np.ndarray,
+                  chunks:list[str],
+                  index:np.ndarray,
+                  failed:dict[str,list[int]]):
+        self.generation = generation
+        self.files = files
+        self.keys = keys
+        self.chunks = chunks
+        self.index = index
+        self.failed = failed
+        # un file vuoto non può essere mappato in memoria
+        self._data = [
+            np.memmap(self.directory / chunk, dtype=np.float64, mode="r")
+            if os.path.getsize(self.directory / chunk) else np.empty(0)
+            for chunk in chunks
+        ]
+        self._positions = {path:i for i, path in enumerate(files)}
+
+        shape = (len(files), len(self.curve_names))
+        self._chunks = np.zeros(shape, dtype=np.int64)
+        self._starts = np.zeros(shape, dtype=np.int64)
+        self._lengths = np.zeros(shape, dtype=np.int64)
+        self._chunks[index["file"], index["curve"]] = index["chunk"]
+        self._starts[index["file"], index["curve"]] = index["start"]
+        self._lengths[index["file"], index["curve"]] = index["length"]
+
+    def _remove_generations(self, keep:str, chunks:list[str]):
+        """Elimina i file delle generazioni precedenti e i blocchi non più in uso"""
+        for path in self.directory.iterdir():
+            if path.name != "meta.json" and keep not in path.name and path.name not in chunks:
+                try:
+                    path.unlink()
+                except OSError:
+                    # su Windows un file mappato da un altro processo non può essere eliminato
+                    pass
@@ -1,3 +1,4 @@
+import os
 from dash import Dash, page_container
 from app_elements.page_elements import custom_spinner
 from app_elements.builders import *
@@ -17,8 +18,9 @@ app = Dash(
 for file_type in GLOBAL_CACHE.file_types:
     page_builder(file_type)
 
+# i flag contengono la versione della tabella del file_type visualizzata nella pagina
 stores_flag_cache_refreshed = [
-    dcc.Store(id={'page':ft, 'item':'store-flag-refreshed-cache'}, data=False)
+    dcc.Store(id={'page':ft, 'item':'store-flag-refreshed-cache'}, data=GLOBAL_CACHE.tables.version(ft))
     for ft in GLOBAL_CACHE.file_types
 ]
 
@@ -36,6 +38,11 @@ app.layout = dbc.Container([
 
     *stores_flag_cache_refreshed,
 
+    # controllo periodico delle versioni delle tabelle, aggiornate dal watcher della directory dei dati
+    dcc.Interval(id='interval-watcher',
+                 interval=GLOBAL_CACHE.app_configs.watch_interval*1000,
+                 disabled=not GLOBAL_CACHE.app_configs.watch_data_dir),
+
     dcc.Loading(
         custom_spinner=custom_spinner("Refresh "),
         overlay_style={"visibility": "visible", "filter": "blur(2px)"},
@@ -60,5 +67,22 @@ app.layout = dbc.Container([
     style={'backgroundColor': 'var(--bs-body-bg)', 'minHeight': '100vh'}
 )
 
+DEBUG = True
+
+# con il reloader di debug il modulo è eseguito sia dal processo che sorveglia i sorgenti che da
+# quello che serve l'applicazione: i servizi in background vanno avviati solo nel secondo.
+# Senza debug, o importando il modulo da un server WSGI come gunicorn o waitress, il modulo è
+# eseguito una sola volta e i servizi sono sempre avviati
+reloader_process = __name__ == '__main__' and DEBUG and os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+if not reloader_process:
+    if GLOBAL_CACHE.app_configs.watch_data_dir:
+        GLOBAL_CACHE.start_watcher()
+    # i magazzini delle curve sono aggiornati in background, le curve sono lette dai .csv fino al termine
+    if GLOBAL_CACHE.app_configs.curve_warehouse:
+        GLOBAL_CACHE.start_warehouse_sync()
+
+# server WSGI dell'applicazione (es. gunicorn app:server)
+server = app.server
+
 if __name__ == '__main__':
-    app.run(debug=True, host='127.0.0.1', port=8050)
\ No newline at end of file
+    app.run(debug=DEBUG, host='127.0.0.1', port=8050)
@@ -0,0 +1,63 @@
+"""
+Benchmark del calcolo in blocco delle affinità rispetto a quello file per file
+
+Da eseguire come script, con i pacchetti dell'applicazione installati
+"""
+
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from app_resources.parameters import ConfigCache
+from common.affinity import batch_affinities
+from common.classes import FeaturesParser, FileCurves, FilesFeatures
+from common.curve_cache import CURVES_CACHE
+
+
+## BENCHMARK ##
+def benchmark_affinities(n_files:int=10_000, n_points:int=200):
+    """
+    Confronta il calcolo delle affinità file per file di FileCurves con quello in blocco,
+    su n_files file IDVD sintetici, con la cache su disco delle curve già popolata
+    """
+    import tempfile
+    import time
+
+    curve_names = list(FilesFeatures.get_type_configs("IDVD").allowed_curves)
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 10, n_points)
+
+    # le curve sono lette dalla cache su disco dei singoli file, senza magazzino
+    configs = ConfigCache.app_configs
+    saved_configs = (configs.curve_cache, configs.curve_warehouse)
+    configs.curve_cache, configs.curve_warehouse = True, False
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i in range(n_files):
+                path = Path(tmp) / f"IDVD_TrapDistr_exponential_Vgf_{i%5-2}_Es_{i}_Em_0.2.csv"
+                data = {}
+                for name in curve_names:
+                    data[f"{name} X"] = x
+                    data[f"{name} Y"] = np.tanh(x) * rng.uniform(0.5, 1.5)
+                pd.DataFrame(data).to_csv(path, index=False)
+                paths.append(path)
+
+            df = FeaturesParser.for_type("IDVD").parse(paths)
+            # popolo la cache su disco, in modo da confrontare i soli calcoli
+            for path in paths:
+                FileCurves.load_coordinates(path)
+            CURVES_CACHE.clear()
+
+            start = time.perf_counter()
+            FileCurves.from_df(df).calculate_affinities()
+            print(f"FileCurves.calculate_affinities, {n_files} file: {time.perf_counter()-start:.3f} s")
+            CURVES_CACHE.clear()
+
+            start = time.perf_counter()
+            batch_affinities("IDVD", df)
+            print(f"batch_affinities, {n_files} file: {time.perf_counter()-start:.3f} s")
+    finally:
+        configs.curve_cache, configs.curve_warehouse = saved_configs
+
+if __name__ == "__main__":
+    benchmark_affinities()
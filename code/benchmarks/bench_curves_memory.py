@@ -0,0 +1,48 @@
+"""
+Benchmark della memoria occupata dalle curve caricate
+
+Da eseguire come script, con i pacchetti dell'applicazione installati
+"""
+
+import numpy as np
+from scipy.interpolate import interp1d
+from app_resources.parameters import ConfigCache
+from common.classes import Curve
+
+
+## BENCHMARK ##
+def benchmark_curves_memory(n_files:int=2000, n_curves:int=4, n_points:int=500):
+    """
+    Misura, con tracemalloc, la memoria occupata dalle curve di n_files file, confrontando
+    array X e Y separati con interp1d per ogni curva (la rappresentazione precedente),
+    con le curve in un unico array per file, in float64 e float32
+    """
+    import tracemalloc
+
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 10, n_points)
+    files = [[(f"c{j}", x, np.tanh(x)*rng.uniform(0.5, 1.5)) for j in range(n_curves)] for _ in range(n_files)]
+
+    def measure(label:str, build):
+        tracemalloc.start()
+        data = [build(coordinates) for coordinates in files]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label}, {n_files} file: {size/2**20:.1f} MB")
+        return data
+
+    measure("X, Y e interp1d separati", lambda coordinates: {
+        name:(x.copy(), y.copy(), interp1d(x, y, kind='cubic')) for name, x, y in coordinates
+    })
+
+    configs = ConfigCache.app_configs
+    curve_dtype = configs.curve_dtype
+    try:
+        for dtype in ("float64", "float32"):
+            configs.curve_dtype = dtype
+            measure(f"Curve.create_many {dtype}", Curve.create_many)
+    finally:
+        configs.curve_dtype = curve_dtype
+
+if __name__ == "__main__":
+    benchmark_curves_memory()
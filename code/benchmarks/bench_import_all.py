@@ -0,0 +1,78 @@
+"""
+Benchmark della lettura parallela dei file delle curve rispetto a quella sequenziale
+
+Da eseguire come script, con i pacchetti dell'applicazione installati
+"""
+
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from app_resources.parameters import ConfigCache
+from common.classes import FileCurves, FilesFeatures
+from common.curve_cache import CURVES_CACHE
+
+
+## BENCHMARK ##
+def benchmark_import_all(n_files:int=500, n_points:int=2000, workers:int=8):
+    """
+    Confronta la lettura sequenziale di n_files file IDVD sintetici con quella parallela,
+    con pool di thread e di processi, a cache del sistema operativo fredda e calda.
+
+    La cache su disco e il magazzino delle curve sono disattivati, in modo da misurare la sola lettura dei .csv;
+    la cache fredda è ottenuta scartando le pagine dei file con posix_fadvise, dove disponibile
+    """
+    import tempfile
+    import time
+
+    def drop_os_cache(paths:list[Path]):
+        if not hasattr(os, "posix_fadvise"):
+            return False
+        os.sync()
+        for path in paths:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+        return True
+
+    curve_names = list(FilesFeatures.get_type_configs("IDVD").allowed_curves)
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 10, n_points)
+
+    configs = ConfigCache.app_configs
+    saved_configs = (configs.curve_cache, configs.curve_warehouse, configs.load_workers, configs.load_pool)
+    configs.curve_cache, configs.curve_warehouse = False, False
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i in range(n_files):
+                path = Path(tmp) / f"IDVD_TrapDistr_exponential_Vgf_{i%5-2}_Es_{i}_Em_0.2.csv"
+                pd.DataFrame({
+                    col:data for name in curve_names
+                    for col, data in ((f"{name} X", x), (f"{name} Y", np.tanh(x)*rng.uniform(0.5, 1.5)))
+                }).to_csv(path, index=False)
+                paths.append(path)
+
+            for label, pool, n_workers in (("sequenziale", "thread", 1),
+                                           ("thread", "thread", workers),
+                                           ("processi", "process", workers)):
+                configs.load_pool, configs.load_workers = pool, n_workers
+                # avvio il pool prima delle misure
+                if n_workers > 1:
+                    FileCurves._load_pool(pool, n_workers)
+                for os_cache in ("fredda", "calda"):
+                    if os_cache == "fredda" and not drop_os_cache(paths):
+                        continue
+                    CURVES_CACHE.clear()
+                    start = time.perf_counter()
+                    FileCurves.from_paths(*paths)
+                    print(f"import_all {label}, cache {os_cache}, {n_files} file: "
+                          f"{time.perf_counter()-start:.3f} s")
+    finally:
+        configs.curve_cache, configs.curve_warehouse, configs.load_workers, configs.load_pool = saved_configs
+        CURVES_CACHE.clear()
+
+if __name__ == "__main__":
+    benchmark_import_all()
@@ -0,0 +1,34 @@
+"""
+Benchmark dei backend di salvataggio delle tabelle di indicizzazione
+
+Da eseguire come script, con i pacchetti dell'applicazione installati
+"""
+
+import pandas as pd
+from app_resources.parameters import ConfigCache
+from common.index_store import ExcelIndexStore, ParquetIndexStore
+
+
+## BENCHMARK ##
+def benchmark_store(n_rows:int=100_000):
+    """Misura i tempi di salvataggio e caricamento di una tabella IDVD di n_rows righe"""
+    import tempfile
+    import time
+
+    cols = ConfigCache.files_configs["IDVD"].get_table_cols
+    df = pd.DataFrame({col:[None]*n_rows for col in cols})
+    df["file_path"] = [f"IDVD_TrapDistr_exponential_Vgf_{i%5-2}_Es_{i}.csv" for i in range(n_rows)]
+    df["Vgf"] = [str(i%5-2) for i in range(n_rows)]
+    df["TrapDistr"] = "exponential"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for store in (ParquetIndexStore(tmp), ExcelIndexStore(tmp)):
+            start = time.perf_counter()
+            store.save("IDVD", df)
+            saved = time.perf_counter()
+            store.load("IDVD")
+            loaded = time.perf_counter()
+            print(f"{store.name}: salvataggio {saved-start:.3f} s, caricamento {loaded-saved:.3f} s")
+
+if __name__ == "__main__":
+    benchmark_store()
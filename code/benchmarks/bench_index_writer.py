@@ -0,0 +1,43 @@
+"""
+Benchmark del salvataggio in background delle tabelle di indicizzazione
+
+Da eseguire come script, con i pacchetti dell'applicazione installati
+"""
+
+import pandas as pd
+from app_resources.parameters import ConfigCache
+from common.index_store import IndexWriter, ParquetIndexStore
+
+
+## BENCHMARK ##
+def benchmark_writer(n_rows:int=100_000, n_updates:int=20):
+    """
+    Confronta il tempo per cui resta bloccato il chiamante, e il numero di scritture,
+    per n_updates aggiornamenti ravvicinati di una tabella IDVD di n_rows righe,
+    salvati subito o tramite l'IndexWriter
+    """
+    import tempfile
+    import time
+
+    cols = ConfigCache.files_configs["IDVD"].get_table_cols
+    df = pd.DataFrame({col:[None]*n_rows for col in cols})
+    df["file_path"] = [f"IDVD_TrapDistr_exponential_Vgf_{i%5-2}_Es_{i}.csv" for i in range(n_rows)]
+    df["Vgf"] = [str(i%5-2) for i in range(n_rows)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ParquetIndexStore(tmp)
+        start = time.perf_counter()
+        for _ in range(n_updates):
+            store.save("IDVD", df)
+        print(f"salvataggio sincrono: {time.perf_counter()-start:.3f} s, {n_updates} scritture")
+
+        writer = IndexWriter(store, delay=0.5)
+        start = time.perf_counter()
+        for _ in range(n_updates):
+            writer.schedule("IDVD", df)
+        blocked = time.perf_counter() - start
+        writer.close()
+        print(f"IndexWriter: {blocked*1000:.2f} ms, {writer.writes} scritture")
+
+if __name__ == "__main__":
+    benchmark_writer()
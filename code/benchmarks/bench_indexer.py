@@ -0,0 +1,46 @@
+"""
+Benchmark dell'aggiornamento incrementale dell'indice della directory dei dati
+
+Da eseguire come script, con i pacchetti dell'applicazione installati
+"""
+
+from pathlib import Path
+from common.indexer import indexer
+
+
+## BENCHMARK ##
+def benchmark_refresh(n_files:int=5000, changes:tuple[int,...]=(0, 10, 100, 1000)):
+    """
+    Misura il tempo di aggiornamento dell'indice al variare del numero di file
+    modificati, a parità di file presenti nella directory.
+
+    I file sono creati in una directory temporanea, con nomi del tipo IDVD supportato
+    """
+    import tempfile
+    import time
+
+    def _write(path:Path, i:int):
+        path.write_text(f"v0 X,v0 Y\n0,{i}\n1,{i}\n", encoding="utf-8")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for i in range(n_files):
+            _write(tmp / f"IDVD_TrapDistr_exponential_Vgf_{i%5-2}_Es_{i}_Em_0.2.csv", i)
+
+        start = time.perf_counter()
+        indexer(tmp)
+        print(f"Indicizzazione completa di {n_files} file: {time.perf_counter()-start:.3f} s")
+
+        for n_changed in changes:
+            for i in range(n_changed):
+                _write(tmp / f"IDVD_TrapDistr_exponential_Vgf_{i%5-2}_Es_{i}_Em_0.2.csv", -i-1)
+                _write(tmp / f"IDVD_TrapDistr_uniform_Vgf_{i%5-2}_Es_{i}_Em_{n_changed}.csv", i)
+
+            start = time.perf_counter()
+            out = indexer(tmp)
+            n_rows = sum(len(paths) for f_changes in out.values() for paths in f_changes.values())
+            print(f"Aggiornamento con {2*n_changed} file cambiati ({n_rows} righe): "
+                  f"{time.perf_counter()-start:.3f} s")
+
+if __name__ == "__main__":
+    benchmark_refresh()
@@ -0,0 +1,42 @@
+"""
+Benchmark della valutazione delle funzioni di interpolazione delle curve
+
+Da eseguire come script, con i pacchetti dell'applicazione installati
+"""
+
+import numpy as np
+from app_resources.parameters import ConfigCache
+from common.classes import Curve
+
+
+## BENCHMARK ##
+def benchmark_interpolation(n_curves:int=1000, n_points:int=500, n_x:int=50):
+    """
+    Confronta la valutazione di n_curves curve, con le stesse ascisse, su n_x ascisse
+    curva per curva, con interp1d e con la spline, e in blocco con Curve.evaluate_many
+    """
+    import time
+
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 10, n_points)
+    x_vals = np.linspace(0.5, 9.5, n_x)
+    configs = ConfigCache.app_configs
+    interp_backend = configs.interp_backend
+    try:
+        for backend in ("interp1d", "spline"):
+            configs.interp_backend = backend
+            curves = [Curve.create("c", x, np.tanh(x)*rng.uniform(0.5, 1.5)) for _ in range(n_curves)]
+            start = time.perf_counter()
+            for curve in curves:
+                curve.f_cubic(x_vals)
+            print(f"{backend}, {n_curves} curve: {time.perf_counter()-start:.3f} s")
+    finally:
+        configs.interp_backend = interp_backend
+
+    curves = [Curve.create("c", x, np.tanh(x)*rng.uniform(0.5, 1.5)) for _ in range(n_curves)]
+    start = time.perf_counter()
+    Curve.evaluate_many(curves, x_vals)
+    print(f"Curve.evaluate_many, {n_curves} curve: {time.perf_counter()-start:.3f} s")
+
+if __name__ == "__main__":
+    benchmark_interpolation()
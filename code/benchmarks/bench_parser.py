@@ -0,0 +1,32 @@
+"""
+Benchmark del parser vettoriale delle feature contenute nei nomi dei file
+
+Da eseguire come script, con i pacchetti dell'applicazione installati
+"""
+
+from common.classes import FeaturesParser, FilesFeatures
+
+
+## BENCHMARK ##
+def benchmark_parser(n_files:int=1_000_000):
+    """
+    Misura il tempo di estrazione delle feature di n_files nomi di file IDVD sintetici,
+    confrontando il parser vettoriale con l'estrazione file per file
+    """
+    import time
+
+    paths = [f"data/IDVD_TrapDistr_exponential_Vgf_{i%5-2}_Es_{i%7/10}_Em_{i}.csv" for i in range(n_files)]
+
+    start = time.perf_counter()
+    FeaturesParser.parse_by_type(paths)
+    print(f"FeaturesParser, {n_files} file: {time.perf_counter()-start:.3f} s")
+
+    sample = paths[:n_files//100]
+    start = time.perf_counter()
+    for path in sample:
+        FilesFeatures.extract_features(path)
+    print(f"extract_features, {n_files} file (stimato da {len(sample)}): "
+          f"{(time.perf_counter()-start)*n_files/len(sample):.3f} s")
+
+if __name__ == "__main__":
+    benchmark_parser()
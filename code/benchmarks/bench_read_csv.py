@@ -0,0 +1,73 @@
+"""
+Benchmark della lettura dei file .csv delle curve, con e senza selezione delle colonne
+
+Da eseguire come script, con i pacchetti dell'applicazione installati
+"""
+
+import importlib.util
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from common.classes import FileCurves
+
+
+## BENCHMARK ##
+def benchmark_read_csv(n_files:int=100, n_extra_curves:int=200, n_points:int=1000):
+    """
+    Confronta la lettura di n_files file PassDon sintetici, con le curve ammesse e
+    n_extra_curves curve aggiuntive, leggendo e pulendo tutte le colonne con pandas
+    (la lettura precedente), con la lettura delle sole colonne delle curve ammesse,
+    con il parser C e con quello di pyarrow
+    """
+    import tempfile
+    import time
+
+    def read_all_columns(file_path:Path) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        data = pd.read_csv(file_path, na_values="-")
+        coordinates = {}
+        for curve_name in {col.split(' ')[0] for col in data.columns}:
+            x_col, y_col = f"{curve_name} X", f"{curve_name} Y"
+            cleaned = data[[x_col, y_col]].dropna().drop_duplicates(subset=[x_col], keep='first')
+            x, y = cleaned[x_col].to_numpy(dtype=float), cleaned[y_col].to_numpy(dtype=float)
+            i_sorted = np.argsort(x)
+            coordinates[curve_name] = (x[i_sorted], y[i_sorted])
+        return coordinates
+
+    curve_names = FileCurves.read_curve_names("PassDon")
+    all_curves = curve_names + [f"trapped_charge_density_{2+i/1000:.4f}" for i in range(n_extra_curves)]
+    rng = np.random.default_rng(0)
+    x = np.linspace(-1, 1, n_points)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(n_files):
+            path = Path(tmp) / f"PassDon_TrapDistr_exponential_Vgf_{i}_state_on.csv"
+            data = {}
+            for name in all_curves:
+                # curve di lunghezze diverse, completate con il segnaposto "-"
+                n_valid = rng.integers(n_points//2, n_points+1)
+                data[f"{name} X"] = np.where(np.arange(n_points) < n_valid, x, np.nan)
+                data[f"{name} Y"] = np.exp(x) * rng.uniform(0.5, 1.5)
+            pd.DataFrame(data).to_csv(path, index=False, na_rep="-")
+            paths.append(path)
+
+        start = time.perf_counter()
+        for path in paths:
+            read_all_columns(path)
+        print(f"lettura di tutte le colonne, {n_files} file: {time.perf_counter()-start:.3f} s")
+
+        engines = ["c", "pyarrow"] if importlib.util.find_spec("pyarrow") is not None else ["c"]
+        default_engine = FileCurves._csv_engine
+        try:
+            for engine in engines:
+                FileCurves._csv_engine = engine
+                start = time.perf_counter()
+                for path in paths:
+                    FileCurves.read_file_coordinates(path, curve_names)
+                print(f"lettura delle curve ammesse, parser {engine}, {n_files} file: "
+                      f"{time.perf_counter()-start:.3f} s")
+        finally:
+            FileCurves._csv_engine = default_engine
+
+if __name__ == "__main__":
+    benchmark_read_csv()
@@ -0,0 +1,50 @@
+"""
+Benchmark della selezione delle righe delle tabelle tramite TableIndex
+
+Da eseguire come script, con i pacchetti dell'applicazione installati
+"""
+
+import numpy as np
+import pandas as pd
+from common.table_index import TableIndex
+
+
+## BENCHMARK ##
+def benchmark_query(n_rows:int=1_000_000, n_queries:int=100):
+    """
+    Confronta la selezione delle righe di una tabella IDVD sintetica di n_rows righe
+    con maschere booleane su tutte le righe, con la selezione tramite TableIndex,
+    per il filtro TrapDistr=exponential, Vgf tra -2 e 2, Es=0.4
+    """
+    import time
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "TrapDistr": rng.choice(["exponential", "uniform", "gaussian"], n_rows).astype(object),
+        "Es": rng.choice([str(i/10) for i in range(50)], n_rows).astype(object),
+        "Vgf": rng.choice([str(v) for v in range(-5, 6)], n_rows).astype(object),
+        "aff_tot": rng.random(n_rows),
+    })
+    filters = {"TrapDistr": "exponential", "Vgf": {">=": -2, "<=": 2}, "Es": "0.4"}
+
+    start = time.perf_counter()
+    for _ in range(n_queries):
+        vgf = pd.to_numeric(df["Vgf"])
+        mask = (df["TrapDistr"] == "exponential") & (vgf >= -2) & (vgf <= 2) & (df["Es"] == "0.4")
+        expected = np.flatnonzero(mask.to_numpy())
+    print(f"maschere booleane, {n_rows} righe: {(time.perf_counter()-start)/n_queries*1000:.3f} ms per query")
+
+    index = TableIndex(df)
+    start = time.perf_counter()
+    index.select(filters)
+    print(f"costruzione degli indici: {(time.perf_counter()-start)*1000:.1f} ms")
+
+    start = time.perf_counter()
+    for _ in range(n_queries):
+        positions = index.select(filters)
+    print(f"TableIndex, {n_rows} righe: {(time.perf_counter()-start)/n_queries*1000:.3f} ms per query, "
+          f"{len(positions)} righe selezionate")
+    assert np.array_equal(positions, expected)
+
+if __name__ == "__main__":
+    benchmark_query()
@@ -0,0 +1,62 @@
+"""
+Benchmark delle letture delle tabelle in memoria di TablesCache
+
+Da eseguire come script, con i pacchetti dell'applicazione installati
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+from app_resources.AppCache import TablesCache
+
+
+## BENCHMARK ##
+def benchmark_table_reads(n_rows:int=200_000, n_calls:int=20):
+    """
+    Misura latenza e picco di memoria delle letture di tabella di una callback (tabella,
+    colonne da nascondere e tabella senza affinità), su una tabella IDVD sintetica di n_rows righe,
+    confrontando le copie complete, usate in precedenza, con le copie copy-on-write di TablesCache
+    """
+    import time
+    import tracemalloc
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "TrapDistr": "exponential",
+        "Em": rng.choice(["0.1", "0.2", "0.3"], n_rows).astype(object),
+        "Es": rng.choice([str(i/10) for i in range(50)], n_rows).astype(object),
+        "Vgf": rng.choice(["-2", "-1", "0", "1", "2"], n_rows).astype(object),
+        "file_path": [f"data/IDVD_TrapDistr_exponential_Es_{i}.csv" for i in range(n_rows)],
+        **{f"aff_{curve}": rng.random(n_rows) for curve in ("v0", "0", "15", "30", "tot")},
+    })
+
+    # istanza senza indicizzazione della directory dei dati, con la sola tabella sintetica
+    tables = TablesCache.__new__(TablesCache)
+    tables._lock = threading.RLock()
+    tables._versions = {}
+    tables._grouped = {}
+    tables._tables = {"IDVD": df}
+
+    def callback(get):
+        data = get("IDVD")
+        TablesCache.cols_to_hide(data)
+        no_aff = data[[col for col in data.columns if "aff_" not in col]].reset_index(drop=True)
+        return len(no_aff)
+
+    def measure(label:str, get, copy_on_write:bool):
+        with pd.option_context("mode.copy_on_write", copy_on_write):
+            tracemalloc.start()
+            start = time.perf_counter()
+            for _ in range(n_calls):
+                callback(get)
+            elapsed = (time.perf_counter()-start) / n_calls
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        print(f"{label}, {n_rows} righe: {elapsed*1000:.2f} ms per callback, "
+              f"picco di memoria {peak/2**20:.1f} MB")
+
+    measure("copie complete", lambda file_type: tables._tables[file_type].copy(), False)
+    measure("copie copy-on-write", tables.get, True)
+
+if __name__ == "__main__":
+    benchmark_table_reads()
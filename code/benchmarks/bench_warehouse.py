@@ -0,0 +1,61 @@
+"""
+Benchmark della lettura delle curve dal magazzino rispetto alla cache su disco dei singoli file
+
+Da eseguire come script, con i pacchetti dell'applicazione installati
+"""
+
+import time
+from pathlib import Path
+import numpy as np
+from app_resources.parameters import ConfigCache
+from common.classes import FilesFeatures
+from common.warehouse import CurveWarehouse
+
+
+## BENCHMARK ##
+def benchmark_warehouse(n_files:int=5000, n_points:int=200):
+    """
+    Confronta la concatenazione delle curve di n_files file IDVD sintetici tramite
+    la cache su disco dei singoli file (pack_curves) con lo slicing del magazzino
+    """
+    import tempfile
+    import pandas as pd
+    from common.affinity import pack_curves
+    from common.curve_cache import CURVES_CACHE
+
+    curve_names = list(FilesFeatures.get_type_configs("IDVD").allowed_curves)
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 10, n_points)
+
+    data_dir = ConfigCache.app_configs.data_dir
+    with tempfile.TemporaryDirectory() as tmp:
+        ConfigCache.app_configs.data_dir = tmp
+        try:
+            paths = []
+            for i in range(n_files):
+                path = Path(tmp) / f"IDVD_TrapDistr_exponential_Vgf_{i%5-2}_Es_{i}_Em_0.2.csv"
+                pd.DataFrame({
+                    col:data for name in curve_names
+                    for col, data in ((f"{name} X", x), (f"{name} Y", np.tanh(x)*rng.uniform(0.5, 1.5)))
+                }).to_csv(path, index=False)
+                paths.append(path)
+
+            start = time.perf_counter()
+            warehouse = CurveWarehouse.for_type("IDVD", paths)
+            print(f"Creazione del magazzino, {n_files} file: {time.perf_counter()-start:.3f} s")
+            CURVES_CACHE.clear()
+
+            start = time.perf_counter()
+            pack_curves(paths, curve_names)
+            print(f"pack_curves, {n_files} file: {time.perf_counter()-start:.3f} s")
+
+            start = time.perf_counter()
+            for name in curve_names:
+                warehouse.packed(paths, name)
+            print(f"CurveWarehouse.packed, {n_files} file: {time.perf_counter()-start:.3f} s")
+        finally:
+            ConfigCache.app_configs.data_dir = data_dir
+            CurveWarehouse._warehouses.clear()
+
+if __name__ == "__main__":
+    benchmark_warehouse()
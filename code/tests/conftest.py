@@ -0,0 +1,86 @@
+"""
+Configurazione comune dei test dei pacchetti dell'applicazione.
+
+I config dell'applicazione sono sostituiti da una copia, prima che i test importino la cache
+dell'applicazione, in modo che nessun test legga o modifichi la directory dei dati reale
+o il file dei config; ogni test può modificarli tramite la fixture app_configs
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from app_resources.parameters import ConfigCache
+
+
+## PARAMS ##
+# directory dei dati vuota, usata dalla cache globale costruita all'importazione di AppCache
+EMPTY_DATA_DIR = tempfile.mkdtemp(prefix="webapp-tests-")
+ConfigCache.app_configs._all = {**ConfigCache.app_configs.defaults,
+                                "data_directory": EMPTY_DATA_DIR,
+                                "watch_data_dir": False,
+                                "excel_report": False}
+
+IDVD_TARGETS = ConfigCache.app_configs.targets_dirs / "IDVD"
+
+
+## HELPER FUNC ##
+def write_idvd_files(directory:Path, n_files:int=8, start:int=0) -> list[Path]:
+    """
+    Crea nella directory n_files file IDVD sintetici, ottenuti scalando le curve dei target
+    del Vgf corrispondente, e ne ritorna gli indirizzi
+
+    :param start: numero del primo file, file con numeri diversi hanno nomi diversi
+    """
+    rng = np.random.default_rng(start)
+    vgfs = (-2, -1, 0, 1, 2)
+    paths = []
+    for i in range(start, start+n_files):
+        vgf = vgfs[i % len(vgfs)]
+        df = pd.read_csv(IDVD_TARGETS / f"IDVD_Vgf_{vgf}.csv")
+        for col in df.columns:
+            if col.endswith(" Y"):
+                df[col] = df[col] * (1 + 0.05*rng.standard_normal())
+        distr = ("exponential", "uniform")[i // len(vgfs) % 2]
+        path = Path(directory) / f"IDVD_TrapDistr_{distr}_Vgf_{vgf}_Es_0.{i // 10 + 1}_Em_0.{i % 10}.csv"
+        df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+## FIXTURES ##
+@pytest.fixture
+def app_configs(tmp_path, monkeypatch):
+    """Config dell'applicazione del solo test, con la directory dei dati nella cartella temporanea del test"""
+    configs = ConfigCache.app_configs
+    monkeypatch.setattr(configs, "_all", {**configs._all, "data_directory": str(tmp_path)})
+    return configs
+
+
+@pytest.fixture
+def idvd_files(app_configs, tmp_path) -> list[Path]:
+    """File IDVD sintetici nella directory dei dati del test"""
+    return write_idvd_files(tmp_path)
+
+
+@pytest.fixture
+def tables(idvd_files, app_configs):
+    """Cache delle tabelle della directory dei dati del test, senza magazzini delle curve"""
+    from app_resources.AppCache import TablesCache
+
+    app_configs.curve_warehouse = False
+    app_configs.save_delay = 0
+    tables = TablesCache()
+    yield tables
+    tables.close()
+
+
+@pytest.fixture
+def targets_dir(tmp_path, monkeypatch) -> Path:
+    """Copia delle curve target dei file IDVD, usata al posto della cartella dei target dell'applicazione"""
+    targets = tmp_path / "target_curves"
+    shutil.copytree(IDVD_TARGETS, targets / "IDVD")
+    monkeypatch.setattr(type(ConfigCache.app_configs), "targets_dirs", targets)
+    return targets / "IDVD"
@@ -0,0 +1,123 @@
+"""Test delle regole di ricalcolo delle affinità"""
+
+import types
+import numpy as np
+import pandas as pd
+import pytest
+from common import affinity
+from common.classes import FilesFeatures
+
+
+CURVES = list(FilesFeatures.get_type_configs("IDVD").allowed_curves)
+
+
+@pytest.fixture
+def computed(monkeypatch) -> tuple[list[list[str]], dict]:
+    """
+    Sostituisce il calcolo delle affinità e l'indice dei target, in modo da non leggere
+    le curve; ritorna i file di cui è stato richiesto il calcolo, per chiamata, e il target
+    """
+    calls = []
+    target = {"fingerprint": "target-1"}
+
+    def batch_affinities(file_type, df, progress=None):
+        calls.append(df["file_path"].tolist())
+        out = pd.DataFrame(0.5, index=df.index, columns=[f"aff_{name}" for name in CURVES])
+        # la prima curva manca nel target, la sua affinità è sempre vuota
+        out[f"aff_{CURVES[0]}"] = np.nan
+        return out
+
+    monkeypatch.setattr(affinity, "batch_affinities", batch_affinities)
+    monkeypatch.setattr(affinity, "TargetIndex", types.SimpleNamespace(for_type=lambda file_type: target))
+    monkeypatch.setattr(affinity, "target_fingerprints",
+                        lambda targets, df: [targets["fingerprint"]] * len(df))
+    return calls, target
+
+
+@pytest.fixture
+def table(tmp_path) -> pd.DataFrame:
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"IDVD_TrapDistr_exponential_Vgf_{i}_Es_0.1_Em_0.2.csv"
+        path.write_text(f"v0 X,v0 Y\n0,{i}\n")
+        paths.append(str(path))
+    return pd.DataFrame({"TrapDistr": "exponential", "Vgf": ["0", "1", "2"], "file_path": paths})
+
+
+def _update(df, data_dir, full=False):
+    df, n_computed, save = affinity.update_affinities("IDVD", df, data_dir, full)
+    save()
+    return df, n_computed
+
+
+def test_only_changed_files_are_recomputed(computed, table, tmp_path):
+    calls, target = computed
+    df, n_computed = _update(table, tmp_path)
+    assert n_computed == 3
+
+    df, n_computed = _update(df, tmp_path)
+    assert n_computed == 0
+
+    # contenuto di un file cambiato
+    with open(df["file_path"][1], "a") as f:
+        f.write("1,1\n")
+    df, n_computed = _update(df, tmp_path)
+    assert n_computed == 1
+    assert calls[-1] == [df["file_path"][1]]
+
+    # target cambiato
+    target["fingerprint"] = "target-2"
+    df, n_computed = _update(df, tmp_path)
+    assert n_computed == 3
+
+    df, n_computed = _update(df, tmp_path, full=True)
+    assert n_computed == 3
+
+
+def test_lost_affinities_are_recomputed(computed, table, tmp_path):
+    df, _ = _update(table, tmp_path)
+    # le affinità vuote registrate nel manifest non causano ricalcoli
+    assert df[f"aff_{CURVES[0]}"].isna().all()
+
+    # tabella reindicizzata: le affinità non vuote nel manifest sono perse
+    df[f"aff_{CURVES[1]}"] = np.nan
+    df.loc[0, f"aff_{CURVES[2]}"] = np.nan
+    df, n_computed = _update(df, tmp_path)
+
+    assert n_computed == 3
+    assert not df[[f"aff_{name}" for name in CURVES[1:]]].isna().any(axis=None)
+
+
+def test_manifest_saved_only_on_request(computed, table, tmp_path):
+    _, n_computed, save = affinity.update_affinities("IDVD", table, tmp_path)
+    manifest_file = tmp_path / affinity.AFFINITY_MANIFEST_FILE_NAME
+    assert n_computed == 3
+    assert not manifest_file.exists()
+
+    save()
+
+    manifest = affinity.load_affinity_manifest(manifest_file)
+    assert manifest["IDVD"]["curves"] == CURVES
+    assert sorted(manifest["IDVD"]["files"]) == sorted(table["file_path"])
+    assert all(entry[2] == [CURVES[0]] for entry in manifest["IDVD"]["files"].values())
+
+
+def _assert_overall_is_mean(df:pd.DataFrame):
+    curve_cols = [f"aff_{name}" for name in CURVES]
+    np.testing.assert_allclose(df["aff_tot"].to_numpy(dtype=float),
+                               df[curve_cols].mean(axis=1).to_numpy(dtype=float))
+
+
+def test_overall_affinity_is_recomputed(tables, targets_dir, idvd_files):
+    df = tables.calculate_affinities("IDVD")
+    _assert_overall_is_mean(df)
+
+    # file modificato: solo le sue affinità sono ricalcolate, la overall di tutte le righe resta la media
+    data = pd.read_csv(idvd_files[0])
+    data[[col for col in data.columns if col.endswith(" Y")]] *= 0.5
+    data.to_csv(idvd_files[0], index=False)
+    df = tables.calculate_affinities("IDVD")
+    _assert_overall_is_mean(df)
+    _assert_overall_is_mean(tables.get("IDVD"))
+
+    _assert_overall_is_mean(tables.calculate_affinities("IDVD", full=True))
@@ -0,0 +1,54 @@
+"""Test del calcolo in blocco delle affinità"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from common.affinity import batch_affinities, packed_integrals
+from common.classes import FeaturesParser, FileCurves
+
+
+@pytest.fixture
+def table(idvd_files, targets_dir, app_configs) -> pd.DataFrame:
+    app_configs.curve_warehouse = False
+    return FeaturesParser.for_type("IDVD").parse(idvd_files)
+
+
+def test_matches_per_file_affinities(table):
+    expected = {str(path):affinities for path, affinities in FileCurves.from_df(table).calculate_affinities().items()}
+
+    out = batch_affinities("IDVD", table)
+
+    assert list(out.index) == list(table.index)
+    for path, row in zip(table["file_path"], out.to_dict("records")):
+        for name, affinity in expected[path].items():
+            assert row[f"aff_{name}"] == pytest.approx(affinity, nan_ok=True)
+
+
+def test_subset_keeps_table_index(table):
+    subset = table.iloc[[1, 3]]
+
+    out = batch_affinities("IDVD", subset)
+
+    assert list(out.index) == [1, 3]
+    assert not out.isna().all(axis=None)
+
+
+def test_empty_table(table):
+    out = batch_affinities("IDVD", table.iloc[:0])
+
+    assert out.empty
+    assert all(col.startswith("aff_") for col in out.columns)
+
+
+def test_unsupported_file_type():
+    with pytest.raises(ValueError):
+        batch_affinities("PassDon", pd.DataFrame({"file_path": []}))
+
+
+def test_packed_integrals():
+    x = np.array([0, 1, 2, 0, 2], dtype=float)
+    y = np.array([0, 1, 2, 1, 1], dtype=float)
+    offsets = np.array([0, 3, 3, 5])
+
+    # trapezi di ogni curva, le curve vuote hanno integrale NaN
+    np.testing.assert_array_equal(packed_integrals(x, y, offsets), [2, np.nan, 2])
@@ -0,0 +1,64 @@
+"""Test della rappresentazione compatta delle curve in memoria"""
+
+import numpy as np
+import pytest
+from common.classes import Curve
+from common.plot import StyledCurve
+
+
+X = np.linspace(0, 10, 50)
+
+
+def _coordinates(n_curves:int=3) -> list[tuple[str, np.ndarray, np.ndarray]]:
+    return [(f"c{i}", X[::-1], np.tanh(X)*(i+1)) for i in range(n_curves)]
+
+
+def test_curves_share_a_single_block():
+    curves = Curve.create_many(_coordinates())
+
+    block = curves[0]._xy.base
+    assert block is not None and block.shape == (2, 3*X.size)
+    assert all(curve._xy.base is block for curve in curves)
+    # le coordinate di ogni curva sono ordinate per ascisse crescenti
+    for i, curve in enumerate(curves):
+        np.testing.assert_array_equal(curve.X, X)
+        np.testing.assert_array_equal(curve.Y, np.tanh(X)[::-1]*(i+1))
+
+
+@pytest.mark.parametrize("dtype", ["float64", "float32"])
+def test_curve_dtype(app_configs, dtype):
+    app_configs.curve_dtype = dtype
+
+    curves = Curve.create_many(_coordinates())
+
+    assert all(curve.X.dtype == np.dtype(dtype) for curve in curves)
+    assert curves[0].nbytes == 2 * X.size * np.dtype(dtype).itemsize
+
+
+def test_curves_have_no_dynamic_attributes():
+    curve = Curve.create("c", X, np.tanh(X))
+
+    with pytest.raises(AttributeError):
+        curve.color = "red"
+
+
+def test_styled_curve_does_not_copy_the_data():
+    curve = Curve.create("c", X, np.tanh(X))
+
+    styled = StyledCurve(curve)
+    styled.color = "red"
+
+    assert styled.X is curve.X or np.shares_memory(styled.X, curve.X)
+    assert styled.name == curve.name
+
+
+def test_read_only_views_are_copied_on_write():
+    xy = np.vstack([X, np.tanh(X)])
+    xy.flags.writeable = False
+    curve = Curve.from_view("c", xy)
+
+    curve.translate_till_left()
+
+    assert not np.shares_memory(curve._xy, xy)
+    assert curve.X[-1] == 0
+    np.testing.assert_array_equal(xy[0], X)
@@ -0,0 +1,60 @@
+"""Test della cache su disco delle coordinate delle curve lette dai .csv"""
+
+import numpy as np
+from app_resources.parameters import ConfigCache
+from common.classes import FileCurves
+from common.curve_cache import cache_file, load_cached_curves, remove_cached_curves
+
+
+def _no_csv_reads(monkeypatch):
+    def read_file_coordinates(*args, **kwargs):
+        raise AssertionError("file .csv letto nonostante la cache")
+    monkeypatch.setattr(FileCurves, "read_file_coordinates", read_file_coordinates)
+
+
+def test_disabled_by_default():
+    assert ConfigCache.app_configs.defaults["curve_cache"] is False
+    assert ConfigCache.app_configs.defaults["curve_warehouse"] is True
+
+
+def test_coordinates_are_cached(app_configs, idvd_files, monkeypatch):
+    app_configs.curve_cache = True
+    path = idvd_files[0]
+
+    coordinates = FileCurves.load_coordinates(path)
+    assert cache_file(path).exists()
+
+    _no_csv_reads(monkeypatch)
+    cached = FileCurves.load_coordinates(path)
+    assert cached.keys() == coordinates.keys()
+    for name, (x, y) in coordinates.items():
+        np.testing.assert_array_equal(cached[name][0], x)
+        np.testing.assert_array_equal(cached[name][1], y)
+
+
+def test_modified_files_invalidate_the_cache(app_configs, idvd_files):
+    app_configs.curve_cache = True
+    path = idvd_files[0]
+    FileCurves.load_coordinates(path)
+
+    with open(path, "a") as f:
+        f.write("\n")
+
+    assert load_cached_curves(path) is None
+
+
+def test_remove_cached_curves(app_configs, idvd_files):
+    app_configs.curve_cache = True
+    FileCurves.load_coordinates(idvd_files[0])
+
+    remove_cached_curves(idvd_files[0])
+
+    assert not cache_file(idvd_files[0]).exists()
+
+
+def test_no_cache_files_when_disabled(app_configs, idvd_files):
+    app_configs.curve_cache = False
+
+    FileCurves.load_coordinates(idvd_files[0])
+
+    assert not cache_file(idvd_files[0]).parent.exists()
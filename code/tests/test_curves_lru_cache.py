@@ -0,0 +1,67 @@
+"""Test della cache in memoria delle curve caricate"""
+
+import numpy as np
+from common.classes import FileCurves
+from common.curve_cache import CURVES_CACHE, CurvesLRUCache
+
+
+KEY = np.array([1, 10, 2, 1])
+
+
+def test_evicts_least_recently_used():
+    cache = CurvesLRUCache(budget_bytes=300)
+    for name in ("a", "b", "c"):
+        cache.put(name, KEY, name, 100)
+
+    # "a" diventa il file usato più di recente
+    assert cache.get("a", KEY) == "a"
+    cache.put("d", KEY, "d", 100)
+
+    assert cache.get("b", KEY) is None
+    assert [cache.get(name, KEY) for name in ("a", "c", "d")] == ["a", "c", "d"]
+    assert cache.nbytes == 300
+    assert cache.evictions == 1
+
+
+def test_stale_key_is_a_miss():
+    cache = CurvesLRUCache(budget_bytes=300)
+    cache.put("a", KEY, "a", 100)
+
+    assert cache.get("a", KEY + 1) is None
+    assert cache.stats["misses"] == 1
+
+
+def test_oversized_entries_are_not_stored():
+    cache = CurvesLRUCache(budget_bytes=300)
+    cache.put("a", KEY, "a", 100)
+
+    cache.put("big", KEY, "big", 301)
+
+    assert cache.get("big", KEY) is None
+    assert cache.get("a", KEY) == "a"
+
+
+def test_put_replaces_and_discard():
+    cache = CurvesLRUCache(budget_bytes=300)
+    cache.put("a", KEY, "old", 100)
+    cache.put("a", KEY, "new", 150)
+    assert cache.get("a", KEY) == "new"
+    assert cache.nbytes == 150
+
+    cache.discard("a", "missing")
+
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+
+
+def test_file_curves_share_cached_curves(app_configs, idvd_files):
+    app_configs.curve_warehouse = False
+    CURVES_CACHE.clear()
+
+    first = FileCurves.from_paths(idvd_files[0])
+    second = FileCurves.from_paths(idvd_files[0])
+
+    assert CURVES_CACHE.hits >= 1
+    curves_1 = next(iter(first._curves.values()))
+    curves_2 = next(iter(second._curves.values()))
+    assert all(curves_1[name] is curves_2[name] for name in curves_1)
@@ -0,0 +1,45 @@
+"""Test dell'estrazione in parallelo delle feature dei file da indicizzare"""
+
+import importlib
+import pandas as pd
+from common.indexer import extract_all, extract_chunk
+
+
+# il pacchetto common esporta la funzione indexer con lo stesso nome del modulo
+indexer_module = importlib.import_module("common.indexer")
+
+
+def _paths(n_files:int) -> list[str]:
+    paths = []
+    for i in range(n_files):
+        if i % 3 == 0:
+            paths.append(f"data/IDVD_TrapDistr_exponential_Vgf_{i%5-2}_Es_0.{i%7}_Em_0.2.csv")
+        elif i % 3 == 1:
+            paths.append(f"data/PassDon_TrapDistr_uniform_Vgf_{i%5-2}_state_on.csv")
+        else:
+            paths.append(f"data/unknown_{i}.csv")
+    return paths
+
+
+def test_pool_matches_single_process(monkeypatch):
+    monkeypatch.setattr(indexer_module, "PARALLEL_THRESHOLD", 0)
+    paths = _paths(120)
+
+    expected = extract_chunk(paths)
+    parallel = extract_all(paths, workers=2, chunk_size=25)
+
+    assert sorted(parallel) == sorted(expected) == ["IDVD", "PassDon"]
+    for file_type, df in expected.items():
+        pd.testing.assert_frame_equal(parallel[file_type], df.reset_index(drop=True), check_dtype=False)
+
+
+def test_few_files_are_processed_in_process(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("pool avviato per pochi file")
+
+    monkeypatch.setattr(indexer_module, "ProcessPoolExecutor", no_pool)
+    paths = _paths(10)
+
+    out = extract_all(paths, workers=4, chunk_size=2)
+
+    assert len(out["IDVD"]) + len(out["PassDon"]) == 7
@@ -0,0 +1,59 @@
+"""Test del parser vettoriale delle feature contenute nei nomi dei file"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from common.classes import FeaturesParser, FilesFeatures
+
+
+PATHS = [
+    "data/IDVD_TrapDistr_exponential_Vgf_-2_Es_0.2_Em_0.2.csv",
+    "data/IDVD_Vgf_1_TrapDistr_uniform.csv",
+    "data/IDVD_TrapDistr_exponential_Vgf_0_Vgf_5.csv",
+    "data/IDVD_Region_barrier_concAcc_1e18_EmAcc_0.3_Vgf_2.csv",
+    "IDVD.csv",
+]
+
+
+def test_parse_matches_per_file_extraction():
+    df = FeaturesParser.for_type("IDVD").parse(PATHS)
+
+    for record, path in zip(df.to_dict("records"), PATHS):
+        expected = FilesFeatures.extract_features(path, only_file_features=True)
+        expected["file_path"] = path
+        assert record == expected
+
+
+def test_parse_by_type_ignores_unsupported_files():
+    paths = [*PATHS, "data/PassDon_TrapDistr_uniform_Vgf_1_state_on.csv", "data/notes_1.csv"]
+
+    out = FeaturesParser.parse_by_type(paths)
+
+    assert sorted(out) == ["IDVD", "PassDon"]
+    assert out["IDVD"]["file_path"].tolist() == PATHS
+    assert out["PassDon"][["Vgf", "state"]].values.tolist() == [["1", "on"]]
+
+
+def test_parse_rejects_other_file_types():
+    with pytest.raises(ValueError):
+        FeaturesParser.for_type("IDVD").parse(["data/PassDon_Vgf_1.csv"])
+
+
+@pytest.fixture
+def numeric_parser() -> FeaturesParser:
+    parser = FeaturesParser("IDVD")
+    parser.features = {"Vgf": "float", "Es": "integer", "file_path": "text"}
+    return parser
+
+
+def test_numeric_features(numeric_parser):
+    df = numeric_parser.parse(["IDVD_Vgf_-1.256_Es_3.csv", "IDVD_Vgf_2.csv", "IDVD_Vgf__Es_4.csv"])
+
+    np.testing.assert_array_equal(df["Vgf"].to_numpy(), [-1.26, 2, np.nan])
+    assert df["Es"].dtype == "Int64"
+    assert df["Es"].tolist() == [3, pd.NA, 4]
+
+
+def test_malformed_numeric_features_are_reported(numeric_parser):
+    with pytest.raises(ValueError, match="IDVD_Vgf_abc.csv"):
+        numeric_parser.parse(["IDVD_Vgf_1.csv", "IDVD_Vgf_abc.csv"])
@@ -0,0 +1,75 @@
+"""Test del raggruppamento delle tabelle e della sua cache per versione della tabella"""
+
+import numpy as np
+import pytest
+from conftest import write_idvd_files
+
+
+@pytest.fixture
+def tables(tables, tmp_path):
+    """Cache delle tabelle con file che differiscono solo per Es, a coppie"""
+    write_idvd_files(tmp_path, n_files=12, start=8)
+    tables.update()
+    return tables
+
+
+@pytest.fixture
+def grouped_calls(tables, monkeypatch) -> list[str]:
+    """Feature di raggruppamento dei raggruppamenti calcolati dalla cache delle tabelle"""
+    calls = []
+    group_table = tables._group_table
+    def counted(file_type, df, grouping_feature):
+        calls.append(grouping_feature)
+        return group_table(file_type, df, grouping_feature)
+    monkeypatch.setattr(tables, "_group_table", counted)
+    return calls
+
+
+def test_groups_collect_the_files_paths(tables):
+    df = tables.get("IDVD")
+
+    grouped, cols_to_hide = tables.group_df("IDVD", "Es")
+
+    assert "Es" in cols_to_hide
+    assert len(grouped) == len(df) // 2
+    paths = [path for group in grouped["file_path"] for path in group.split("#")]
+    assert sorted(paths) == sorted(df["file_path"].astype(str))
+
+
+def test_grouping_is_cached_per_version(tables, grouped_calls):
+    first = tables.group_df("IDVD", "Es", only_df=True)
+    tables.group_df("IDVD", "Es", only_df=True)
+    tables.group_df("IDVD", "Vgf", only_df=True)
+    assert grouped_calls == ["Es", "Vgf"]
+
+    with tables._lock:
+        tables._bump_version("IDVD")
+    again = tables.group_df("IDVD", "Es", only_df=True)
+
+    assert grouped_calls == ["Es", "Vgf", "Es"]
+    assert again.equals(first)
+
+
+def test_grouped_tables_are_not_shared(tables):
+    grouped = tables.group_df("IDVD", "Es", only_df=True)
+    grouped.loc[:, "file_path"] = "modified"
+
+    assert (tables.group_df("IDVD", "Es", only_df=True)["file_path"] != "modified").all()
+
+
+def test_unknown_grouping_feature(tables):
+    with pytest.raises(ValueError):
+        tables.group_df("IDVD", "missing")
+
+
+def test_grouped_affinities_are_the_group_means(tables, targets_dir):
+    df = tables.calculate_affinities("IDVD")
+
+    grouped = tables.group_df("IDVD", "Es", only_df=True)
+
+    aff_cols = [col for col in grouped.columns if col.startswith("aff_") and col != "aff_tot"]
+    assert aff_cols
+    for _, group in grouped.iterrows():
+        rows = df[df["file_path"].astype(str).isin(group["file_path"].split("#"))]
+        np.testing.assert_allclose(group[aff_cols].to_numpy(dtype=float), rows[aff_cols].mean().to_numpy())
+        np.testing.assert_allclose(group["aff_tot"], group[aff_cols].astype(float).mean())
@@ -0,0 +1,94 @@
+"""Test dei backend di salvataggio delle tabelle di indicizzazione"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from common.index_store import ExcelIndexStore, IndexStore, ParquetIndexStore, get_index_store
+
+
+def _table(n_rows:int=20) -> pd.DataFrame:
+    return pd.DataFrame({
+        "TrapDistr": ["exponential", "uniform"] * (n_rows//2),
+        "Vgf": [str(i%5-2) for i in range(n_rows)],
+        "Es": [str(i/10) for i in range(n_rows)],
+        "file_path": [f"IDVD_TrapDistr_exponential_Vgf_{i%5-2}_Es_{i}.csv" for i in range(n_rows)],
+        "aff_tot": [np.nan if i%3 == 0 else i/n_rows for i in range(n_rows)],
+    })
+
+
+def _assert_same_values(loaded:pd.DataFrame, df:pd.DataFrame):
+    assert list(loaded.columns) == list(df.columns)
+    for col in df.columns:
+        if "aff_" in col:
+            np.testing.assert_array_equal(loaded[col].to_numpy(dtype=float), df[col].to_numpy(dtype=float))
+        else:
+            # i backend salvano le feature come testo
+            assert loaded[col].astype(str).tolist() == df[col].astype(str).tolist()
+
+
+@pytest.mark.parametrize("store_class", [ParquetIndexStore, ExcelIndexStore])
+def test_round_trip(tmp_path, store_class):
+    pytest.importorskip("pyarrow" if store_class is ParquetIndexStore else "openpyxl")
+    store = store_class(tmp_path)
+    df = _table()
+
+    assert not store.exists("IDVD")
+    store.save("IDVD", df)
+    assert store.exists("IDVD")
+    _assert_same_values(store.load("IDVD"), df)
+
+    store.delete("IDVD")
+    assert not store.exists("IDVD")
+
+
+def test_load_encodes_repeated_features(tmp_path):
+    pytest.importorskip("pyarrow")
+    store = ParquetIndexStore(tmp_path)
+    store.save("IDVD", _table())
+
+    loaded = store.load("IDVD")
+
+    assert isinstance(loaded["TrapDistr"].dtype, pd.CategoricalDtype)
+    assert loaded["aff_tot"].dtype == float
+
+
+def test_encode_keeps_the_values():
+    df = _table()
+
+    encoded = IndexStore.encode(df.copy())
+
+    # Es ha un valore diverso per ogni riga, e resta di testo
+    assert isinstance(encoded["Vgf"].dtype, pd.CategoricalDtype)
+    assert encoded["Es"].dtype == object
+    for col in df.columns:
+        assert encoded[col].astype(object).where(encoded[col].notna(), None).tolist() == \
+            df[col].astype(object).where(df[col].notna(), None).tolist()
+
+
+def test_save_all_deletes_empty_tables(tmp_path):
+    pytest.importorskip("pyarrow")
+    store = ParquetIndexStore(tmp_path)
+    store.save_all({"IDVD": _table(), "PassDon": _table()})
+
+    store.save_all({"PassDon": pd.DataFrame()})
+
+    assert store.exists("IDVD")
+    assert not store.exists("PassDon")
+
+
+def test_migration_from_excel(tmp_path):
+    pytest.importorskip("pyarrow")
+    pytest.importorskip("openpyxl")
+    df = _table()
+    ExcelIndexStore(tmp_path).save("IDVD", df)
+
+    store = get_index_store(tmp_path, "parquet")
+
+    assert isinstance(store, ParquetIndexStore)
+    assert store.exists("IDVD")
+    _assert_same_values(store.load("IDVD"), df)
+
+
+def test_unknown_backend(tmp_path):
+    with pytest.raises(ValueError):
+        get_index_store(tmp_path, "csv")
@@ -0,0 +1,78 @@
+"""Test del salvataggio in background delle tabelle di indicizzazione"""
+
+import threading
+import pandas as pd
+import pytest
+from common.index_store import IndexWriter, ParquetIndexStore
+
+
+def _table(value:str) -> pd.DataFrame:
+    return pd.DataFrame({"TrapDistr": [value, value], "file_path": ["a.csv", "b.csv"], "aff_tot": [0.1, 0.2]})
+
+
+@pytest.fixture
+def store(tmp_path) -> ParquetIndexStore:
+    pytest.importorskip("pyarrow")
+    return ParquetIndexStore(tmp_path)
+
+
+def test_updates_are_coalesced(store):
+    writer = IndexWriter(store, delay=10)
+    for i in range(5):
+        writer.schedule("IDVD", _table(f"v{i}"))
+    writer.schedule("PassDon", _table("p"))
+
+    assert writer.flush(timeout=5)
+
+    assert writer.writes == 1
+    assert store.load("IDVD")["TrapDistr"].tolist() == ["v4", "v4"]
+    assert store.exists("PassDon")
+    writer.close()
+
+
+def test_after_save_sees_the_saved_table(store):
+    writer = IndexWriter(store, delay=0)
+    seen = []
+    def after_save():
+        # flush chiamato dal thread di salvataggio non attende sé stesso
+        assert writer.flush(timeout=1)
+        seen.append(store.load("IDVD")["TrapDistr"].tolist())
+
+    writer.schedule("IDVD", _table("v"), after_save=after_save)
+    writer.flush(timeout=5)
+
+    assert seen == [["v", "v"]]
+    writer.close()
+
+
+def test_failed_writes_keep_the_saved_table(store, monkeypatch):
+    writer = IndexWriter(store, delay=0)
+    writer.schedule("IDVD", _table("old"))
+    writer.flush(timeout=5)
+
+    def failing_to_parquet(df, path, *args, **kwargs):
+        with open(path, "wb") as f:
+            f.write(b"scrittura interrotta")
+        raise OSError("disco pieno")
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", failing_to_parquet)
+    called = threading.Event()
+    writer.schedule("IDVD", _table("new"), after_save=called.set)
+    writer.flush(timeout=5)
+    monkeypatch.undo()
+
+    assert not called.is_set()
+    assert store.load("IDVD")["TrapDistr"].tolist() == ["old", "old"]
+    # nessun file temporaneo lasciato nella cartella
+    assert sorted(path.name for path in store.indexes_dir.iterdir()) == ["IDVD.parquet"]
+    writer.close()
+
+
+def test_closed_writer_rejects_updates(store):
+    writer = IndexWriter(store, delay=10)
+    writer.schedule("IDVD", _table("v"))
+
+    writer.close(timeout=5)
+
+    assert store.exists("IDVD")
+    with pytest.raises(RuntimeError):
+        writer.schedule("IDVD", _table("w"))
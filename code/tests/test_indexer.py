@@ -0,0 +1,89 @@
+"""Test del confronto tra lo stato dei file salvato nel manifest e quello della directory dei dati"""
+
+from common.indexer import diff_files, file_hash, indexer, scan_data_dir
+from common.index_store import get_index_store
+
+
+def _stat(size:int, mtime:int, **kwargs) -> dict:
+    return {"size": size, "mtime": mtime, **kwargs}
+
+
+def test_diff_files_added_modified_removed():
+    old = {"a.csv": _stat(10, 1, file_type="IDVD"),
+           "b.csv": _stat(10, 1, file_type="IDVD"),
+           "c.csv": _stat(10, 1, file_type="IDVD")}
+    new = {"a.csv": _stat(10, 1),
+           "b.csv": _stat(12, 2),
+           "d.csv": _stat(5, 3)}
+
+    added, modified, removed = diff_files(old, new)
+
+    assert added == ["d.csv"]
+    assert modified == ["b.csv"]
+    assert removed == ["c.csv"]
+    # il file_type dei file già indicizzati è riportato nel nuovo stato
+    assert new["a.csv"]["file_type"] == "IDVD"
+
+
+def test_diff_files_keeps_hash_of_unchanged_files():
+    old = {"a.csv": _stat(10, 1, hash="abc")}
+    new = {"a.csv": _stat(10, 1)}
+
+    assert diff_files(old, new, use_hash=True) == ([], [], [])
+    assert new["a.csv"]["hash"] == "abc"
+
+
+def test_diff_files_hash_ignores_touched_files(tmp_path):
+    path = tmp_path / "a.csv"
+    path.write_text("v0 X,v0 Y\n0,1\n")
+    size = path.stat().st_size
+    old = {str(path): _stat(size, 1, hash=file_hash(path))}
+
+    # stessa dimensione e contenuto, data di modifica diversa
+    _, modified, _ = diff_files(old, {str(path): _stat(size, 2)}, use_hash=True)
+    assert modified == []
+    _, modified, _ = diff_files(old, {str(path): _stat(size, 2)}, use_hash=False)
+    assert modified == [str(path)]
+
+    # stessa dimensione, contenuto diverso
+    path.write_text("v0 X,v0 Y\n0,2\n")
+    _, modified, _ = diff_files(old, {str(path): _stat(size, 2)}, use_hash=True)
+    assert modified == [str(path)]
+
+
+def test_scan_data_dir(tmp_path):
+    (tmp_path / "a.csv").write_text("x")
+    (tmp_path / "b.txt").write_text("x")
+    (tmp_path / "sub.csv").mkdir()
+
+    files = scan_data_dir(tmp_path)
+
+    assert list(files) == [str(tmp_path / "a.csv")]
+    assert files[str(tmp_path / "a.csv")]["size"] == 1
+
+
+def test_scan_data_dir_missing_directory(tmp_path):
+    assert scan_data_dir(tmp_path / "missing") == {}
+
+
+def test_indexer_processes_only_changed_files(idvd_files, tmp_path):
+
+    changes = indexer(tmp_path)
+    assert sorted(changes["IDVD"]["added"]) == sorted(map(str, idvd_files))
+
+    # nessun cambiamento, nessuna tabella riscritta
+    assert indexer(tmp_path) == {}
+
+    with open(idvd_files[0], "a") as f:
+        f.write("\n")
+    idvd_files[1].unlink()
+    changes = indexer(tmp_path)
+
+    assert changes == {"IDVD": {"added": [], "modified": [str(idvd_files[0])], "removed": [str(idvd_files[1])]}}
+    table = get_index_store(tmp_path).load("IDVD")
+    assert sorted(table["file_path"].astype(str)) == sorted(map(str, [idvd_files[0], *idvd_files[2:]]))
+
+
+def test_indexer_missing_directory(app_configs, tmp_path):
+
+    assert indexer(tmp_path / "missing") == {}
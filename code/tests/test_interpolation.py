@@ -0,0 +1,59 @@
+"""Test delle funzioni di interpolazione delle curve, create al primo utilizzo"""
+
+import numpy as np
+import pytest
+from common.classes import Curve
+
+
+X = np.linspace(0, 10, 50)
+X_VALS = np.linspace(0.5, 9.5, 7)
+
+
+def test_interpolation_is_built_on_first_use():
+    curve = Curve.create("c", X, np.tanh(X))
+    assert curve._f_cubic is None
+
+    f_cubic = curve.f_cubic
+    assert curve.f_cubic is f_cubic
+
+
+def test_curves_without_interpolation():
+    curve = Curve.create("c", X, np.tanh(X), interp_func=False)
+
+    with pytest.raises(AttributeError):
+        _ = curve.f_cubic
+
+
+def test_modified_coordinates_invalidate_the_interpolation():
+    curve = Curve.create("c", X, np.tanh(X))
+    _ = curve.f_cubic
+
+    curve.Y = 2*np.tanh(X)
+
+    assert curve._f_cubic is None
+    np.testing.assert_allclose(curve.f_cubic(X_VALS), 2*curve.create("c", X, np.tanh(X)).f_cubic(X_VALS))
+
+
+def test_spline_backend_matches_interp1d(app_configs):
+    y = np.sin(X)
+    app_configs.interp_backend = "interp1d"
+    expected = Curve.create("c", X, y).f_cubic(X_VALS)
+
+    app_configs.interp_backend = "spline"
+    np.testing.assert_allclose(Curve.create("c", X, y).f_cubic(X_VALS), expected)
+
+
+def test_evaluate_many_matches_single_curves():
+    rng = np.random.default_rng(0)
+    curves = [Curve.create("c", X, np.tanh(X)*rng.uniform(0.5, 1.5)) for _ in range(4)]
+    # curva con ascisse diverse, interpolata da sola e limitata a [0, 5]
+    curves.append(Curve.create("short", X/2, np.tanh(X)))
+
+    out = Curve.evaluate_many(curves, X_VALS)
+
+    assert out.shape == (5, X_VALS.size)
+    for curve, row in zip(curves[:4], out):
+        np.testing.assert_allclose(row, curve.f_cubic(X_VALS))
+    inside = X_VALS <= 5
+    np.testing.assert_allclose(out[4, inside], curves[4].f_cubic(X_VALS[inside]))
+    assert np.isnan(out[4, ~inside]).all()
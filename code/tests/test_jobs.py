@@ -0,0 +1,111 @@
+"""Test dell'esecuzione, dell'annullamento e dell'eliminazione dei job in background"""
+
+import threading
+import time
+import pytest
+from app_resources.jobs import Job, JobsManager
+
+
+def _wait(job:Job, timeout:float=5):
+    start = time.monotonic()
+    while not job.finished:
+        if time.monotonic() - start > timeout:
+            pytest.fail(f"Job {job.id} non terminato")
+        time.sleep(0.01)
+
+
+def _loop(stop:threading.Event, progress):
+    """Funzione di un job che aggiorna l'avanzamento fino alla richiesta di terminazione"""
+    while not stop.is_set():
+        progress(0.5)
+        time.sleep(0.01)
+    return "done"
+
+
+def test_job_result():
+    jobs = JobsManager()
+    job = jobs.submit(lambda x, progress: x * 2, 21)
+    _wait(job)
+
+    assert job.status == Job.DONE
+    assert job.result == 42
+    assert job.progress == 100
+    assert jobs.pop(job.id) is job
+    assert jobs.get(job.id) is None
+
+
+def test_job_error():
+    def fail(progress):
+        raise RuntimeError("errore")
+
+    job = JobsManager().submit(fail)
+    _wait(job)
+
+    assert job.status == Job.FAILED
+    assert job.error == "errore"
+
+
+def test_cancel_running_job():
+    jobs = JobsManager()
+    stop = threading.Event()
+    job = jobs.submit(_loop, stop)
+    while job.status != Job.RUNNING:
+        time.sleep(0.01)
+
+    # un job in esecuzione non viene eliminato
+    assert jobs.pop(job.id) is job
+    assert jobs.get(job.id) is job
+
+    jobs.cancel(job.id)
+    _wait(job)
+    stop.set()
+
+    assert job.status == Job.CANCELLED
+    assert job.result is None
+
+
+def test_cancel_pending_job():
+    jobs = JobsManager(max_workers=1)
+    stop = threading.Event()
+    blocking = jobs.submit(_loop, stop)
+    ran = threading.Event()
+    pending = jobs.submit(lambda progress: ran.set())
+
+    jobs.cancel(pending.id)
+    stop.set()
+    _wait(blocking)
+    _wait(pending)
+
+    assert pending.status == Job.CANCELLED
+    assert not ran.is_set()
+
+
+def test_finished_jobs_expire():
+    jobs = JobsManager(ttl=0.05)
+    stop = threading.Event()
+    finished = jobs.submit(lambda progress: None)
+    running = jobs.submit(_loop, stop)
+    _wait(finished)
+    time.sleep(0.1)
+
+    assert jobs.get(finished.id) is None
+    # i job in esecuzione non scadono
+    assert jobs.get(running.id) is running
+    stop.set()
+    _wait(running)
+
+
+def test_detached_job_is_not_registered():
+    jobs = JobsManager(max_workers=1)
+    stop = threading.Event()
+    detached = jobs.run_detached(_loop, stop, name="test-detached")
+
+    # il pool resta libero per i job richiesti dalle pagine
+    job = jobs.submit(lambda progress: "ok")
+    _wait(job)
+    assert job.result == "ok"
+    assert jobs.get(detached.id) is None
+
+    stop.set()
+    _wait(detached)
+    assert detached.result == "done"
@@ -0,0 +1,72 @@
+"""Test delle curve create come viste in sola lettura del magazzino delle curve"""
+
+import numpy as np
+import pytest
+from common.classes import FileCurves
+from common.curve_cache import CURVES_CACHE
+from common.warehouse import CurveWarehouse
+
+
+@pytest.fixture
+def warehouse(app_configs, idvd_files) -> CurveWarehouse:
+    """Magazzino dei file IDVD del test, senza curve nella cache in memoria"""
+    app_configs.curve_warehouse = True
+    CurveWarehouse._warehouses.clear()
+    CURVES_CACHE.clear()
+    yield CurveWarehouse.for_type("IDVD", idvd_files)
+    CurveWarehouse._warehouses.clear()
+    CURVES_CACHE.clear()
+
+
+def test_curves_are_read_only_views(warehouse, idvd_files, monkeypatch):
+    def read_file_coordinates(*args, **kwargs):
+        raise AssertionError("file .csv letto nonostante il magazzino")
+    monkeypatch.setattr(FileCurves, "read_file_coordinates", read_file_coordinates)
+
+    data = FileCurves.from_paths(*idvd_files)
+
+    for path in idvd_files:
+        stored = warehouse.coordinates(path)
+        for key, curve in data._curves[path].items():
+            assert not curve.X.flags.writeable
+            assert np.shares_memory(curve.X, stored[key][0])
+            # le coordinate mappate non sono contate nella memoria occupata
+            assert curve.nbytes == 0
+
+
+def test_modified_curves_are_copied(warehouse, idvd_files):
+    path = idvd_files[0]
+    name, curve = next(iter(FileCurves.from_paths(path)._curves[path].items()))
+    x = np.array(curve.X)
+
+    curve.translate_till_left()
+
+    assert curve.X.flags.writeable
+    assert curve.X[-1] == 0
+    np.testing.assert_array_equal(warehouse.coordinates(path)[name][0], x)
+
+
+def test_curves_are_read_from_the_files_during_a_sync(warehouse, idvd_files):
+    key, _ = CurveWarehouse._location("IDVD")
+    CurveWarehouse._syncing.add(key)
+    try:
+        assert CurveWarehouse.current("IDVD") is None
+        data = FileCurves.from_paths(*idvd_files)
+    finally:
+        CurveWarehouse._syncing.discard(key)
+
+    for curve in data._curves[idvd_files[0]].values():
+        assert curve.X.flags.writeable
+    assert CurveWarehouse.current("IDVD") is warehouse
+
+
+def test_modified_files_are_not_read_from_the_warehouse(warehouse, idvd_files):
+    path = idvd_files[0]
+    lines = path.read_text().splitlines()
+    path.write_text("\n".join(lines[:len(lines)//2]) + "\n")
+
+    data = FileCurves.from_paths(path)
+
+    for curve in data._curves[path].values():
+        assert curve.X.flags.writeable
+        assert len(curve.X) < len(lines) - 1
@@ -0,0 +1,67 @@
+"""Test della pulizia e normalizzazione delle coordinate, applicate alla lettura dei .csv"""
+
+import numpy as np
+import pytest
+from common.classes import FileCurves
+from common.curve_cache import load_cached_curves
+from common.PlotterConfigs import PlotterConfigs
+
+
+@pytest.fixture
+def finish_at_0(monkeypatch):
+    """Le curve dei file IDVD sono traslate in modo che l'ascissa più alta sia 0"""
+    configs = PlotterConfigs.files_configs["IDVD"]
+    monkeypatch.setitem(configs._data, "FinishAt0", 1)
+    return configs
+
+
+def test_read_coordinates_are_cleaned(tmp_path):
+    path = tmp_path / "IDVD_TrapDistr_exponential_Vgf_0_Es_0.1_Em_0.1.csv"
+    path.write_text("v0 X,v0 Y\n3,30\n1,10\n-,5\n2,20\n1,11\n")
+
+    x, y = FileCurves.read_file_coordinates(path)["v0"]
+
+    np.testing.assert_array_equal(x, [1, 2, 3])
+    np.testing.assert_array_equal(y, [10, 20, 30])
+
+
+def test_finish_at_0_translates_the_curves(idvd_files, finish_at_0):
+    path = idvd_files[0]
+    read = FileCurves.read_file_coordinates(path)
+
+    normalized = FileCurves.normalize_coordinates(path, read)
+
+    for name, (x, y) in read.items():
+        np.testing.assert_allclose(normalized[name][0], x - x[-1])
+        np.testing.assert_array_equal(normalized[name][1], y)
+
+
+def test_other_file_types_are_not_translated(idvd_files):
+    read = FileCurves.read_file_coordinates(idvd_files[0])
+
+    assert FileCurves.normalize_coordinates(idvd_files[0], read) is read
+
+
+def test_normalization_is_stored_in_the_cache(app_configs, idvd_files, finish_at_0, monkeypatch):
+    app_configs.curve_cache = True
+    path = idvd_files[0]
+    key = FileCurves.file_key(path)
+
+    coordinates = FileCurves.load_coordinates(path, key)
+    cached = load_cached_curves(path, key)
+
+    for name, (x, _) in coordinates.items():
+        assert x[-1] == 0
+        np.testing.assert_array_equal(cached[name][0], x)
+    # le curve caricate non sono traslate di nuovo
+    monkeypatch.setattr(FileCurves, "normalize_coordinates", None)
+    data = FileCurves.from_paths(path)
+    assert all(curve.X[-1] == 0 for curve in data._curves[path].values())
+
+
+def test_changing_the_normalization_invalidates_the_keys(idvd_files, finish_at_0, monkeypatch):
+    translated = FileCurves.file_key(idvd_files[0])
+
+    monkeypatch.setitem(finish_at_0._data, "FinishAt0", 0)
+
+    assert not np.array_equal(FileCurves.file_key(idvd_files[0]), translated)
@@ -0,0 +1,52 @@
+"""Test della lettura in parallelo dei file delle curve"""
+
+import numpy as np
+import pytest
+from common.classes import FileCurves
+from common.curve_cache import CURVES_CACHE
+
+
+def _coordinates(paths:list, workers:int) -> list[dict]:
+    keys = [FileCurves.file_key(path) for path in paths]
+    loaded = FileCurves.load_all_coordinates(paths, keys, workers)
+    assert all(error is None for _, error in loaded)
+    return [coordinates for coordinates, _ in loaded]
+
+
+@pytest.mark.parametrize("pool", ["thread", "process"])
+def test_parallel_load_matches_sequential(app_configs, idvd_files, pool):
+    app_configs.curve_cache = False
+    app_configs.load_pool = pool
+
+    sequential = _coordinates(idvd_files, workers=1)
+    parallel = _coordinates(idvd_files, workers=2)
+
+    for expected, loaded in zip(sequential, parallel):
+        assert loaded.keys() == expected.keys()
+        for name, (x, y) in expected.items():
+            np.testing.assert_array_equal(loaded[name][0], x)
+            np.testing.assert_array_equal(loaded[name][1], y)
+
+
+def test_import_all_keeps_the_files_order(app_configs, idvd_files):
+    app_configs.curve_cache = False
+    app_configs.curve_warehouse = False
+    app_configs.load_workers = 4
+    CURVES_CACHE.clear()
+
+    data = FileCurves.from_paths(*reversed(idvd_files))
+
+    assert list(data.paths) == list(reversed(idvd_files))
+
+
+def test_import_all_collects_the_read_errors(app_configs, idvd_files):
+    app_configs.curve_cache = False
+    app_configs.curve_warehouse = False
+    app_configs.load_workers = 4
+    CURVES_CACHE.clear()
+    for path in idvd_files[:2]:
+        header = path.read_text().splitlines()[0]
+        path.write_text(header + "\n" + ",".join("abc" for _ in header.split(",")) + "\n")
+
+    with pytest.raises(Exception, match="errore leggendo 2 file su"):
+        FileCurves.from_paths(*idvd_files)
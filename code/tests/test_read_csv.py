@@ -0,0 +1,55 @@
+"""Test della lettura dei file .csv delle curve"""
+
+import importlib.util
+import numpy as np
+import pandas as pd
+import pytest
+from common.classes import FileCurves
+
+
+ENGINES = ["c", pytest.param("pyarrow", marks=pytest.mark.skipif(
+    importlib.util.find_spec("pyarrow") is None, reason="pyarrow non installato"))]
+
+
+@pytest.fixture
+def wide_file(tmp_path):
+    """File con curve di lunghezze diverse, completate con il segnaposto "-", e curve non richieste"""
+    rng = np.random.default_rng(0)
+    x = np.linspace(-1, 1, 50)
+    data = {}
+    for i, name in enumerate(("a", "b", "extra1", "extra2")):
+        data[f"{name} X"] = np.where(np.arange(x.size) < 30 + 5*i, x, np.nan)
+        data[f"{name} Y"] = np.exp(x) * rng.uniform(0.5, 1.5)
+    path = tmp_path / "PassDon_TrapDistr_exponential_Vgf_0_state_on.csv"
+    pd.DataFrame(data).to_csv(path, index=False, na_rep="-")
+    return path
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_only_requested_curves_are_read(wide_file, engine, monkeypatch):
+    monkeypatch.setattr(FileCurves, "_csv_engine", engine)
+
+    coordinates = FileCurves.read_file_coordinates(wide_file, ["a", "b", "missing"])
+
+    assert list(coordinates) == ["a", "b"]
+    assert len(coordinates["a"][0]) == 30
+    assert len(coordinates["b"][0]) == 35
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engines_match_pandas(wide_file, engine, monkeypatch):
+    monkeypatch.setattr(FileCurves, "_csv_engine", engine)
+    data = pd.read_csv(wide_file, na_values="-", float_precision="round_trip")
+
+    coordinates = FileCurves.read_file_coordinates(wide_file)
+
+    assert set(coordinates) == {"a", "b", "extra1", "extra2"}
+    for name, (x, y) in coordinates.items():
+        expected = data[[f"{name} X", f"{name} Y"]].dropna()
+        np.testing.assert_array_equal(x, expected[f"{name} X"])
+        np.testing.assert_array_equal(y, expected[f"{name} Y"])
+
+
+def test_unreadable_files_raise(tmp_path):
+    with pytest.raises(Exception, match="errore leggendo il file"):
+        FileCurves.read_file_coordinates(tmp_path / "missing.csv")
@@ -0,0 +1,127 @@
+"""Test dei filtri, degli ordinamenti e dei blocchi di righe del row model infinite delle AgGrid"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from common.row_model import MAX_BLOCK_SIZE, filter_mask, index_condition, rows_block, sort_rows
+from common.table_index import TableIndex
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    return pd.DataFrame({
+        "TrapDistr": ["exponential", "Uniform", None, "exponential", "uniform"],
+        "Vgf": ["-2", "0", "1", "2", None],
+        "aff_tot": [0.5, np.nan, 0.9, 0.1, 0.7],
+    })
+
+
+def test_text_filters(df):
+    assert filter_mask(df, {"TrapDistr": {"filterType": "text", "type": "equals", "filter": "uniform"}}).tolist() == \
+        [False, True, False, False, True]
+    assert filter_mask(df, {"TrapDistr": {"filterType": "text", "type": "notContains", "filter": "exp"}}).tolist() == \
+        [False, True, True, False, True]
+    assert filter_mask(df, {"TrapDistr": {"filterType": "text", "type": "blank"}}).tolist() == \
+        [False, False, True, False, False]
+
+
+def test_number_filters(df):
+    assert filter_mask(df, {"Vgf": {"filterType": "number", "type": "greaterThanOrEqual", "filter": 0}}).tolist() == \
+        [False, True, True, True, False]
+    assert filter_mask(df, {"Vgf": {"filterType": "number", "type": "inRange", "filter": 2, "filterTo": -2}}).tolist() == \
+        [False, True, True, False, False]
+
+
+def test_combined_filters(df):
+    filter_model = {
+        "Vgf": {"filterType": "number", "operator": "OR", "conditions": [
+            {"type": "lessThan", "filter": 0}, {"type": "greaterThan", "filter": 1},
+        ]},
+        "TrapDistr": {"filterType": "text", "type": "contains", "filter": "exp"},
+        "missing": {"filterType": "text", "type": "equals", "filter": "x"},
+    }
+
+    assert filter_mask(df, filter_model).tolist() == [True, False, False, True, False]
+
+
+def test_unsupported_filter(df):
+    with pytest.raises(ValueError):
+        filter_mask(df, {"Vgf": {"filterType": "date", "type": "equals", "filter": "2020"}})
+
+
+def test_sort_rows_empty_cells_per_key():
+    df = pd.DataFrame({"a": [1, 1, 2, 2, np.nan], "b": [np.nan, 3, 1, np.nan, 2]})
+
+    asc_desc = sort_rows(df, [{"colId": "a", "sort": "asc"}, {"colId": "b", "sort": "desc"}])
+    desc_asc = sort_rows(df, [{"colId": "a", "sort": "desc"}, {"colId": "b", "sort": "asc"}])
+
+    # celle vuote in testa negli ordinamenti crescenti e in coda in quelli decrescenti
+    assert asc_desc.index.tolist() == [4, 1, 0, 2, 3]
+    assert desc_asc.index.tolist() == [3, 2, 0, 1, 4]
+
+
+def test_sort_rows_numeric_text_columns():
+    df = pd.DataFrame({"Vgf": ["2", "-1", "10", None, "-2"]})
+
+    ascending = sort_rows(df, [{"colId": "Vgf", "sort": "asc"}])
+    descending = sort_rows(df, [{"colId": "Vgf", "sort": "desc"}])
+
+    # ordinamento numerico, non lessicografico ("-2" < "-1" < "10" < "2")
+    assert ascending["Vgf"].tolist() == [None, "-2", "-1", "2", "10"]
+    assert descending["Vgf"].tolist() == ["10", "2", "-1", "-2", None]
+
+
+def test_sort_rows_matches_table_index(df):
+    sort_model = [{"colId": "TrapDistr", "sort": "asc"}, {"colId": "Vgf", "sort": "desc"}]
+
+    np.testing.assert_array_equal(sort_rows(df, sort_model).index,
+                                  TableIndex(df).select(sort=["TrapDistr", "-Vgf"]))
+
+
+def test_rows_block(df):
+    request = {"startRow": 1, "endRow": 3, "sortModel": [{"colId": "aff_tot", "sort": "desc"}],
+               "filterModel": {"TrapDistr": {"filterType": "text", "type": "notBlank"}}}
+
+    response = rows_block(df, request)
+
+    assert response["rowCount"] == 4
+    assert [row["aff_tot"] for row in response["rowData"]] == [0.5, 0.1]
+
+
+def test_rows_block_limits_block_size():
+    df = pd.DataFrame({"a": range(MAX_BLOCK_SIZE + 10)})
+
+    assert len(rows_block(df, {"startRow": 5})["rowData"]) == MAX_BLOCK_SIZE
+
+
+@pytest.mark.parametrize("column_filter", [
+    {"filterType": "text", "type": "equals", "filter": "UNIFORM"},
+    {"filterType": "number", "type": "lessThan", "filter": 1},
+    {"filterType": "number", "type": "inRange", "filter": -2, "filterTo": 2},
+])
+def test_index_condition_matches_filter_mask(df, column_filter):
+    col = "TrapDistr" if column_filter["filterType"] == "text" else "Vgf"
+    index = TableIndex(df)
+
+    condition = index_condition(index, col, column_filter)
+
+    assert condition is not None
+    np.testing.assert_array_equal(index.select({col: condition}),
+                                  np.flatnonzero(filter_mask(df, {col: column_filter})))
+
+
+def test_index_condition_unsupported(df):
+    index = TableIndex(df)
+    assert index_condition(index, "TrapDistr", {"filterType": "text", "type": "contains", "filter": "x"}) is None
+    assert index_condition(index, "TrapDistr", {"filterType": "number", "type": "equals", "filter": 1}) is None
+
+
+def test_grouped_and_plain_views_sort_alike(tables):
+    request = {"startRow": 0, "endRow": 100, "sortModel": [{"colId": "Vgf", "sort": "asc"}]}
+
+    plain = [row["Vgf"] for row in tables.rows_block("IDVD", request)["rowData"]]
+    grouped = [row["Vgf"] for row in tables.rows_block("IDVD", request, grouping_feature="Em")["rowData"]]
+
+    assert [float(vgf) for vgf in plain] == sorted(float(vgf) for vgf in plain)
+    assert [float(vgf) for vgf in grouped] == sorted(float(vgf) for vgf in grouped)
+    assert set(grouped) == set(plain)
@@ -0,0 +1,58 @@
+"""Test della valutazione in blocco delle curve dei file alle ascisse richieste"""
+
+import numpy as np
+import pytest
+from common.classes import FileCurves
+
+
+@pytest.fixture
+def data(app_configs, idvd_files) -> FileCurves:
+    app_configs.curve_warehouse = False
+    return FileCurves.from_paths(*idvd_files[:3])
+
+
+def _x_vals(data:FileCurves) -> list[float]:
+    """Ascisse interne ai limiti di tutte le curve dell'istanza"""
+    limits = [curve.x_limits for f_curves in data._curves.values() for curve in f_curves.values()]
+    return list(np.linspace(max(lim[0] for lim in limits), min(lim[1] for lim in limits), 5))
+
+
+def test_sample_matches_single_curves(data):
+    x_vals = _x_vals(data)
+
+    out = data.sample(*x_vals)
+
+    assert list(out.columns) == ["file_path", "curve", "name", "x", "y"]
+    n_curves = sum(len(f_curves) for f_curves in data._curves.values())
+    assert len(out) == n_curves * len(x_vals)
+    for (path, key), rows in out.groupby(["file_path", "curve"]):
+        curve = data._curves[next(p for p in data.paths if str(p) == path)][key]
+        np.testing.assert_allclose(rows["x"], x_vals)
+        np.testing.assert_allclose(rows["y"], curve.create_sub_sample(*x_vals).Y, rtol=1e-6)
+
+
+def test_sample_selected_curves(data):
+    out = data.sample(*_x_vals(data), curves=["v0"])
+
+    assert set(out["curve"]) == {"v0"}
+    assert out["file_path"].nunique() == 3
+
+
+def test_sample_outside_the_limits_is_nan(data):
+    x_min, x_max = next(iter(data._curves.values()))["v0"].x_limits
+
+    out = data.sample(x_min - 1, x_max + 1, curves=["v0"])
+
+    assert out["y"].isna().all()
+
+
+def test_sample_targets(data, targets_dir):
+    out = data.sample(*_x_vals(data), targets=True)
+
+    assert out["file_path"].map(lambda path: path.startswith(str(targets_dir))).all()
+    assert out["y"].notna().any()
+
+
+def test_sample_needs_x_values(data):
+    with pytest.raises(ValueError):
+        data.sample()
@@ -0,0 +1,103 @@
+"""Test della selezione delle righe delle tabelle tramite TableIndex"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from common.table_index import TableIndex
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    n_rows = 500
+    return pd.DataFrame({
+        "TrapDistr": rng.choice(["exponential", "uniform", None], n_rows).astype(object),
+        "Vgf": rng.choice([str(v) for v in range(-3, 4)], n_rows).astype(object),
+        "aff_tot": np.where(rng.random(n_rows) < 0.1, np.nan, rng.random(n_rows)),
+    })
+
+
+def test_select_matches_boolean_masks(df):
+    vgf = pd.to_numeric(df["Vgf"])
+    expected = np.flatnonzero(((df["TrapDistr"] == "exponential") & (vgf >= -1) & (vgf < 2)).to_numpy())
+
+    positions = TableIndex(df).select({"TrapDistr": "exponential", "Vgf": {">=": -1, "<": 2}})
+
+    np.testing.assert_array_equal(positions, expected)
+
+
+def test_select_values_list(df):
+    expected = np.flatnonzero(df["Vgf"].isin(["-3", "3"]).to_numpy())
+
+    np.testing.assert_array_equal(TableIndex(df).select({"Vgf": ["-3", 3]}), expected)
+
+
+def test_select_missing_value(df):
+    assert len(TableIndex(df).select({"TrapDistr": "gaussian"})) == 0
+
+
+def test_select_sorted(df):
+    positions = TableIndex(df).select({"TrapDistr": "uniform"}, sort=["Vgf", "-aff_tot"])
+
+    rows = df.iloc[positions]
+    expected = df[df["TrapDistr"] == "uniform"].assign(vgf=pd.to_numeric(df["Vgf"])).sort_values(
+        ["vgf", "aff_tot"], ascending=[True, False], na_position="last", kind="stable"
+    )
+    assert rows["Vgf"].tolist() == expected["Vgf"].tolist()
+    np.testing.assert_array_equal(rows["aff_tot"].to_numpy(), expected["aff_tot"].to_numpy())
+
+
+def test_select_without_filters(df):
+    np.testing.assert_array_equal(TableIndex(df).select(), np.arange(len(df)))
+
+
+def test_invalid_queries(df):
+    index = TableIndex(df)
+    with pytest.raises(ValueError):
+        index.select({"missing": "x"})
+    with pytest.raises(ValueError):
+        index.select({"Vgf": {"==": 1}})
+    with pytest.raises(ValueError):
+        index.select({"TrapDistr": {">": 1}})
+
+
+def test_tables_query(tables):
+    df = tables.get("IDVD")
+    vgf = pd.to_numeric(df["Vgf"])
+    expected = df[(df["TrapDistr"] == "exponential") & (vgf >= -1)]
+    expected = expected.assign(vgf=vgf).sort_values("vgf", ascending=False, kind="stable")
+
+    rows = tables.query("IDVD", {"TrapDistr": "exponential", "Vgf": {">=": -1}}, sort=["-Vgf"],
+                        columns=["file_path", "Vgf"], limit=2, offset=1)
+
+    assert list(rows.columns) == ["file_path", "Vgf"]
+    assert rows["file_path"].tolist() == expected["file_path"].iloc[1:3].tolist()
+
+
+def test_tables_rows_block_reuses_the_row_order(tables, monkeypatch):
+    request = {"startRow": 0, "endRow": 3, "sortModel": [{"colId": "Vgf", "sort": "desc"}],
+               "filterModel": {"TrapDistr": {"filterType": "text", "type": "equals", "filter": "EXPONENTIAL"},
+                               "Em": {"filterType": "text", "type": "contains", "filter": "0."}}}
+    first = tables.rows_block("IDVD", request)
+
+    df = tables.get("IDVD")
+    expected = df[df["TrapDistr"] == "exponential"].assign(vgf=pd.to_numeric(df["Vgf"]))
+    assert first["rowCount"] == len(expected)
+    assert [row["Vgf"] for row in first["rowData"]] == \
+        expected.sort_values("vgf", ascending=False, kind="stable")["Vgf"].iloc[:3].tolist()
+
+    # i blocchi successivi sono intervalli delle posizioni salvate
+    monkeypatch.setattr(TableIndex, "select", None)
+    second = tables.rows_block("IDVD", {**request, "startRow": 3, "endRow": 6})
+    assert second["rowCount"] == first["rowCount"]
+    assert len(second["rowData"]) == min(3, first["rowCount"] - 3)
+
+
+def test_tables_index_follows_the_table_version(tables):
+    index = tables.index("IDVD")
+    assert tables.index("IDVD") is index
+
+    with tables._lock:
+        tables._bump_version("IDVD")
+
+    assert tables.index("IDVD") is not index
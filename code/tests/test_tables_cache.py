@@ -0,0 +1,41 @@
+"""Test delle letture delle tabelle in memoria di TablesCache, senza copie difensive"""
+
+import numpy as np
+import pandas as pd
+
+
+def test_copy_on_write_is_enabled_on_import():
+    from app_resources.AppCache import GLOBAL_CACHE
+
+    assert GLOBAL_CACHE is not None
+    assert pd.get_option("mode.copy_on_write") is True
+
+
+def test_reads_share_the_table_data(tables):
+    first, second = tables.get("IDVD"), tables.get("IDVD")
+
+    assert first is not second
+    assert np.shares_memory(first["aff_v0"].to_numpy(), second["aff_v0"].to_numpy())
+
+
+def test_modified_reads_do_not_change_the_table(tables):
+    version = tables.version("IDVD")
+    df = tables.get("IDVD")
+    paths = df["file_path"].tolist()
+
+    df["file_path"] = "modified"
+    df.loc[df.index[0], "Em"] = "modified"
+    df.drop(columns="Vgf", inplace=True)
+
+    table = tables.get("IDVD")
+    assert table["file_path"].tolist() == paths
+    assert "modified" not in table["Em"].tolist()
+    assert "Vgf" in table.columns
+    assert tables.version("IDVD") == version
+
+
+def test_snapshot_returns_the_table_and_its_version(tables):
+    df, version = tables.snapshot("IDVD")
+
+    assert version == tables.version("IDVD")
+    assert df.equals(tables.get("IDVD"))
@@ -0,0 +1,66 @@
+"""Test dell'indice delle curve target"""
+
+import os
+import time
+import pytest
+from common.classes import FileCurves, TargetIndex
+
+
+RECORD = {"TrapDistr": "exponential", "Vgf": "1", "Es": "0.2", "Em": "0.2", "file_path": "IDVD_Vgf_1.csv"}
+
+
+@pytest.fixture
+def loads(monkeypatch) -> list:
+    """Registra i file target caricati"""
+    loaded = []
+    from_paths = FileCurves.from_paths.__func__
+
+    def counted(cls, *paths, **kwargs):
+        loaded.extend(paths)
+        return from_paths(cls, *paths, **kwargs)
+
+    monkeypatch.setattr(FileCurves, "from_paths", classmethod(counted))
+    return loaded
+
+
+def test_index_is_built_once(targets_dir):
+    index = TargetIndex.for_type("IDVD")
+
+    assert TargetIndex.for_type("IDVD") is index
+    assert index.find(RECORD) == targets_dir / "IDVD_Vgf_1.csv"
+    with pytest.raises(FileNotFoundError):
+        index.find({**RECORD, "Vgf": "7"})
+
+
+def test_index_is_rebuilt_when_the_folder_changes(targets_dir):
+    index = TargetIndex.for_type("IDVD")
+
+    (targets_dir / "IDVD_Vgf_1.csv").rename(targets_dir / "IDVD_Vgf_3.csv")
+    # la data di modifica della cartella potrebbe non cambiare entro la sua risoluzione
+    os.utime(targets_dir, ns=(time.time_ns(), time.time_ns() + 10**9))
+
+    rebuilt = TargetIndex.for_type("IDVD")
+    assert rebuilt is not index
+    assert rebuilt.find({**RECORD, "Vgf": "3"}) == targets_dir / "IDVD_Vgf_3.csv"
+
+
+def test_targets_are_loaded_once(targets_dir, loads):
+    index = TargetIndex.for_type("IDVD")
+
+    target, integrals = index.get(RECORD)
+    assert index.get(RECORD)[0] is target
+    assert loads == [targets_dir / "IDVD_Vgf_1.csv"]
+    assert set(integrals) == set(next(iter(target._curves.values())))
+
+
+def test_modified_targets_are_reloaded(targets_dir, loads):
+    index = TargetIndex.for_type("IDVD")
+    index.get(RECORD)
+    fingerprint = index.fingerprint(RECORD)
+
+    with open(targets_dir / "IDVD_Vgf_1.csv", "a") as f:
+        f.write("\n")
+
+    assert index.fingerprint(RECORD) != fingerprint
+    index.get(RECORD)
+    assert len(loads) == 2
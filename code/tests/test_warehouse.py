@@ -0,0 +1,94 @@
+"""Test del magazzino su disco delle curve di un file_type"""
+
+import numpy as np
+import pytest
+from common.classes import FileCurves
+from common.warehouse import CurveWarehouse
+
+
+@pytest.fixture(autouse=True)
+def warehouses():
+    """Ogni test parte senza magazzini in memoria"""
+    CurveWarehouse._warehouses.clear()
+    yield
+    CurveWarehouse._warehouses.clear()
+
+
+def _assert_same_coordinates(warehouse:CurveWarehouse, path):
+    expected = FileCurves.read_file_coordinates(path)
+    stored = warehouse.coordinates(path)
+    assert stored.keys() == expected.keys()
+    for name, (x, y) in expected.items():
+        np.testing.assert_array_equal(stored[name][0], x)
+        np.testing.assert_array_equal(stored[name][1], y)
+
+
+def test_warehouse_stores_the_files_curves(app_configs, idvd_files):
+    warehouse = CurveWarehouse.for_type("IDVD", idvd_files)
+
+    assert len(warehouse) == len(idvd_files)
+    for path in idvd_files:
+        _assert_same_coordinates(warehouse, path)
+
+
+def test_packed_matches_the_files_curves(app_configs, idvd_files):
+    warehouse = CurveWarehouse.for_type("IDVD", idvd_files)
+    name = warehouse.curve_names[0]
+
+    x, y, offsets = warehouse.packed(reversed(idvd_files), name)
+
+    assert len(offsets) == len(idvd_files) + 1
+    for path, start, end in zip(reversed(idvd_files), offsets[:-1], offsets[1:]):
+        expected_x, expected_y = FileCurves.read_file_coordinates(path)[name]
+        np.testing.assert_array_equal(x[start:end], expected_x)
+        np.testing.assert_array_equal(y[start:end], expected_y)
+
+
+def test_sync_is_incremental(app_configs, idvd_files):
+    warehouse = CurveWarehouse.for_type("IDVD", idvd_files[:4])
+    assert warehouse.sync(idvd_files[:4]) is warehouse
+
+    updated = CurveWarehouse.for_type("IDVD", idvd_files)
+
+    assert len(updated) == len(idvd_files)
+    # i file già presenti restano nel blocco esistente
+    assert warehouse.chunks[0] in updated.chunks
+    for path in idvd_files:
+        _assert_same_coordinates(updated, path)
+
+
+def test_modified_files_are_read_again(app_configs, idvd_files):
+    CurveWarehouse.for_type("IDVD", idvd_files)
+    path = idvd_files[0]
+    lines = path.read_text().splitlines()
+    path.write_text("\n".join(lines[:len(lines)//2]) + "\n")
+
+    warehouse = CurveWarehouse.for_type("IDVD", idvd_files)
+
+    _assert_same_coordinates(warehouse, path)
+
+
+def test_warehouse_is_loaded_from_disk(app_configs, idvd_files):
+    CurveWarehouse.for_type("IDVD", idvd_files)
+    CurveWarehouse._warehouses.clear()
+
+    warehouse = CurveWarehouse.current("IDVD")
+
+    assert warehouse.files == [str(path) for path in idvd_files]
+    assert warehouse.sync(idvd_files) is warehouse
+    _assert_same_coordinates(warehouse, idvd_files[0])
+
+
+def test_unreadable_files_are_recorded(app_configs, idvd_files):
+    path = idvd_files[0]
+    header = path.read_text().splitlines()[0]
+    path.write_text(header + "\n" + ",".join("abc" for _ in header.split(",")) + "\n")
+
+    warehouse = CurveWarehouse.for_type("IDVD", idvd_files)
+
+    assert str(path) in warehouse.failed
+    assert warehouse.sync(idvd_files) is warehouse
+    _, _, offsets = warehouse.packed(idvd_files, warehouse.curve_names[0])
+    assert offsets[1] == offsets[0]
+    with pytest.raises(ValueError):
+        warehouse.positions([path])
@@ -0,0 +1,49 @@
+"""Test dell'aggiornamento incrementale delle tabelle al cambiamento della directory dei dati"""
+
+import time
+import types
+from app_resources.AppCache import DataDirWatcher
+from conftest import write_idvd_files
+
+
+def test_update_reloads_only_changed_tables(tables, idvd_files, tmp_path):
+    version = tables.version("IDVD")
+    assert len(tables.get("IDVD")) == len(idvd_files)
+
+    assert tables.update() == {}
+    assert tables.version("IDVD") == version
+
+    idvd_files[0].unlink()
+    changes = tables.update()
+
+    assert changes["IDVD"]["removed"] == [str(idvd_files[0])]
+    assert tables.version("IDVD") > version
+    assert str(idvd_files[0]) not in tables.get("IDVD")["file_path"].astype(str).tolist()
+
+
+def test_watcher_check(tables, idvd_files, tmp_path):
+    watcher = DataDirWatcher(types.SimpleNamespace(tables=tables), interval=0.05)
+    # il primo controllo registra lo stato della directory
+    watcher.check()
+    assert watcher.check() == {}
+
+    write_idvd_files(tmp_path, n_files=2, start=len(idvd_files))
+
+    assert len(watcher.check()["IDVD"]["added"]) == 2
+    assert len(tables.get("IDVD")) == len(idvd_files) + 2
+
+
+def test_watcher_thread(tables, idvd_files):
+    watcher = DataDirWatcher(types.SimpleNamespace(tables=tables), interval=0.05)
+    watcher.start()
+    try:
+        idvd_files[0].unlink()
+        deadline = time.monotonic() + 5
+        while len(tables.get("IDVD")) == len(idvd_files) and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        watcher.stop()
+        watcher.join(5)
+
+    assert len(tables.get("IDVD")) == len(idvd_files) - 1
+    assert not watcher.is_alive()